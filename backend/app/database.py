@@ -1,117 +1,116 @@
+import os
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Generator
+from typing import Any, Dict, Generator, Iterable, List, Optional, Type, Union
 
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.sql.dml import Insert
 from sqlmodel import Session, SQLModel, create_engine
 
-DATABASE_URL = "sqlite:///./app.db"
-_db_path = Path(DATABASE_URL.split("///")[-1]).resolve()
-_db_path.parent.mkdir(parents=True, exist_ok=True)
+from .services.cache import read_int_env
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,
-    connect_args={"check_same_thread": False},
-)
+DEFAULT_DATABASE_URL = "sqlite:///./app.db"
+
+
+def database_url_from_env(var_name: str = "DATABASE_URL") -> str:
+    url = (os.getenv(var_name) or DEFAULT_DATABASE_URL).strip()
+    # 部分托管平台仍下发 postgres:// 前缀，SQLAlchemy 只识别 postgresql://。
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+DATABASE_URL = database_url_from_env()
+
+# SQLITE_PROFILE=wal（默认）：WAL 日志、synchronous=NORMAL、忙等待与较大的页缓存/mmap，
+# 读写互不阻塞，并发上传时写入排队等待而不是直接报 "database is locked"；
+# SQLITE_PROFILE=default 保留 SQLite 自身的默认设置。
+SQLITE_PROFILES = ("wal", "default")
+
+
+def sqlite_pragmas(profile: Optional[str] = None) -> Dict[str, object]:
+    profile = (profile or os.getenv("SQLITE_PROFILE") or "wal").strip().lower()
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE: {profile}")
+    if profile == "default":
+        return {}
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": read_int_env("SQLITE_BUSY_TIMEOUT_MS", 5000),
+        # 负数表示以 KiB 计。
+        "cache_size": -read_int_env("SQLITE_CACHE_SIZE_KB", 64 * 1024),
+        "mmap_size": read_int_env("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        "temp_store": "MEMORY",
+    }
+
+
+def _pool_options() -> Dict[str, int]:
+    return {
+        "pool_size": read_int_env("DB_POOL_SIZE", 10),
+        "max_overflow": read_int_env("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": read_int_env("DB_POOL_TIMEOUT", 30),
+    }
+
+
+def create_sqlite_engine(url: str, profile: Optional[str] = None) -> Engine:
+    """创建 SQLite 引擎：每个新连接建立时执行所选配置的 PRAGMA，连接池大小可由环境变量调整。"""
+
+    pragmas = sqlite_pragmas(profile)
+    database = make_url(url).database
+    pool_options = {}
+    if database and database != ":memory:":
+        Path(database).resolve().parent.mkdir(parents=True, exist_ok=True)
+        pool_options = _pool_options()
+    sqlite_engine = create_engine(
+        url,
+        echo=False,
+        connect_args={"check_same_thread": False},
+        **pool_options,
+    )
+
+    if pragmas:
+        @event.listens_for(sqlite_engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record) -> None:  # noqa: ARG001
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas.items():
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
+
+    return sqlite_engine
+
+
+# 汇总表与错题写入依赖 INSERT ... ON CONFLICT（见 ``upsert_statement``），只支持这两种方言。
+SUPPORTED_DIALECTS = ("sqlite", "postgresql")
+
+
+def create_app_engine(url: str) -> Engine:
+    """按 URL 方言创建引擎：SQLite 走本地配置；PostgreSQL 供多个 API 副本共享。
+
+    其他方言在启动时即拒绝，而不是等到首次批改写汇总表时才失败。
+    """
+
+    backend = make_url(url).get_backend_name()
+    if backend not in SUPPORTED_DIALECTS:
+        raise ValueError(f"Unsupported database backend {backend!r}; expected one of {', '.join(SUPPORTED_DIALECTS)}")
+    if backend == "sqlite":
+        return create_sqlite_engine(url)
+    return create_engine(url, echo=False, pool_pre_ping=True, **_pool_options())
+
+
+engine = create_app_engine(DATABASE_URL)
 
 
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
-    apply_lightweight_migrations()
-
-
-def apply_lightweight_migrations() -> None:
-    """轻量级迁移：为旧版 SQLite 库补充新增字段。"""
-
-    with engine.begin() as connection:
-        def _column_names(table: str) -> set[str]:
-            rows = connection.exec_driver_sql(f"PRAGMA table_info({table})").fetchall()
-            return {row[1] for row in rows}
-
-        question_columns = _column_names("question")
-        if "target_student_ids" not in question_columns:
-            connection.exec_driver_sql("ALTER TABLE question ADD COLUMN target_student_ids JSON")
-        if "answer_status" not in question_columns:
-            connection.exec_driver_sql("ALTER TABLE question ADD COLUMN answer_status VARCHAR DEFAULT 'draft'")
-            connection.exec_driver_sql(
-                "UPDATE question SET answer_status = 'draft' WHERE answer_status IS NULL",
-            )
-        if "answer_confidence" not in question_columns:
-            connection.exec_driver_sql("ALTER TABLE question ADD COLUMN answer_confidence FLOAT")
-
-        response_columns = _column_names("response")
-        if "applies_to_student" not in response_columns:
-            connection.exec_driver_sql(
-                "ALTER TABLE response ADD COLUMN applies_to_student BOOLEAN DEFAULT 1",
-            )
-            connection.exec_driver_sql(
-                "UPDATE response SET applies_to_student = 1 WHERE applies_to_student IS NULL",
-            )
-        if "ai_confidence" not in response_columns:
-            connection.exec_driver_sql("ALTER TABLE response ADD COLUMN ai_confidence FLOAT")
-        if "review_status" not in response_columns:
-            connection.exec_driver_sql(
-                "ALTER TABLE response ADD COLUMN review_status VARCHAR DEFAULT 'pending'",
-            )
-            connection.exec_driver_sql(
-                "UPDATE response SET review_status = 'pending' WHERE review_status IS NULL",
-            )
-        if "teacher_comment" not in response_columns:
-            connection.exec_driver_sql("ALTER TABLE response ADD COLUMN teacher_comment TEXT")
-        if "ai_raw" not in response_columns:
-            connection.exec_driver_sql("ALTER TABLE response ADD COLUMN ai_raw JSON")
-
-        exam_columns = _column_names("exam")
-        if "source_image_path" not in exam_columns:
-            connection.exec_driver_sql("ALTER TABLE exam ADD COLUMN source_image_path TEXT")
-        if "parsed_outline" not in exam_columns:
-            connection.exec_driver_sql("ALTER TABLE exam ADD COLUMN parsed_outline JSON")
-        if "owner_id" not in exam_columns:
-            connection.exec_driver_sql("ALTER TABLE exam ADD COLUMN owner_id INTEGER")
-
-        submission_columns = _column_names("submission")
-        if "session_id" not in submission_columns:
-            connection.exec_driver_sql("ALTER TABLE submission ADD COLUMN session_id INTEGER")
-        if "overall_confidence" not in submission_columns:
-            connection.exec_driver_sql("ALTER TABLE submission ADD COLUMN overall_confidence FLOAT")
-        if "status_detail" not in submission_columns:
-            connection.exec_driver_sql("ALTER TABLE submission ADD COLUMN status_detail TEXT")
-        if "ai_trace_id" not in submission_columns:
-            connection.exec_driver_sql("ALTER TABLE submission ADD COLUMN ai_trace_id TEXT")
-        if "owner_id" not in submission_columns:
-            connection.exec_driver_sql("ALTER TABLE submission ADD COLUMN owner_id INTEGER")
-
-        mistake_columns = _column_names("mistake")
-        if "error_count" not in mistake_columns:
-            connection.exec_driver_sql("ALTER TABLE mistake ADD COLUMN error_count INTEGER DEFAULT 1")
-            connection.exec_driver_sql("UPDATE mistake SET error_count = COALESCE(error_count, 1)")
-        if "data_status" not in mistake_columns:
-            connection.exec_driver_sql("ALTER TABLE mistake ADD COLUMN data_status VARCHAR DEFAULT 'complete'")
-            connection.exec_driver_sql(
-                "UPDATE mistake SET data_status = COALESCE(data_status, 'complete')",
-            )
-        if "root_cause" not in mistake_columns:
-            connection.exec_driver_sql("ALTER TABLE mistake ADD COLUMN root_cause TEXT")
-
-        teacher_columns = _column_names("teacher")
-        if "owner_id" not in teacher_columns:
-            connection.exec_driver_sql("ALTER TABLE teacher ADD COLUMN owner_id INTEGER")
-
-        student_columns = _column_names("student")
-        if "owner_id" not in student_columns:
-            connection.exec_driver_sql("ALTER TABLE student ADD COLUMN owner_id INTEGER")
-
-        classroom_columns = _column_names("classroom")
-        if "owner_id" not in classroom_columns:
-            connection.exec_driver_sql("ALTER TABLE classroom ADD COLUMN owner_id INTEGER")
-
-        grading_session_columns = _column_names("gradingsession")
-        if "owner_id" not in grading_session_columns:
-            connection.exec_driver_sql("ALTER TABLE gradingsession ADD COLUMN owner_id INTEGER")
-
-        practice_assignment_columns = _column_names("practiceassignment")
-        if "owner_id" not in practice_assignment_columns:
-            connection.exec_driver_sql("ALTER TABLE practiceassignment ADD COLUMN owner_id INTEGER")
+    """按版本执行数据库迁移；结构已是最新版本时只做一次版本查询。"""
+
+    # 迁移依赖服务层，而服务层依赖本模块的引擎与工具函数，这里延迟导入以避免循环引用。
+    from .migrations import run_migrations
+
+    run_migrations(engine)
 
 
 def reset_database() -> None:
@@ -123,3 +122,65 @@ def reset_database() -> None:
 def get_session() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
+
+
+def get_db() -> Generator[Session, None, None]:
+    """FastAPI 依赖：每个请求一个会话，同一请求内的路由与鉴权依赖共用它。"""
+
+    with get_session() as session:
+        yield session
+
+
+def commit_keep_loaded(session: Session) -> None:
+    """提交事务但不让会话中已加载的对象过期。
+
+    仅在内存中的对象与刚写入的数据一致时使用（例如字段由 ``INSERT ... RETURNING`` 填充），
+    可省去提交后逐行 ``refresh`` 或懒加载带来的查询。
+    """
+
+    expire_on_commit = session.expire_on_commit
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = expire_on_commit
+
+
+def dialect_insert(bind: Union[Session, Connection, Engine], model: Type[SQLModel]) -> Insert:
+    """返回当前方言的 INSERT 构造（支持 ``on_conflict_do_update`` / ``on_conflict_do_nothing``）。"""
+
+    if isinstance(bind, Session):
+        bind = bind.get_bind()
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_specific_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_specific_insert
+    else:
+        raise NotImplementedError(f"upsert is not supported on {dialect}")
+    return dialect_specific_insert(model)
+
+
+def upsert_statement(
+    bind: Union[Session, Connection, Engine],
+    model: Type[SQLModel],
+    values: Union[Dict[str, Any], List[Dict[str, Any]]],
+    *,
+    index_elements: Iterable[str],
+    update_columns: Optional[Iterable[str]] = None,
+    increment_columns: Iterable[str] = (),
+) -> Insert:
+    """``INSERT ... ON CONFLICT``：``update_columns`` 覆盖为新值，``increment_columns`` 在原值上
+    累加新值；两者都未给出时冲突行保持不变。
+
+    多个 API 副本并发写同一主键或唯一键时，不会因先查后插的竞争而触发唯一约束错误。
+    """
+
+    stmt = dialect_insert(bind, model).values(values)
+    index_elements = list(index_elements)
+    set_ = {column: stmt.excluded[column] for column in update_columns or ()}
+    table = model.__table__
+    set_.update({column: table.c[column] + stmt.excluded[column] for column in increment_columns})
+    if not set_:
+        return stmt.on_conflict_do_nothing(index_elements=index_elements)
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
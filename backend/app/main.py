@@ -1,19 +1,31 @@
 ﻿from __future__ import annotations
 
+import base64
+import binascii
 import mimetypes
+import os
+import re
 import shutil
-from pathlib import Path
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path, PurePosixPath
 from datetime import datetime
-from typing import Iterator, List, Optional
+from typing import Iterator, List, Optional, Tuple, Union
 
-from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile, status
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Request, UploadFile, status
+from fastapi import Response as HTTPResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import and_, delete, func, insert, or_
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 
-from .database import engine, get_session, init_db, reset_database
+from .database import commit_keep_loaded, engine, init_db, reset_database
+from .database import get_db as _get_db
 from .sample_data import ensure_demo_dataset, create_demo_dataset_for_user
 from .models import (
     ClassEnrollment,
@@ -27,6 +39,7 @@ from .models import (
     Question,
     SessionStatus,
     StudentProfile,
+    SubmissionJobState,
     SubmissionStatus,
     ProcessingLog,
     Response,
@@ -41,6 +54,7 @@ from .schemas import (
     AnalyticsSummary,
     AssistantChatRequest,
     AssistantChatResponse,
+    BatchSheetResult,
     LLMConfigStatus,
     LLMConfigUpdate,
     ClassroomCreate,
@@ -50,6 +64,7 @@ from .schemas import (
     ExamCreate,
     ExamRead,
     ExamAnswerKeyUpdate,
+    ExamSummary,
     ExamDraftResponse,
     GradingSessionCreate,
     GradingSessionRead,
@@ -72,6 +87,7 @@ from .schemas import (
     PracticeAssignmentCreate,
     PracticeAssignmentRead,
     PracticeCompletionUpdate,
+    ReadinessRead,
     ResponseRead,
     StudentCreate,
     StudentRead,
@@ -79,6 +95,7 @@ from .schemas import (
     SubmissionDetail,
     SubmissionProcessingResult,
     SubmissionHistoryEntry,
+    SubmissionJobRead,
     SubmissionRead,
     TeacherCreate,
     TeacherFeedbackCreate,
@@ -90,6 +107,13 @@ from .schemas import (
 )
 from .services.analytics import build_analytics
 from .services.grading import auto_grade_submission
+from .services.jobs import (
+    JOB_ACTOR_TYPE,
+    enqueue_submission_job,
+    get_job_state,
+    recover_submission_jobs,
+    shutdown_job_executor,
+)
 from .services.llm import (
     LLMInvocationError,
     LLMNotConfiguredError,
@@ -99,9 +123,18 @@ from .services.llm import (
     set_llm_credentials,
     stream_teacher_assistant,
 )
-from .services.ocr import OCRProcessingError, run_ocr_pipeline
+from .services.knowledge import questions_tagged_with, sync_question_knowledge_tags
+from .services.ocr import OCRProcessingError, run_ocr_pipeline, shutdown_easyocr_pool
 from .services.practice import generate_practice_assignment
 from .services.profile import ensure_student_profile, refresh_student_profile_stats
+from .services.query_stats import (
+    QUERY_COUNT_HEADER,
+    QUERY_TIME_HEADER,
+    query_debug_enabled,
+    report_repeated_queries,
+    track_queries,
+)
+from .services.rollups import refresh_analytics_rollups
 from .services.student_analysis import (
     AnalysisHistoryLimitExceeded,
     build_analysis_context,
@@ -109,8 +142,10 @@ from .services.student_analysis import (
     list_analysis_history,
     perform_student_analysis,
 )
+from .services.warmup import get_readiness, start_warmup
 from .security import (
     authenticate_user,
+    clear_user_cache,
     create_access_token,
     get_current_user,
     get_password_hash,
@@ -120,9 +155,20 @@ from uuid import uuid4
 GENERATED_ROOT_DIR = Path(__file__).resolve().parent / "generated"
 FEEDBACK_STORAGE_DIR = GENERATED_ROOT_DIR / "feedback"
 EXAM_DRAFT_STORAGE_DIR = GENERATED_ROOT_DIR / "exams"
+SUBMISSION_STORAGE_DIR = GENERATED_ROOT_DIR / "submissions"
 ALLOWED_FEEDBACK_MIME_TYPES = {"image/png", "image/jpeg", "image/jpg", "image/webp"}
 MAX_FEEDBACK_ATTACHMENTS = 3
 MAX_FEEDBACK_FILE_SIZE = 3 * 1024 * 1024
+MAX_BATCH_SHEETS = 60
+# 压缩包按解压后的大小限制：单张答题卡与全部答题卡之和。
+MAX_BATCH_SHEET_SIZE = 20 * 1024 * 1024
+MAX_BATCH_ARCHIVE_SIZE = 256 * 1024 * 1024
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXAM_EXPANSIONS = {"questions"}
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+BATCH_FILENAME_PATTERN = re.compile(r"^(?P<student_id>\d+)")
 
 
 def _require_student(session: Session, student_id: int, current_user: User) -> Student:
@@ -146,8 +192,8 @@ def _require_teacher(session: Session, teacher_id: int, current_user: User) -> T
     return teacher
 
 
-def _require_exam(session: Session, exam_id: int, current_user: User) -> Exam:
-    exam = session.get(Exam, exam_id)
+def _require_exam(session: Session, exam_id: int, current_user: User, *, options: Optional[list] = None) -> Exam:
+    exam = session.get(Exam, exam_id, options=options)
     if exam is None or exam.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="未找到对应考试")
     return exam
@@ -215,21 +261,27 @@ def _list_student_mistakes(
         .where(Mistake.student_id == student_id)
         .order_by(Mistake.last_seen_at.desc())
     )
+    if knowledge_tag and knowledge_tag.strip():
+        stmt = stmt.where(Mistake.question_id.in_(questions_tagged_with([knowledge_tag])))
+    if status:
+        stmt = stmt.where(Mistake.data_status == status)
     mistakes = session.exec(stmt).all()
 
-    if knowledge_tag:
-        needle = knowledge_tag.strip().lower()
-        if needle:
-            mistakes = [
-                item
-                for item in mistakes
-                if item.knowledge_tags and needle in item.knowledge_tags.lower()
-            ]
+    return [MistakeRead.model_validate(item) for item in mistakes]
 
-    if status:
-        mistakes = [item for item in mistakes if item.data_status == status]
 
-    return [MistakeRead.model_validate(item) for item in mistakes]
+def _encode_submission_cursor(submission: Submission) -> str:
+    raw = f"{submission.submitted_at.isoformat()}|{submission.id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_submission_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        submitted_at, submission_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(submitted_at), int(submission_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
 
 
 def _cleanup_generated_assets() -> None:
@@ -272,6 +324,282 @@ def _serialize_processing_log(log: ProcessingLog) -> ProcessingLogRead:
     )
 
 
+def _store_submission_image(submission: Submission, image: UploadFile, image_bytes: bytes) -> str:
+    extension = Path(image.filename or "").suffix.lower()
+    if not extension and image.content_type:
+        extension = mimetypes.guess_extension(image.content_type.split(";")[0]) or ""
+    SUBMISSION_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+    file_path = SUBMISSION_STORAGE_DIR / f"{submission.id}_{uuid4().hex}{extension or '.png'}"
+    try:
+        file_path.write_bytes(image_bytes)
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail="保存图片失败") from exc
+    return str(file_path)
+
+
+def _submission_image_path(submission: Submission) -> Optional[Path]:
+    extra = submission.extra_metadata if isinstance(submission.extra_metadata, dict) else {}
+    image_path = extra.get("source_image_path")
+    return Path(image_path) if image_path else None
+
+
+def _submission_image_available(submission: Submission) -> bool:
+    image_path = _submission_image_path(submission)
+    return image_path is not None and image_path.is_file()
+
+
+def _run_submission_job(session: Session, submission: Submission) -> None:
+    image_path = _submission_image_path(submission)
+    if image_path is None:
+        raise OCRProcessingError("未找到待批改的试卷图片")
+    try:
+        image_bytes = image_path.read_bytes()
+        exam = session.get(Exam, submission.exam_id)
+        if exam is None:
+            raise OCRProcessingError("考试已被删除，无法继续批改")
+        session.refresh(exam, attribute_names=["questions"])
+        submission.exam = exam
+        _process_submission_upload(session, submission, exam, image_bytes)
+    finally:
+        # 原图只用于本次批改，无论成败都不再保留；进程中途退出时文件留存，供重启后重新排队。
+        image_path.unlink(missing_ok=True)
+
+
+def _recover_submission_jobs() -> None:
+    with Session(engine) as session:
+        recover_submission_jobs(session, _run_submission_job, _submission_image_available)
+
+
+def _build_submission_job_schema(session: Session, submission: Submission) -> SubmissionJobRead:
+    job = get_job_state(submission) or {}
+    log_records = session.exec(
+        select(ProcessingLog)
+        .where(ProcessingLog.submission_id == submission.id)
+        .order_by(ProcessingLog.created_at.asc()),
+    ).all()
+    updated_at = job.get("updated_at")
+    return SubmissionJobRead(
+        job_id=submission.id,
+        submission_id=submission.id,
+        state=job.get("state") or SubmissionJobState.queued,
+        detail=job.get("detail"),
+        updated_at=datetime.fromisoformat(updated_at) if isinstance(updated_at, str) else None,
+        submission=SubmissionRead.model_validate(submission),
+        processing_logs=[_serialize_processing_log(item) for item in log_records],
+    )
+
+
+@dataclass
+class _BatchSheet:
+    student_id: int
+    filename: Optional[str]
+    image_bytes: bytes
+
+
+def _batch_worker_count() -> int:
+    try:
+        return max(1, int(os.getenv("BATCH_UPLOAD_CONCURRENCY", "4")))
+    except ValueError:
+        return 4
+
+
+def _read_batch_archive(archive_bytes: bytes) -> List[_BatchSheet]:
+    """解析 zip 压缩包，文件名需以学生编号开头，例如 ``12.jpg`` 或 ``12_张三.png``。"""
+
+    try:
+        archive = zipfile.ZipFile(BytesIO(archive_bytes))
+    except zipfile.BadZipFile as exc:
+        raise HTTPException(status_code=400, detail="压缩包格式无效") from exc
+
+    with archive:
+        members: List[Tuple[int, zipfile.ZipInfo]] = []
+        for member in sorted(archive.infolist(), key=lambda item: item.filename):
+            name = PurePosixPath(member.filename)
+            if member.is_dir() or name.name.startswith(".") or "__MACOSX" in name.parts:
+                continue
+            match = BATCH_FILENAME_PATTERN.match(name.stem)
+            if match is None:
+                raise HTTPException(status_code=400, detail=f"无法从文件名 {name.name} 中识别学生编号")
+            members.append((int(match.group("student_id")), member))
+
+        # 读取前按目录中声明的解压大小拦截压缩炸弹；zipfile 解压时不会超出声明的大小。
+        if len(members) > MAX_BATCH_SHEETS:
+            raise HTTPException(status_code=400, detail=f"单次最多批量上传 {MAX_BATCH_SHEETS} 份答题卡")
+        for _, member in members:
+            if member.file_size > MAX_BATCH_SHEET_SIZE:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{PurePosixPath(member.filename).name} 解压后超过 {MAX_BATCH_SHEET_SIZE // (1024 * 1024)}MB",
+                )
+        if sum(member.file_size for _, member in members) > MAX_BATCH_ARCHIVE_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"压缩包解压后超过 {MAX_BATCH_ARCHIVE_SIZE // (1024 * 1024)}MB",
+            )
+
+        return [
+            _BatchSheet(
+                student_id=student_id,
+                filename=PurePosixPath(member.filename).name,
+                image_bytes=archive.read(member),
+            )
+            for student_id, member in members
+        ]
+
+
+def _grade_batch_sheet(
+    bind: Engine | Connection,
+    exam: Exam,
+    submission_id: int,
+    index: int,
+    sheet: _BatchSheet,
+) -> BatchSheetResult:
+    with Session(bind) as session:
+        submission = session.get(Submission, submission_id)
+        local_exam = session.merge(exam, load=False)
+        submission.exam = local_exam
+        try:
+            result = _process_submission_upload(session, submission, local_exam, sheet.image_bytes)
+        except Exception as exc:  # noqa: BLE001 - one bad sheet must not abort the batch
+            session.rollback()
+            submission = session.get(Submission, submission_id)
+            submission.status = SubmissionStatus.needs_review
+            session.add(submission)
+            session.commit()
+            return BatchSheetResult(
+                index=index,
+                student_id=sheet.student_id,
+                filename=sheet.filename,
+                status="error",
+                detail=str(exc),
+            )
+    return BatchSheetResult(
+        index=index,
+        student_id=sheet.student_id,
+        filename=sheet.filename,
+        status="success",
+        result=result,
+    )
+
+
+def _process_submission_upload(
+    session: Session,
+    submission: Submission,
+    exam: Exam,
+    image_bytes: bytes,
+) -> SubmissionProcessingResult:
+    ocr_rows, ocr_steps = run_ocr_pipeline(image_bytes)
+
+    submission.raw_ocr_payload = {"rows": ocr_rows, "steps": ocr_steps}
+    session.add(submission)
+    # 保留已加载的考试与题目，批改时无需重新查询。
+    commit_keep_loaded(session)
+
+    grading_artifacts = auto_grade_submission(session, submission, ocr_rows)
+
+    responses_schema = [ResponseRead.model_validate(item) for item in grading_artifacts.responses]
+    mistakes_schema = [MistakeRead.model_validate(item) for item in grading_artifacts.mistakes]
+    ocr_schema = [OCRResult.model_validate(item) for item in ocr_rows]
+
+    combined_steps_raw = []
+    for step in ocr_steps:
+        if isinstance(step, dict):
+            combined_steps_raw.append(step)
+    for step in grading_artifacts.steps:
+        combined_steps_raw.append(step.as_dict())
+
+    normalized_steps: List[dict[str, Optional[str]]] = []
+    for raw_step in combined_steps_raw:
+        if not isinstance(raw_step, dict):
+            continue
+        name = str(raw_step.get("name") or "Processing Step")
+        status = str(raw_step.get("status") or "success").lower()
+        if status not in {"success", "warning", "error"}:
+            status = "success"
+        normalized_steps.append(
+            {
+                "name": name,
+                "status": status,
+                "detail": raw_step.get("detail"),
+            },
+        )
+
+    unique_numbers = {
+        str(row.get("question_number")).strip()
+        for row in ocr_rows
+        if isinstance(row, dict) and row.get("question_number")
+    }
+    total_questions = len(exam.questions or [])
+    matching_score: Optional[float] = None
+    if total_questions:
+        matching_score = min(1.0, len(unique_numbers) / total_questions) if unique_numbers else 0.0
+
+    extra_metadata = submission.extra_metadata.copy() if isinstance(submission.extra_metadata, dict) else {}
+    extra_metadata.update(
+        {
+            "processing_steps": normalized_steps,
+            "matching_score": matching_score,
+        },
+    )
+    if grading_artifacts.ai_summary:
+        extra_metadata["ai_summary"] = grading_artifacts.ai_summary
+    submission.extra_metadata = extra_metadata
+    session.add(submission)
+
+    # 重新批改时整体替换系统生成的日志：一条 DELETE 加一条批量 INSERT。
+    session.execute(
+        delete(ProcessingLog).where(
+            ProcessingLog.submission_id == submission.id,
+            ProcessingLog.actor_type != JOB_ACTOR_TYPE,
+        ),
+    )
+    logged_at = datetime.utcnow()
+    log_rows = [
+        {
+            "submission_id": submission.id,
+            "step": step["name"],
+            "actor_type": "system",
+            "detail": step.get("detail"),
+            "extra": {"status": step.get("status")},
+            "created_at": logged_at,
+        }
+        for step in normalized_steps
+    ]
+    if grading_artifacts.ai_summary:
+        log_rows.append(
+            {
+                "submission_id": submission.id,
+                "step": "AI 批改摘要",
+                "actor_type": "assistant",
+                "detail": grading_artifacts.ai_summary,
+                "created_at": logged_at,
+            },
+        )
+    if log_rows:
+        session.execute(insert(ProcessingLog), log_rows)
+    commit_keep_loaded(session)
+
+    submission_schema = SubmissionRead.model_validate(submission)
+    step_schemas = [ProcessingStep(**step) for step in normalized_steps]
+    log_records = session.exec(
+        select(ProcessingLog)
+        .where(ProcessingLog.submission_id == submission.id)
+        .order_by(ProcessingLog.created_at.asc(), ProcessingLog.id.asc()),
+    ).all()
+    log_schemas = [_serialize_processing_log(item) for item in log_records]
+
+    return SubmissionProcessingResult(
+        submission=submission_schema,
+        responses=responses_schema,
+        mistakes=mistakes_schema,
+        ocr_rows=ocr_schema,
+        processing_steps=step_schemas,
+        ai_summary=grading_artifacts.ai_summary,
+        matching_score=matching_score,
+        processing_logs=log_schemas,
+    )
+
+
 app = FastAPI(title="AI-Assisted Exam Analytics Platform")
 
 app.add_middleware(
@@ -280,17 +608,47 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[QUERY_COUNT_HEADER, QUERY_TIME_HEADER, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
 )
 
 
+@app.middleware("http")
+async def query_stats_middleware(request: Request, call_next):
+    """调试模式（``QUERY_DEBUG=1``）下统计每个请求的 SQL 语句数与耗时，写入响应头，并对疑似 N+1 的重复语句告警。"""
+
+    if not query_debug_enabled():
+        return await call_next(request)
+    with track_queries() as stats:
+        response = await call_next(request)
+    report_repeated_queries(f"{request.method} {request.url.path}", stats)
+    response.headers[QUERY_COUNT_HEADER] = str(stats.count)
+    response.headers[QUERY_TIME_HEADER] = f"{stats.duration_ms:.1f}"
+    return response
+
+
 @app.on_event("startup")
 def startup_event() -> None:
     init_db()
+    _recover_submission_jobs()
+    start_warmup()
+
+
+@app.on_event("shutdown")
+def shutdown_event() -> None:
+    shutdown_job_executor()
+    shutdown_easyocr_pool(wait=False)
+
 
+@app.get("/health/ready", response_model=ReadinessRead)
+def get_readiness_status() -> JSONResponse:
+    """就绪探针：预热全部完成（或跳过/失败）前返回 503，负载均衡器不会转发流量。"""
 
-def _get_db() -> Session:
-    with get_session() as session:
-        yield session
+    ready, components = get_readiness()
+    payload = ReadinessRead(ready=ready, components=components)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content=payload.model_dump(),
+    )
 
 
 @app.post("/auth/register", response_model=UserRead, status_code=201)
@@ -486,25 +844,66 @@ def create_exam(
     session.add(exam)
     session.flush()
 
-    for question_payload in payload.questions:
-        question = Question(exam_id=exam.id, **question_payload.model_dump())
-        session.add(question)
+    questions = [Question(exam_id=exam.id, **question_payload.model_dump()) for question_payload in payload.questions]
+    session.add_all(questions)
+    session.flush()
+    sync_question_knowledge_tags(session, questions)
 
     session.commit()
     session.refresh(exam, attribute_names=["questions"])
     return ExamRead.model_validate(exam)
 
 
-@app.get("/exams", response_model=List[ExamRead])
+@app.get("/exams", response_model=Union[List[ExamSummary], List[ExamRead]])
 def list_exams(
+    response: HTTPResponse,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[int] = None,
+    expand: Optional[str] = None,
     session: Session = Depends(_get_db),
     current_user: User = Depends(get_current_user),
-) -> List[ExamRead]:
-    stmt = select(Exam).where(Exam.owner_id == current_user.id)
-    exams = session.exec(stmt).all()
-    for exam in exams:
-        session.refresh(exam, attribute_names=["questions"])
-    return [ExamRead.model_validate(exam) for exam in exams]
+) -> Union[List[ExamSummary], List[ExamRead]]:
+    """按 id 游标分页。默认只查询考试本身的列与题目数；``expand=questions`` 时返回含题目的完整考试。"""
+
+    expansions = {item.strip() for item in (expand or "").split(",") if item.strip()}
+    unknown = expansions - EXAM_EXPANSIONS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported expand: {', '.join(sorted(unknown))}")
+    safe_limit = max(1, min(limit, MAX_PAGE_SIZE))
+    conditions = [Exam.owner_id == current_user.id]
+    if cursor is not None:
+        conditions.append(Exam.id > cursor)
+
+    if "questions" in expansions:
+        stmt = select(Exam).where(*conditions).order_by(Exam.id).limit(safe_limit + 1)
+        exams = session.exec(stmt.options(selectinload(Exam.questions))).all()
+        has_more = len(exams) > safe_limit
+        page = [ExamRead.model_validate(exam) for exam in exams[:safe_limit]]
+    else:
+        question_count = (
+            select(func.count(Question.id)).where(Question.exam_id == Exam.id).correlate(Exam).scalar_subquery()
+        )
+        rows = session.exec(
+            select(
+                Exam.id,
+                Exam.title,
+                Exam.subject,
+                Exam.scheduled_date,
+                Exam.teacher_id,
+                Exam.classroom_id,
+                Exam.answer_key_version,
+                question_count.label("question_count"),
+            )
+            .where(*conditions)
+            .order_by(Exam.id)
+            .limit(safe_limit + 1),
+        ).all()
+        has_more = len(rows) > safe_limit
+        page = [ExamSummary.model_validate(row._asdict()) for row in rows[:safe_limit]]
+
+    if has_more:
+        response.headers[NEXT_CURSOR_HEADER] = str(page[-1].id)
+    return page
 
 
 @app.get("/exams/{exam_id}", response_model=ExamRead)
@@ -668,31 +1067,60 @@ def create_submission(
 
     submission = Submission(**payload.model_dump(), owner_id=current_user.id)
     session.add(submission)
+    refresh_analytics_rollups(session, submission.exam_id)
     session.commit()
     session.refresh(submission, attribute_names=["responses"])
 
     return SubmissionDetail.model_validate(submission)
 
 
-@app.get("/submissions", response_model=List[SubmissionDetail])
+@app.get("/submissions", response_model=Union[List[SubmissionDetail], List[SubmissionRead]])
 def list_submissions(
+    response: HTTPResponse,
     exam_id: Optional[int] = None,
     student_id: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    include_responses: bool = True,
+    include_total: bool = False,
     session: Session = Depends(_get_db),
     current_user: User = Depends(get_current_user),
-) -> List[SubmissionDetail]:
-    stmt = select(Submission).where(Submission.owner_id == current_user.id)
+) -> Union[List[SubmissionDetail], List[SubmissionRead]]:
+    """按 ``(submitted_at, id)`` 倒序的游标分页；还有下一页时在 ``X-Next-Cursor`` 响应头返回游标。
+
+    ``include_responses=false`` 时不加载作答明细，只返回提交概要；
+    ``include_total=true`` 时额外在 ``X-Total-Count`` 响应头返回筛选条件下的提交总数。
+    """
+
+    safe_limit = max(1, min(limit, MAX_PAGE_SIZE))
+    conditions = [Submission.owner_id == current_user.id]
     if exam_id is not None:
         _require_exam(session, exam_id, current_user)
-        stmt = stmt.where(Submission.exam_id == exam_id)
+        conditions.append(Submission.exam_id == exam_id)
     if student_id is not None:
         _require_student(session, student_id, current_user)
-        stmt = stmt.where(Submission.student_id == student_id)
-    stmt = stmt.order_by(Submission.submitted_at.desc())
-    submissions = session.exec(stmt).all()
-    for submission in submissions:
-        session.refresh(submission, attribute_names=["responses"])
-    return [SubmissionDetail.model_validate(item) for item in submissions]
+        conditions.append(Submission.student_id == student_id)
+    if include_total:
+        total = session.exec(select(func.count(Submission.id)).where(*conditions)).one()
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+    stmt = select(Submission).where(*conditions)
+    if cursor:
+        cursor_at, cursor_id = _decode_submission_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                Submission.submitted_at < cursor_at,
+                and_(Submission.submitted_at == cursor_at, Submission.id < cursor_id),
+            ),
+        )
+    stmt = stmt.order_by(Submission.submitted_at.desc(), Submission.id.desc()).limit(safe_limit + 1)
+    if include_responses:
+        stmt = stmt.options(selectinload(Submission.responses))
+    submissions = list(session.exec(stmt).all())
+    if len(submissions) > safe_limit:
+        submissions = submissions[:safe_limit]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_submission_cursor(submissions[-1])
+    schema = SubmissionDetail if include_responses else SubmissionRead
+    return [schema.model_validate(item) for item in submissions]
 
 
 @app.get("/submissions/history", response_model=List[SubmissionHistoryEntry])
@@ -790,14 +1218,18 @@ def get_submission(
     return SubmissionDetail.model_validate(submission)
 
 
-@app.post("/submissions/upload", response_model=SubmissionProcessingResult)
+@app.post(
+    "/submissions/upload",
+    response_model=Union[SubmissionProcessingResult, SubmissionJobRead],
+)
 async def upload_submission(
     student_id: int = Form(...),
     exam_id: int = Form(...),
     image: UploadFile = File(...),
+    async_mode: bool = Form(False),
     session: Session = Depends(_get_db),
     current_user: User = Depends(get_current_user),
-) -> SubmissionProcessingResult:
+) -> Union[SubmissionProcessingResult, SubmissionJobRead]:
     exam = _require_exam(session, exam_id, current_user)
     student = _require_student(session, student_id, current_user)
 
@@ -807,122 +1239,111 @@ async def upload_submission(
 
     submission = Submission(student_id=student_id, exam_id=exam_id, owner_id=current_user.id)
     session.add(submission)
+    # 提交在批改前就已入库（识别失败、异步排队时同样保留），汇总行随之计入，与实时聚合一致。
+    refresh_analytics_rollups(session, exam_id)
     session.commit()
     session.refresh(submission)
+
+    if async_mode:
+        image_path = _store_submission_image(submission, image, image_bytes)
+        submission.extra_metadata = {"source_image_path": image_path}
+        session.add(submission)
+        session.commit()
+        enqueue_submission_job(session, submission, _run_submission_job)
+        session.refresh(submission)
+        return _build_submission_job_schema(session, submission)
+
     session.refresh(exam, attribute_names=["questions"])
     submission.exam = exam
 
     try:
-        ocr_rows, ocr_steps = run_ocr_pipeline(image_bytes)
+        return _process_submission_upload(session, submission, exam, image_bytes)
     except OCRProcessingError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    submission.raw_ocr_payload = {"rows": ocr_rows, "steps": ocr_steps}
-    session.add(submission)
-    session.commit()
-
-    grading_artifacts = auto_grade_submission(session, submission, ocr_rows)
-
-    session.refresh(submission)
-    session.refresh(submission, attribute_names=["responses"])
-
-    responses_schema = [ResponseRead.model_validate(item) for item in grading_artifacts.responses]
-    mistakes_schema = [MistakeRead.model_validate(item) for item in grading_artifacts.mistakes]
-    ocr_schema = [OCRResult.model_validate(item) for item in ocr_rows]
-
-    combined_steps_raw = []
-    for step in ocr_steps:
-        if isinstance(step, dict):
-            combined_steps_raw.append(step)
-    for step in grading_artifacts.steps:
-        combined_steps_raw.append(step.as_dict())
-
-    normalized_steps: List[dict[str, Optional[str]]] = []
-    for raw_step in combined_steps_raw:
-        if not isinstance(raw_step, dict):
-            continue
-        name = str(raw_step.get("name") or "Processing Step")
-        status = str(raw_step.get("status") or "success").lower()
-        if status not in {"success", "warning", "error"}:
-            status = "success"
-        normalized_steps.append(
-            {
-                "name": name,
-                "status": status,
-                "detail": raw_step.get("detail"),
-            },
-        )
 
-    unique_numbers = {
-        str(row.get("question_number")).strip()
-        for row in ocr_rows
-        if isinstance(row, dict) and row.get("question_number")
-    }
-    total_questions = len(exam.questions or [])
-    matching_score: Optional[float] = None
-    if total_questions:
-        matching_score = min(1.0, len(unique_numbers) / total_questions) if unique_numbers else 0.0
+@app.post("/submissions/upload/batch")
+async def upload_submission_batch(
+    exam_id: int = Form(...),
+    student_ids: List[int] = Form(default=[]),
+    images: List[UploadFile] = File(default=[]),
+    archive: Optional[UploadFile] = File(default=None),
+    session: Session = Depends(_get_db),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """批量上传整班答题卡，按完成顺序逐行返回每份试卷的批改结果（NDJSON）。"""
+
+    # 考试与题目在此一并加载，后面各 worker 复用这份快照。
+    exam = _require_exam(session, exam_id, current_user, options=[selectinload(Exam.questions)])
+
+    sheets: List[_BatchSheet] = []
+    if archive is not None:
+        sheets.extend(_read_batch_archive(await archive.read()))
+    if images or student_ids:
+        if len(student_ids) != len(images):
+            raise HTTPException(status_code=400, detail="学生编号数量需与上传图片数量一致")
+        for student_id, upload in zip(student_ids, images):
+            sheets.append(
+                _BatchSheet(
+                    student_id=student_id,
+                    filename=upload.filename,
+                    image_bytes=await upload.read(),
+                ),
+            )
+
+    if not sheets:
+        raise HTTPException(status_code=400, detail="请至少上传一份答题卡")
+    if len(sheets) > MAX_BATCH_SHEETS:
+        raise HTTPException(status_code=400, detail=f"单次最多批量上传 {MAX_BATCH_SHEETS} 份答题卡")
+    if any(not sheet.image_bytes for sheet in sheets):
+        raise HTTPException(status_code=400, detail="上传的图片为空")
 
-    extra_metadata = submission.extra_metadata.copy() if isinstance(submission.extra_metadata, dict) else {}
-    extra_metadata.update(
-        {
-            "processing_steps": normalized_steps,
-            "matching_score": matching_score,
-        },
+    requested_ids = {sheet.student_id for sheet in sheets}
+    owned_ids = set(
+        session.exec(
+            select(Student.id).where(Student.id.in_(requested_ids), Student.owner_id == current_user.id),
+        ).all(),
     )
-    if grading_artifacts.ai_summary:
-        extra_metadata["ai_summary"] = grading_artifacts.ai_summary
-    submission.extra_metadata = extra_metadata
-    session.add(submission)
-    session.commit()
-    session.refresh(submission, attribute_names=["responses"])
+    missing_ids = sorted(requested_ids - owned_ids)
+    if missing_ids:
+        raise HTTPException(status_code=404, detail=f"未找到学生 {missing_ids[0]}")
 
-    existing_logs = session.exec(
-        select(ProcessingLog).where(ProcessingLog.submission_id == submission.id),
-    ).all()
-    for log in existing_logs:
-        session.delete(log)
-    session.flush()
+    submissions = [
+        Submission(student_id=sheet.student_id, exam_id=exam_id, owner_id=current_user.id)
+        for sheet in sheets
+    ]
+    session.add_all(submissions)
+    # 出错的答题卡也保留提交记录，汇总行在此一并计入。
+    refresh_analytics_rollups(session, exam_id)
+    # Keep the loaded exam and questions on commit; workers merge this snapshot without re-querying.
+    commit_keep_loaded(session)
+    submission_ids = [submission.id for submission in submissions]
+    session.expunge(exam)
+    bind = session.get_bind()
+
+    def result_stream() -> Iterator[str]:
+        max_workers = min(len(sheets), _batch_worker_count())
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-upload") as executor:
+            futures = [
+                executor.submit(_grade_batch_sheet, bind, exam, submission_id, index, sheet)
+                for index, (submission_id, sheet) in enumerate(zip(submission_ids, sheets))
+            ]
+            for future in as_completed(futures):
+                yield future.result().model_dump_json() + "\n"
 
-    for step in normalized_steps:
-        log = ProcessingLog(
-            submission_id=submission.id,
-            step=step["name"],
-            actor_type="system",
-            detail=step.get("detail"),
-            extra={"status": step.get("status")},
-        )
-        session.add(log)
-    if grading_artifacts.ai_summary:
-        session.add(
-            ProcessingLog(
-                submission_id=submission.id,
-                step="AI 批改摘要",
-                actor_type="assistant",
-                detail=grading_artifacts.ai_summary,
-            ),
-        )
-    session.commit()
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
 
-    submission_schema = SubmissionRead.model_validate(submission)
-    step_schemas = [ProcessingStep(**step) for step in normalized_steps]
-    log_records = session.exec(
-        select(ProcessingLog)
-        .where(ProcessingLog.submission_id == submission.id)
-        .order_by(ProcessingLog.created_at.asc()),
-    ).all()
-    log_schemas = [_serialize_processing_log(item) for item in log_records]
 
-    return SubmissionProcessingResult(
-        submission=submission_schema,
-        responses=responses_schema,
-        mistakes=mistakes_schema,
-        ocr_rows=ocr_schema,
-        processing_steps=step_schemas,
-        ai_summary=grading_artifacts.ai_summary,
-        matching_score=matching_score,
-        processing_logs=log_schemas,
-    )
+@app.get("/submissions/{submission_id}/job", response_model=SubmissionJobRead)
+def get_submission_job(
+    submission_id: int,
+    session: Session = Depends(_get_db),
+    current_user: User = Depends(get_current_user),
+) -> SubmissionJobRead:
+    submission = _require_submission(session, submission_id, current_user)
+    if get_job_state(submission) is None:
+        raise HTTPException(status_code=404, detail="该提交记录不是异步批改任务")
+    return _build_submission_job_schema(session, submission)
 
 
 @app.get("/submissions/{submission_id}/logs", response_model=ProcessingLogList)
@@ -971,6 +1392,7 @@ def update_manual_score(
     ]
     submission.total_score = sum(scored) if scored else submission.total_score
     session.add(submission)
+    refresh_analytics_rollups(session, submission.exam_id)
     session.commit()
 
     log_entry = ProcessingLog(
@@ -1193,8 +1615,6 @@ def list_practice_assignments(
         stmt = stmt.where(PracticeAssignment.student_id == student_id)
     stmt = stmt.order_by(PracticeAssignment.scheduled_for.desc())
     assignments = session.exec(stmt).all()
-    for assignment in assignments:
-        session.refresh(assignment, attribute_names=["items"])
     return [PracticeAssignmentRead.model_validate(item) for item in assignments]
 
 
@@ -1349,6 +1769,7 @@ def clear_all_data() -> dict[str, str]:
 
     _cleanup_generated_assets()
     reset_database()
+    clear_user_cache()
     return {"message": "所有数据已清空"}
 
 
@@ -1358,6 +1779,7 @@ def refresh_demo_data() -> dict[str, object]:
 
     _cleanup_generated_assets()
     reset_database()
+    clear_user_cache()
     with Session(engine) as session:
         teacher, classroom, students, exam = ensure_demo_dataset(session)
     return _build_demo_payload(teacher, classroom, students, exam, "演示数据已重新生成")
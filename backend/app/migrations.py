@@ -0,0 +1,226 @@
+"""版本化的数据库迁移。
+
+每个迁移有递增的版本号，执行后写入 ``schemamigration`` 表。启动时先查询已应用的最高版本，
+已是最新则直接返回；否则在迁移锁内（SQLite 为 ``BEGIN IMMEDIATE`` 写锁，PostgreSQL 为
+事务级 advisory lock）重新读取版本并按顺序执行尚未应用的迁移。多个进程同时启动时只有一个执行，
+其余等锁释放后发现已是最新版本即返回。
+
+新增表或列时在 ``MIGRATIONS`` 末尾追加一项，不要修改已发布的迁移。
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Set, Tuple
+
+from sqlalchemy import func, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel
+
+from .models import SchemaMigration
+from .services.cache import read_int_env
+from .services.knowledge import backfill_question_knowledge_tags
+from .services.mistakes import merge_duplicate_mistakes
+
+# PostgreSQL advisory lock 的键，任意固定的 64 位整数即可。
+MIGRATION_LOCK_KEY = 724_0511_2024
+
+
+def _column_names(connection: Connection, table: str) -> Set[str]:
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+
+def ensure_indexes(connection: Connection) -> List[str]:
+    """补建模型中声明但库里尚不存在的索引（``create_all`` 不会给已有表加索引），返回新建的索引名。"""
+
+    inspector = inspect(connection)
+    created: List[str] = []
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda item: item.name):
+            if index.name not in existing:
+                index.create(connection)
+                created.append(index.name)
+    return created
+
+
+def _create_tables_and_legacy_columns(connection: Connection) -> None:
+    """建表，并为早期版本创建的库补充后来新增的字段。"""
+
+    SQLModel.metadata.create_all(connection)
+
+    question_columns = _column_names(connection, "question")
+    if "target_student_ids" not in question_columns:
+        connection.exec_driver_sql("ALTER TABLE question ADD COLUMN target_student_ids JSON")
+    if "answer_status" not in question_columns:
+        connection.exec_driver_sql("ALTER TABLE question ADD COLUMN answer_status VARCHAR DEFAULT 'draft'")
+        connection.exec_driver_sql(
+            "UPDATE question SET answer_status = 'draft' WHERE answer_status IS NULL",
+        )
+    if "answer_confidence" not in question_columns:
+        connection.exec_driver_sql("ALTER TABLE question ADD COLUMN answer_confidence FLOAT")
+
+    response_columns = _column_names(connection, "response")
+    if "applies_to_student" not in response_columns:
+        connection.exec_driver_sql(
+            "ALTER TABLE response ADD COLUMN applies_to_student BOOLEAN DEFAULT TRUE",
+        )
+        connection.exec_driver_sql(
+            "UPDATE response SET applies_to_student = TRUE WHERE applies_to_student IS NULL",
+        )
+    if "ai_confidence" not in response_columns:
+        connection.exec_driver_sql("ALTER TABLE response ADD COLUMN ai_confidence FLOAT")
+    if "review_status" not in response_columns:
+        connection.exec_driver_sql(
+            "ALTER TABLE response ADD COLUMN review_status VARCHAR DEFAULT 'pending'",
+        )
+        connection.exec_driver_sql(
+            "UPDATE response SET review_status = 'pending' WHERE review_status IS NULL",
+        )
+    if "teacher_comment" not in response_columns:
+        connection.exec_driver_sql("ALTER TABLE response ADD COLUMN teacher_comment TEXT")
+    if "ai_raw" not in response_columns:
+        connection.exec_driver_sql("ALTER TABLE response ADD COLUMN ai_raw JSON")
+
+    exam_columns = _column_names(connection, "exam")
+    if "source_image_path" not in exam_columns:
+        connection.exec_driver_sql("ALTER TABLE exam ADD COLUMN source_image_path TEXT")
+    if "parsed_outline" not in exam_columns:
+        connection.exec_driver_sql("ALTER TABLE exam ADD COLUMN parsed_outline JSON")
+    if "owner_id" not in exam_columns:
+        connection.exec_driver_sql("ALTER TABLE exam ADD COLUMN owner_id INTEGER")
+
+    submission_columns = _column_names(connection, "submission")
+    if "session_id" not in submission_columns:
+        connection.exec_driver_sql("ALTER TABLE submission ADD COLUMN session_id INTEGER")
+    if "overall_confidence" not in submission_columns:
+        connection.exec_driver_sql("ALTER TABLE submission ADD COLUMN overall_confidence FLOAT")
+    if "status_detail" not in submission_columns:
+        connection.exec_driver_sql("ALTER TABLE submission ADD COLUMN status_detail TEXT")
+    if "ai_trace_id" not in submission_columns:
+        connection.exec_driver_sql("ALTER TABLE submission ADD COLUMN ai_trace_id TEXT")
+    if "owner_id" not in submission_columns:
+        connection.exec_driver_sql("ALTER TABLE submission ADD COLUMN owner_id INTEGER")
+
+    mistake_columns = _column_names(connection, "mistake")
+    if "error_count" not in mistake_columns:
+        connection.exec_driver_sql("ALTER TABLE mistake ADD COLUMN error_count INTEGER DEFAULT 1")
+        connection.exec_driver_sql("UPDATE mistake SET error_count = COALESCE(error_count, 1)")
+    if "data_status" not in mistake_columns:
+        connection.exec_driver_sql("ALTER TABLE mistake ADD COLUMN data_status VARCHAR DEFAULT 'complete'")
+        connection.exec_driver_sql(
+            "UPDATE mistake SET data_status = COALESCE(data_status, 'complete')",
+        )
+    if "root_cause" not in mistake_columns:
+        connection.exec_driver_sql("ALTER TABLE mistake ADD COLUMN root_cause TEXT")
+
+    teacher_columns = _column_names(connection, "teacher")
+    if "owner_id" not in teacher_columns:
+        connection.exec_driver_sql("ALTER TABLE teacher ADD COLUMN owner_id INTEGER")
+
+    student_columns = _column_names(connection, "student")
+    if "owner_id" not in student_columns:
+        connection.exec_driver_sql("ALTER TABLE student ADD COLUMN owner_id INTEGER")
+
+    classroom_columns = _column_names(connection, "classroom")
+    if "owner_id" not in classroom_columns:
+        connection.exec_driver_sql("ALTER TABLE classroom ADD COLUMN owner_id INTEGER")
+
+    grading_session_columns = _column_names(connection, "gradingsession")
+    if "owner_id" not in grading_session_columns:
+        connection.exec_driver_sql("ALTER TABLE gradingsession ADD COLUMN owner_id INTEGER")
+
+    practice_assignment_columns = _column_names(connection, "practiceassignment")
+    if "owner_id" not in practice_assignment_columns:
+        connection.exec_driver_sql("ALTER TABLE practiceassignment ADD COLUMN owner_id INTEGER")
+
+    backfill_question_knowledge_tags(connection)
+
+
+def _merge_mistakes_and_create_indexes(connection: Connection) -> None:
+    # 错题 (student_id, question_id) 唯一索引创建前先合并历史重复记录。
+    merge_duplicate_mistakes(connection)
+    ensure_indexes(connection)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "create tables and add legacy columns", _create_tables_and_legacy_columns),
+    (2, "merge duplicate mistakes and create lookup indexes", _merge_mistakes_and_create_indexes),
+]
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def _applied_versions(connection: Connection) -> Set[int]:
+    if not inspect(connection).has_table(SchemaMigration.__tablename__):
+        return set()
+    return set(connection.execute(select(SchemaMigration.version)).scalars())
+
+
+def current_schema_version(engine: Engine) -> int:
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(SchemaMigration.__tablename__):
+            return 0
+        return int(connection.execute(select(func.max(SchemaMigration.version))).scalar() or 0)
+
+
+def _begin_immediate(connection: Connection) -> None:
+    # 每次尝试最多等待 busy_timeout；另一进程迁移较慢时继续重试，直到超过总等待时间。
+    deadline = time.monotonic() + read_int_env("MIGRATION_LOCK_TIMEOUT", 120)
+    while True:
+        try:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            return
+        except OperationalError as exc:
+            if "locked" not in str(exc).lower() or time.monotonic() >= deadline:
+                raise
+            time.sleep(0.1)
+
+
+@contextmanager
+def migration_lock(engine: Engine) -> Iterator[Connection]:
+    """在持有迁移锁的事务中执行代码块，正常退出时提交。"""
+
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            # 由本函数显式控制事务，才能用 BEGIN IMMEDIATE 一开始就拿到写锁。
+            connection.execution_options(isolation_level="AUTOCOMMIT")
+            _begin_immediate(connection)
+            try:
+                yield connection
+            except BaseException:
+                connection.exec_driver_sql("ROLLBACK")
+                raise
+            connection.exec_driver_sql("COMMIT")
+        return
+
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        yield connection
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """执行尚未应用的迁移，返回本次执行的版本号。"""
+
+    if current_schema_version(engine) >= LATEST_SCHEMA_VERSION:
+        return []
+
+    applied_now: List[int] = []
+    with migration_lock(engine) as connection:
+        # 等锁期间其他进程可能已完成迁移，持锁后重新读取。
+        applied = _applied_versions(connection)
+        SchemaMigration.__table__.create(connection, checkfirst=True)
+        for version, name, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            migrate(connection)
+            connection.execute(
+                insert(SchemaMigration).values(version=version, name=name, applied_at=datetime.utcnow()),
+            )
+            applied_now.append(version)
+    return applied_now
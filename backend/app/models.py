@@ -4,7 +4,7 @@ from datetime import date, datetime
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy import Column, Float, JSON, String
+from sqlalchemy import Column, Float, Index, JSON, String
 from sqlalchemy.orm import relationship
 from sqlmodel import Field, Relationship, SQLModel
 
@@ -21,6 +21,13 @@ class SubmissionStatus(str, Enum):
     needs_review = "needs_review"
 
 
+class SubmissionJobState(str, Enum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
 class ResponseReviewStatus(str, Enum):
     pending = "pending"
     confirmed = "confirmed"
@@ -213,8 +220,8 @@ class Classroom(SQLModel, table=True):
 
 class ClassEnrollment(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    classroom_id: int = Field(foreign_key="classroom.id")
-    student_id: int = Field(foreign_key="student.id")
+    classroom_id: int = Field(foreign_key="classroom.id", index=True)
+    student_id: int = Field(foreign_key="student.id", index=True)
 
     classroom: Optional["Classroom"] = Relationship(
         back_populates="enrollments",
@@ -232,7 +239,7 @@ class Exam(SQLModel, table=True):
     subject: Optional[str] = Field(default=None, index=True)
     scheduled_date: Optional[date] = None
     teacher_id: int = Field(foreign_key="teacher.id")
-    classroom_id: Optional[int] = Field(default=None, foreign_key="classroom.id")
+    classroom_id: Optional[int] = Field(default=None, foreign_key="classroom.id", index=True)
     owner_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
     answer_key_version: int = Field(default=1)
     source_image_path: Optional[str] = None
@@ -263,7 +270,7 @@ class Exam(SQLModel, table=True):
 
 class Question(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    exam_id: int = Field(foreign_key="exam.id")
+    exam_id: int = Field(foreign_key="exam.id", index=True)
     number: str = Field(index=True)
     type: QuestionType = Field(default=QuestionType.multiple_choice, index=True)
     prompt: Optional[str] = None
@@ -292,11 +299,30 @@ class Question(SQLModel, table=True):
     )
 
 
+class KnowledgeTag(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+    normalized_name: str = Field(index=True, unique=True)
+
+
+class QuestionKnowledgeTag(SQLModel, table=True):
+    """题目与知识点标签的关联表，由 ``Question.knowledge_tags`` 同步生成。"""
+
+    question_id: int = Field(foreign_key="question.id", primary_key=True)
+    tag_id: int = Field(foreign_key="knowledgetag.id", primary_key=True, index=True)
+
+
 class Submission(SQLModel, table=True):
+    # 列表与历史按 (owner_id, submitted_at) 过滤并排序；分析按考试取分数并排序求分位数。
+    __table_args__ = (
+        Index("ix_submission_owner_submitted_at", "owner_id", "submitted_at"),
+        Index("ix_submission_exam_total_score", "exam_id", "total_score"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    student_id: int = Field(foreign_key="student.id")
+    student_id: int = Field(foreign_key="student.id", index=True)
     exam_id: int = Field(foreign_key="exam.id")
-    submitted_at: datetime = Field(default_factory=datetime.utcnow)
+    submitted_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     owner_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
     total_score: Optional[float] = None
     status: SubmissionStatus = Field(default=SubmissionStatus.pending, index=True)
@@ -331,20 +357,20 @@ class Submission(SQLModel, table=True):
 
 class Response(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    submission_id: int = Field(foreign_key="submission.id")
-    question_id: int = Field(foreign_key="question.id")
+    submission_id: int = Field(foreign_key="submission.id", index=True)
+    question_id: int = Field(foreign_key="question.id", index=True)
     student_answer: Optional[str] = None
     normalized_answer: Optional[str] = None
     score: Optional[float] = None
     is_correct: Optional[bool] = None
     ocr_confidence: Optional[float] = None
-    teacher_annotation: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    teacher_annotation: Optional[dict] = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
     comments: Optional[str] = None
     applies_to_student: bool = Field(default=True, index=True)
     ai_confidence: Optional[float] = None
     review_status: ResponseReviewStatus = Field(default=ResponseReviewStatus.pending, index=True)
     teacher_comment: Optional[str] = None
-    ai_raw: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    ai_raw: Optional[dict] = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
 
     submission: Optional["Submission"] = Relationship(
         back_populates="responses",
@@ -361,10 +387,15 @@ class Response(SQLModel, table=True):
 
 
 class Mistake(SQLModel, table=True):
+    # 每个学生每道题只保留一条错题记录；该索引同时覆盖按学生查询。
+    __table_args__ = (
+        Index("uq_mistake_student_question", "student_id", "question_id", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     student_id: int = Field(foreign_key="student.id")
-    response_id: int = Field(foreign_key="response.id")
-    question_id: int = Field(foreign_key="question.id")
+    response_id: int = Field(foreign_key="response.id", index=True)
+    question_id: int = Field(foreign_key="question.id", index=True)
     knowledge_tags: Optional[str] = None
     misconception_label: Optional[str] = None
     resolution_notes: Optional[str] = None
@@ -387,7 +418,7 @@ class Mistake(SQLModel, table=True):
 
 class PracticeAssignment(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    student_id: int = Field(foreign_key="student.id")
+    student_id: int = Field(foreign_key="student.id", index=True)
     scheduled_for: date = Field(default_factory=date.today)
     due_date: Optional[date] = None
     status: PracticeStatus = Field(default=PracticeStatus.scheduled, index=True)
@@ -411,7 +442,7 @@ class PracticeAssignment(SQLModel, table=True):
 
 class PracticeItem(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    assignment_id: int = Field(foreign_key="practiceassignment.id")
+    assignment_id: int = Field(foreign_key="practiceassignment.id", index=True)
     question_id: int = Field(foreign_key="question.id")
     source_mistake_id: Optional[int] = Field(default=None, foreign_key="mistake.id")
     order_index: int = Field(default=0)
@@ -479,3 +510,37 @@ class ProcessingLog(SQLModel, table=True):
 
 
 
+
+
+class ExamAnalyticsRollup(SQLModel, table=True):
+    """按考试预聚合的分析指标，批改与人工改分时在同一事务内刷新。"""
+
+    exam_id: int = Field(foreign_key="exam.id", primary_key=True)
+    submission_count: int = Field(default=0)
+    student_count: int = Field(default=0)
+    scored_count: int = Field(default=0)
+    score_sum: float = Field(default=0.0)
+    score_histogram: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    tag_stats: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ClassroomAnalyticsRollup(SQLModel, table=True):
+    """按班级汇总的分析指标，由该班级各考试的 ``ExamAnalyticsRollup`` 合并而成。"""
+
+    classroom_id: int = Field(foreign_key="classroom.id", primary_key=True)
+    submission_count: int = Field(default=0)
+    student_count: int = Field(default=0)
+    scored_count: int = Field(default=0)
+    score_sum: float = Field(default=0.0)
+    score_histogram: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    tag_stats: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class SchemaMigration(SQLModel, table=True):
+    """已应用的数据库迁移版本，由 ``migrations.run_migrations`` 写入。"""
+
+    version: int = Field(primary_key=True)
+    name: str
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
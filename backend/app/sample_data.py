@@ -6,6 +6,7 @@ from sqlmodel import Session, select
 
 from .database import engine, init_db
 from .models import ClassEnrollment, Classroom, Exam, Question, QuestionType, Student, Teacher, User
+from .services.knowledge import sync_question_knowledge_tags
 
 
 def ensure_teacher(session: Session, name: str, email: str) -> Teacher:
@@ -119,6 +120,8 @@ def ensure_exam(session: Session, teacher: Teacher, classroom: Classroom) -> Exa
     ]
 
     session.add_all(questions)
+    session.flush()
+    sync_question_knowledge_tags(session, questions)
     session.commit()
     session.refresh(exam, attribute_names=["questions"])
     return exam
@@ -217,6 +220,8 @@ def create_demo_dataset_for_user(session: Session, user: User) -> dict[str, obje
         ),
     ]
     session.add_all(questions)
+    session.flush()
+    sync_question_knowledge_tags(session, questions)
     session.commit()
     session.refresh(exam, attribute_names=["questions"])
 
@@ -12,6 +12,7 @@ from .models import (
     QuestionType,
     ResponseReviewStatus,
     SessionStatus,
+    SubmissionJobState,
     SubmissionStatus,
 )
 
@@ -180,6 +181,19 @@ class ExamRead(ExamBase):
         from_attributes = True
 
 
+class ExamSummary(BaseModel):
+    """考试列表默认返回的精简字段，不含解析大纲与题目答案。"""
+
+    id: int
+    title: str
+    subject: Optional[str] = None
+    scheduled_date: Optional[date] = None
+    teacher_id: int
+    classroom_id: Optional[int] = None
+    answer_key_version: int
+    question_count: int = 0
+
+
 class ExamDraftResponse(BaseModel):
     source_image_path: str
     outline: Dict[str, Any]
@@ -351,6 +365,7 @@ class PracticeAssignmentRead(BaseModel):
 class AnalyticsFilter(BaseModel):
     classroom_id: Optional[int] = None
     exam_id: Optional[int] = None
+    grade_level: Optional[str] = None
     knowledge_tags: Optional[List[str]] = None
     start_date: Optional[date] = None
     end_date: Optional[date] = None
@@ -364,11 +379,21 @@ class KnowledgePointBreakdown(BaseModel):
     average_score: float
 
 
+class ScoreBucket(BaseModel):
+    lower: float
+    upper: float
+    count: int
+
+
 class AnalyticsSummary(BaseModel):
     total_students: int
     total_submissions: int
     average_score: float
     median_score: float
+    p25_score: float = 0.0
+    p75_score: float = 0.0
+    p90_score: float = 0.0
+    score_distribution: List[ScoreBucket] = Field(default_factory=list)
     knowledge_breakdown: List[KnowledgePointBreakdown]
 
 
@@ -421,6 +446,25 @@ class SubmissionProcessingResult(BaseModel):
     processing_logs: Optional[List[ProcessingLogRead]] = None
 
 
+class BatchSheetResult(BaseModel):
+    index: int
+    student_id: int
+    filename: Optional[str] = None
+    status: ProcessingStepStatus
+    detail: Optional[str] = None
+    result: Optional[SubmissionProcessingResult] = None
+
+
+class SubmissionJobRead(BaseModel):
+    job_id: int
+    submission_id: int
+    state: SubmissionJobState
+    detail: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    submission: SubmissionRead
+    processing_logs: List[ProcessingLogRead] = Field(default_factory=list)
+
+
 class ManualScoreUpdate(BaseModel):
     response_id: int
     new_score: float
@@ -486,6 +530,18 @@ class LLMConfigStatus(BaseModel):
     available: bool
 
 
+class WarmupComponentRead(BaseModel):
+    name: str
+    status: str
+    detail: Optional[str] = None
+    duration_ms: Optional[float] = None
+
+
+class ReadinessRead(BaseModel):
+    ready: bool
+    components: List[WarmupComponentRead] = Field(default_factory=list)
+
+
 class SubmissionHistoryEntry(BaseModel):
     submission: SubmissionRead
     student: StudentRead
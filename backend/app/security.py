@@ -8,10 +8,12 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import event
 from sqlmodel import Session, select
 
-from .database import get_session
+from .database import get_db
 from .models import User
+from .services.cache import MemoryLRUCache, read_int_env
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -21,6 +23,23 @@ SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "change-me-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("AUTH_ACCESS_TOKEN_EXPIRE_MINUTES", "720"))
 
+# 已认证用户的短期快照（用户 id -> 列值），命中时鉴权不查数据库；设为 0 关闭。
+USER_CACHE_TTL_SECONDS = read_int_env("AUTH_USER_CACHE_TTL", 30)
+_user_cache = MemoryLRUCache(ttl_seconds=USER_CACHE_TTL_SECONDS, max_entries=read_int_env("AUTH_USER_CACHE_SIZE", 1024))
+
+
+def clear_user_cache() -> None:
+    _user_cache.clear()
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User) -> None:  # noqa: ARG001
+    # 新建用户也要失效：数据库重置后主键可能被复用。
+    if target.id is not None:
+        _user_cache.delete(str(target.id))
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -46,7 +65,24 @@ def authenticate_user(session: Session, email: str, password: str) -> Optional[U
     return user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+def _load_user(session: Session, user_id: int) -> Optional[User]:
+    """按 id 取用户，返回不绑定会话的副本；缓存未命中时用请求自身的会话查询。"""
+
+    snapshot = _user_cache.get(str(user_id)) if USER_CACHE_TTL_SECONDS > 0 else None
+    if snapshot is None:
+        user = session.get(User, user_id)
+        if user is None:
+            return None
+        snapshot = user.model_dump()
+        if USER_CACHE_TTL_SECONDS > 0:
+            _user_cache.set(str(user_id), snapshot)
+    return User(**snapshot)
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    session: Session = Depends(get_db),
+) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -59,8 +95,7 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
             raise credentials_exception
     except JWTError as exc:  # pragma: no cover
         raise credentials_exception from exc
-    with get_session() as session:
-        user = session.get(User, int(user_id))
-        if user is None:
-            raise credentials_exception
-        return user
+    user = _load_user(session, int(user_id))
+    if user is None:
+        raise credentials_exception
+    return user
@@ -1,84 +1,188 @@
 ﻿from __future__ import annotations
 
-from collections import defaultdict
-from statistics import median
 from typing import Dict, Iterable, List, Optional
 
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Integer, case, cast, func
 from sqlmodel import Session, select
 
-from ..models import Exam, Question, Response, Submission
-from ..schemas import AnalyticsFilter, AnalyticsSummary, KnowledgePointBreakdown
+from ..models import (
+    Classroom,
+    ClassroomAnalyticsRollup,
+    Exam,
+    ExamAnalyticsRollup,
+    KnowledgeTag,
+    Question,
+    QuestionKnowledgeTag,
+    Response,
+    Submission,
+)
+from ..schemas import AnalyticsFilter, AnalyticsSummary, KnowledgePointBreakdown, ScoreBucket
+from .knowledge import UNSPECIFIED_TAG
+from .sketches import ScoreSketch
 
+REPORTED_QUANTILES = {"p25_score": 0.25, "median_score": 0.5, "p75_score": 0.75, "p90_score": 0.9}
 
-def _response_iterable(submissions: Iterable[Submission]) -> Iterable[Response]:
-    for submission in submissions:
-        for response in submission.responses:
-            yield response
-
-
-def build_analytics(session: Session, filters: AnalyticsFilter) -> AnalyticsSummary:
-    stmt = (
-        select(Submission)
-        .options(
-            selectinload(Submission.responses).selectinload(Response.question),
-            selectinload(Submission.student),
-            selectinload(Submission.exam),
-        )
-    )
 
+def _submission_conditions(filters: AnalyticsFilter) -> List:
+    conditions = []
     if filters.exam_id is not None:
-        stmt = stmt.where(Submission.exam_id == filters.exam_id)
+        conditions.append(Submission.exam_id == filters.exam_id)
     if filters.start_date is not None:
-        stmt = stmt.where(Submission.submitted_at >= filters.start_date)
+        conditions.append(Submission.submitted_at >= filters.start_date)
     if filters.end_date is not None:
-        stmt = stmt.where(Submission.submitted_at <= filters.end_date)
+        conditions.append(Submission.submitted_at <= filters.end_date)
     if filters.classroom_id is not None:
-        stmt = stmt.join(Exam).where(Exam.classroom_id == filters.classroom_id)
-
-    submissions = session.exec(stmt).all()
-
-    total_students = len({submission.student_id for submission in submissions})
-    total_submissions = len(submissions)
-
-    scored = [
-        submission.total_score
-        for submission in submissions
-        if submission.total_score is not None
-    ]
-    average_score = sum(scored) / len(scored) if scored else 0.0
-    median_score = median(scored) if scored else 0.0
-
-    breakdown: Dict[str, Dict[str, float]] = defaultdict(lambda: {
-        "total_attempts": 0,
-        "incorrect_count": 0,
-        "score_sum": 0.0,
-        "question_count": 0,
-    })
-
-    for response in _response_iterable(submissions):
-        if response.applies_to_student is False:
-            continue
-        question: Question = response.question
-        tags = (question.knowledge_tags or "Unspecified").split(",")
-        tags = [tag.strip() or "Unspecified" for tag in tags]
-        for tag in tags:
-            data = breakdown[tag]
-            data["total_attempts"] += 1
-            if response.is_correct is False:
-                data["incorrect_count"] += 1
-            if response.score is not None:
-                data["score_sum"] += response.score
-            data["question_count"] += 1
+        conditions.append(
+            Submission.exam_id.in_(select(Exam.id).where(Exam.classroom_id == filters.classroom_id)),
+        )
+    if filters.grade_level is not None:
+        conditions.append(
+            Submission.exam_id.in_(
+                select(Exam.id)
+                .join(Classroom, Classroom.id == Exam.classroom_id)
+                .where(Classroom.grade_level == filters.grade_level),
+            ),
+        )
+    return conditions
+
+
+def _score_quantile(session: Session, conditions: List, scored_count: int, q: float) -> float:
+    """只取排序后位于分位点两侧的一到两行并线性插值，避免把全部分数加载到内存。"""
+
+    if not scored_count:
+        return 0.0
+    position = q * (scored_count - 1)
+    lower = int(position)
+    fraction = position - lower
+    rows = session.exec(
+        select(Submission.total_score)
+        .where(*conditions, Submission.total_score.is_not(None))
+        .order_by(Submission.total_score)
+        .offset(lower)
+        .limit(2 if fraction else 1),
+    ).all()
+    if not rows:
+        return 0.0
+    if len(rows) == 1:
+        return rows[0]
+    return rows[0] + fraction * (rows[1] - rows[0])
+
+
+def submission_totals(session: Session, conditions: List) -> Dict[str, float]:
+    """提交数、学生数、有分数的提交数与总分之和。"""
+
+    total_submissions, total_students, scored_count, score_sum = session.exec(
+        select(
+            func.count(Submission.id),
+            func.count(func.distinct(Submission.student_id)),
+            func.count(Submission.total_score),
+            func.sum(Submission.total_score),
+        ).where(*conditions),
+    ).one()
+    return {
+        "submission_count": int(total_submissions or 0),
+        "student_count": int(total_students or 0),
+        "scored_count": int(scored_count or 0),
+        "score_sum": float(score_sum or 0.0),
+    }
+
+
+def max_possible_score(session: Session, conditions: List) -> float:
+    """筛选范围内各考试满分（题目分值之和）的最大值；实际最高分更高时取实际值。"""
+
+    exam_totals = (
+        select(func.sum(Question.max_score).label("total"))
+        .where(Question.exam_id.in_(select(Submission.exam_id).where(*conditions)))
+        .group_by(Question.exam_id)
+        .subquery()
+    )
+    exam_max = session.exec(select(func.max(exam_totals.c.total))).one()
+    observed_max = session.exec(select(func.max(Submission.total_score)).where(*conditions)).one()
+    return max(float(exam_max or 0.0), float(observed_max or 0.0))
+
+
+def score_sketch(session: Session, conditions: List, max_score: Optional[float] = None) -> ScoreSketch:
+    """在数据库中按分箱 GROUP BY 构建分数直方图，只读回每箱的计数。"""
+
+    if max_score is None:
+        max_score = max_possible_score(session, conditions)
+    sketch = ScoreSketch(max_score)
+    # 分箱序号为 round(score / bin_width)，与 ScoreSketch.index_of 一致。
+    # SQLite 的 CAST 向零截断；PostgreSQL 的 CAST 四舍五入，需先取 floor。
+    scaled = Submission.total_score / sketch.bin_width + 0.5
+    if session.get_bind().dialect.name == "postgresql":
+        scaled = func.floor(scaled)
+    bin_index = cast(scaled, Integer)
+    rows = session.exec(
+        select(bin_index, func.count(Submission.id))
+        .where(*conditions, Submission.total_score.is_not(None))
+        .group_by(bin_index),
+    ).all()
+    return ScoreSketch.from_bin_counts(sketch.max_score, rows)
+
+
+def knowledge_tag_stats(session: Session, conditions: List) -> Dict[str, Dict[str, float]]:
+    """按知识点汇总作答次数、错误次数与得分之和；无标签题目归入 Unspecified。"""
 
+    # 先按题目聚合，再经标签关联表按知识点汇总。
+    per_question = (
+        select(
+            Response.question_id.label("question_id"),
+            func.count(Response.id).label("attempts"),
+            func.sum(case((Response.is_correct.is_(False), 1), else_=0)).label("incorrect"),
+            func.sum(func.coalesce(Response.score, 0.0)).label("score_sum"),
+        )
+        .where(Response.applies_to_student.is_not(False))
+        .group_by(Response.question_id)
+    )
+    if conditions:
+        per_question = per_question.where(
+            Response.submission_id.in_(select(Submission.id).where(*conditions)),
+        )
+    per_question = per_question.subquery()
+    tag_name = func.coalesce(KnowledgeTag.name, UNSPECIFIED_TAG)
+    tag_rows = session.exec(
+        select(
+            tag_name,
+            func.sum(per_question.c.attempts),
+            func.sum(per_question.c.incorrect),
+            func.sum(per_question.c.score_sum),
+        )
+        .select_from(per_question)
+        .outerjoin(QuestionKnowledgeTag, QuestionKnowledgeTag.question_id == per_question.c.question_id)
+        .outerjoin(KnowledgeTag, KnowledgeTag.id == QuestionKnowledgeTag.tag_id)
+        .group_by(tag_name),
+    ).all()
+    return {
+        tag: {
+            "attempts": int(attempts or 0),
+            "incorrect": int(incorrect or 0),
+            "score_sum": float(score_sum or 0.0),
+        }
+        for tag, attempts, incorrect, score_sum in tag_rows
+    }
+
+
+def merge_tag_stats(
+    parts: Iterable[Optional[Dict[str, Dict[str, float]]]],
+) -> Dict[str, Dict[str, float]]:
+    merged: Dict[str, Dict[str, float]] = {}
+    for tag_stats in parts:
+        for tag, stats in (tag_stats or {}).items():
+            target = merged.setdefault(tag, {"attempts": 0, "incorrect": 0, "score_sum": 0.0})
+            target["attempts"] += int(stats.get("attempts") or 0)
+            target["incorrect"] += int(stats.get("incorrect") or 0)
+            target["score_sum"] += float(stats.get("score_sum") or 0.0)
+    return merged
+
+
+def _knowledge_breakdown(tag_stats: Dict[str, Dict[str, float]]) -> List[KnowledgePointBreakdown]:
     knowledge_breakdown = []
-    for tag, data in breakdown.items():
-        total_attempts = int(data["total_attempts"])
-        incorrect_count = int(data["incorrect_count"])
-        score_sum = float(data["score_sum"])
-        question_count = max(int(data["question_count"]), 1)
+    for tag, stats in tag_stats.items():
+        total_attempts = int(stats.get("attempts") or 0)
+        incorrect_count = int(stats.get("incorrect") or 0)
         accuracy = 1 - incorrect_count / total_attempts if total_attempts else 0.0
-        average_tag_score = score_sum / question_count if question_count else 0.0
+        average_tag_score = float(stats.get("score_sum") or 0.0) / max(total_attempts, 1)
         knowledge_breakdown.append(
             KnowledgePointBreakdown(
                 knowledge_tag=tag,
@@ -90,11 +194,91 @@ def build_analytics(session: Session, filters: AnalyticsFilter) -> AnalyticsSumm
         )
 
     knowledge_breakdown.sort(key=lambda item: item.accuracy)
+    return knowledge_breakdown
+
 
+def _summary(
+    totals: Dict[str, float],
+    sketch: ScoreSketch,
+    quantiles: Dict[str, float],
+    tag_stats: Dict[str, Dict[str, float]],
+) -> AnalyticsSummary:
+    scored_count = int(totals["scored_count"])
+    average_score = totals["score_sum"] / scored_count if scored_count else 0.0
     return AnalyticsSummary(
-        total_students=total_students,
-        total_submissions=total_submissions,
+        total_students=int(totals["student_count"]),
+        total_submissions=int(totals["submission_count"]),
         average_score=round(average_score, 2),
-        median_score=round(median_score, 2),
-        knowledge_breakdown=knowledge_breakdown,
+        score_distribution=[
+            ScoreBucket(lower=round(lower, 2), upper=round(upper, 2), count=count)
+            for lower, upper, count in sketch.distribution()
+        ],
+        knowledge_breakdown=_knowledge_breakdown(tag_stats),
+        **{name: round(value, 2) for name, value in quantiles.items()},
+    )
+
+
+def _rollup_summary(session: Session, filters: AnalyticsFilter) -> Optional[AnalyticsSummary]:
+    """单个考试、单个班级或单个年级（合并各班级汇总）且不带日期范围时直接读预聚合表。
+
+    任一所需汇总行缺失或直方图格式过旧时返回 ``None``，由调用方回退到实时聚合。
+    """
+
+    if filters.start_date is not None or filters.end_date is not None:
+        return None
+    scopes = [value for value in (filters.exam_id, filters.classroom_id, filters.grade_level) if value is not None]
+    if len(scopes) != 1:
+        return None
+
+    student_count: Optional[int] = None
+    if filters.exam_id is not None:
+        rollups = [session.get(ExamAnalyticsRollup, filters.exam_id)]
+    elif filters.classroom_id is not None:
+        rollups = [session.get(ClassroomAnalyticsRollup, filters.classroom_id)]
+    else:
+        classroom_ids = session.exec(
+            select(Classroom.id).where(Classroom.grade_level == filters.grade_level),
+        ).all()
+        rollups = session.exec(
+            select(ClassroomAnalyticsRollup).where(ClassroomAnalyticsRollup.classroom_id.in_(classroom_ids)),
+        ).all()
+        if len(rollups) != len(classroom_ids):
+            return None
+        # 同一学生可能在多个班级提交，去重人数无法由各班级计数相加得到。
+        student_count = session.exec(
+            select(func.count(func.distinct(Submission.student_id))).where(*_submission_conditions(filters)),
+        ).one()
+
+    sketches = [ScoreSketch.from_json(rollup.score_histogram) if rollup else None for rollup in rollups]
+    if any(sketch is None for sketch in sketches):
+        return None
+    sketch = ScoreSketch.merge(sketches)
+    totals = {
+        "submission_count": sum(rollup.submission_count for rollup in rollups),
+        "student_count": sum(rollup.student_count for rollup in rollups) if student_count is None else student_count,
+        "scored_count": sum(rollup.scored_count for rollup in rollups),
+        "score_sum": sum(rollup.score_sum for rollup in rollups),
+    }
+    quantiles = {name: sketch.quantile(q) for name, q in REPORTED_QUANTILES.items()}
+    return _summary(totals, sketch, quantiles, merge_tag_stats(rollup.tag_stats for rollup in rollups))
+
+
+def build_analytics(session: Session, filters: AnalyticsFilter) -> AnalyticsSummary:
+    """命中预聚合粒度时直接读汇总行；否则在数据库中用 GROUP BY 聚合，只把聚合行读回 Python。"""
+
+    summary = _rollup_summary(session, filters)
+    if summary is not None:
+        return summary
+
+    conditions = _submission_conditions(filters)
+    totals = submission_totals(session, conditions)
+    quantiles = {
+        name: _score_quantile(session, conditions, int(totals["scored_count"]), q)
+        for name, q in REPORTED_QUANTILES.items()
+    }
+    return _summary(
+        totals,
+        score_sketch(session, conditions),
+        quantiles,
+        knowledge_tag_stats(session, conditions),
     )
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional, Tuple, Union
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / "generated" / "cache.sqlite3"
+
+
+def cache_path_from_env(var_name: str = "APP_CACHE_PATH") -> Path:
+    value = os.getenv(var_name)
+    return Path(value) if value else DEFAULT_CACHE_PATH
+
+
+def read_int_env(var_name: str, fallback: int) -> int:
+    try:
+        return int(os.getenv(var_name, str(fallback)))
+    except ValueError:
+        return fallback
+
+
+def cache_enabled(var_name: str) -> bool:
+    return (os.getenv(var_name) or "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+class SQLiteCache:
+    """Persistent JSON key/value store with TTL expiry and oldest-access eviction.
+
+    Several caches can share one database file; each uses its own ``namespace``.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        namespace: str,
+        ttl_seconds: int,
+        max_entries: int,
+    ) -> None:
+        self.path = Path(path)
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # 缓存文件可能被清理（如 /bootstrap/clear 清空 generated/），每次连接都补建表。
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), timeout=5.0)
+        try:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS cache_entry ("
+                    "namespace TEXT NOT NULL, "
+                    "key TEXT NOT NULL, "
+                    "value TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, "
+                    "accessed_at REAL NOT NULL, "
+                    "PRIMARY KEY (namespace, key))",
+                )
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_cache_entry_accessed ON cache_entry (namespace, accessed_at)",
+                )
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            row = connection.execute(
+                "SELECT value, created_at FROM cache_entry WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                connection.execute(
+                    "DELETE FROM cache_entry WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                return None
+            connection.execute(
+                "UPDATE cache_entry SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entry (namespace, key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, encoded, now, now),
+            )
+            if self.ttl_seconds > 0:
+                connection.execute(
+                    "DELETE FROM cache_entry WHERE namespace = ? AND created_at < ?",
+                    (self.namespace, now - self.ttl_seconds),
+                )
+            if self.max_entries > 0:
+                connection.execute(
+                    "DELETE FROM cache_entry WHERE namespace = ? AND key NOT IN ("
+                    "SELECT key FROM cache_entry WHERE namespace = ? "
+                    "ORDER BY accessed_at DESC, rowid DESC LIMIT ?)",
+                    (self.namespace, self.namespace, self.max_entries),
+                )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "DELETE FROM cache_entry WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM cache_entry WHERE namespace = ?", (self.namespace,))
+
+
+class MemoryLRUCache:
+    """In-process LRU store with the same interface as :class:`SQLiteCache`."""
+
+    def __init__(self, *, ttl_seconds: int, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while self.max_entries > 0 and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+CacheBackend = Union[SQLiteCache, MemoryLRUCache]
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 import math
+import os
 import statistics
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar, Union
 
-from sqlmodel import Session, select
+from sqlalchemy import insert, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session, SQLModel, select
 
+from ..database import commit_keep_loaded, upsert_statement
 from ..models import (
     Mistake,
     Question,
@@ -17,7 +22,17 @@ from ..models import (
     Submission,
     SubmissionStatus,
 )
-from .llm import LLMInvocationError, LLMNotConfiguredError, score_subjective_answer, summarize_submission
+from .llm import (
+    LLMInvocationError,
+    LLMNotConfiguredError,
+    score_subjective_answer,
+    score_subjective_answers_batch,
+    summarize_submission,
+)
+from .profile import apply_mistake_stats_delta
+from .rollups import refresh_analytics_rollups
+
+DEFAULT_SUBJECTIVE_CONCURRENCY = 4
 
 
 @dataclass
@@ -120,6 +135,76 @@ def _annotation_to_score(annotation: Optional[str], question: Question) -> Optio
     return None
 
 
+def _subjective_concurrency() -> int:
+    try:
+        return max(1, int(os.getenv("SUBJECTIVE_SCORING_CONCURRENCY", str(DEFAULT_SUBJECTIVE_CONCURRENCY))))
+    except ValueError:
+        return DEFAULT_SUBJECTIVE_CONCURRENCY
+
+
+def _subjective_scoring_mode() -> str:
+    """``parallel`` (one request per answer) or ``batch`` (one request per submission)."""
+    mode = (os.getenv("SUBJECTIVE_SCORING_MODE") or "parallel").strip().lower()
+    return mode if mode in {"parallel", "batch"} else "parallel"
+
+
+def _needs_subjective_scoring(
+    submission: Submission,
+    question: Question,
+    row: Optional[Dict[str, Optional[str]]],
+) -> bool:
+    student_answer = row.get("raw_text") if row else None
+    if question.type != QuestionType.subjective or not student_answer:
+        return False
+    if question.target_student_ids and submission.student_id not in set(question.target_student_ids):
+        return False
+    annotation = row.get("annotation") if row else None
+    return _annotation_to_score(annotation, question) is None
+
+
+def _score_subjective_questions(
+    pending: List[Tuple[Question, str]],
+) -> Dict[int, Union[Dict[str, Any], Exception]]:
+    """Score subjective answers concurrently; each outcome is a result dict or the raised LLM error."""
+
+    def _score(payload: Dict[str, Any]) -> Union[Dict[str, Any], Exception]:
+        try:
+            return score_subjective_answer(**payload)
+        except (LLMNotConfiguredError, LLMInvocationError) as exc:
+            return exc
+
+    # Read ORM attributes on the calling thread; workers only see plain values.
+    payloads = {
+        question.id: {
+            "question_prompt": question.prompt or "",
+            "student_answer": student_answer,
+            "max_score": question.max_score,
+            "rubric": question.rubric,
+            "reference_answer": question.answer_key,
+        }
+        for question, student_answer in pending
+    }
+    if len(payloads) <= 1:
+        return {question_id: _score(payload) for question_id, payload in payloads.items()}
+
+    if _subjective_scoring_mode() == "batch":
+        try:
+            return score_subjective_answers_batch(
+                [{"question_id": question_id, **payload} for question_id, payload in payloads.items()],
+                max_workers=_subjective_concurrency(),
+            )
+        except LLMNotConfiguredError as exc:
+            return {question_id: exc for question_id in payloads}
+
+    max_workers = min(len(payloads), _subjective_concurrency())
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="subjective-scoring") as executor:
+        futures = {
+            question_id: executor.submit(_score, payload)
+            for question_id, payload in payloads.items()
+        }
+        return {question_id: future.result() for question_id, future in futures.items()}
+
+
 def auto_grade_submission(
     session: Session,
     submission: Submission,
@@ -132,8 +217,16 @@ def auto_grade_submission(
         str(row.get("question_number")): row for row in question_rows
     }
 
+    subjective_outcomes = _score_subjective_questions(
+        [
+            (question, str(row_map[str(number)].get("raw_text")))
+            for number, question in question_map.items()
+            if _needs_subjective_scoring(submission, question, row_map.get(str(number)))
+        ],
+    )
+
     responses: List[Response] = []
-    mistakes: List[Mistake] = []
+    graded: List[Tuple[Question, Response]] = []
     steps: List[PipelineStep] = []
     total_scores: List[float] = []
     summary_payload: List[Dict[str, Any]] = []
@@ -158,8 +251,6 @@ def auto_grade_submission(
         if not applies_to_student:
             response.applies_to_student = False
             response.comments = "定向错题巩固题，系统已自动跳过评分。"
-            session.add(response)
-            session.flush()
             responses.append(response)
             continue
 
@@ -180,15 +271,8 @@ def auto_grade_submission(
                 response.score = derived_score
                 response.is_correct = math.isclose(derived_score, question.max_score)
             elif question.type == QuestionType.subjective and student_answer:
-                try:
-                    llm_result = score_subjective_answer(
-                        question_prompt=question.prompt or "",
-                        student_answer=student_answer,
-                        max_score=question.max_score,
-                        rubric=question.rubric,
-                        reference_answer=question.answer_key,
-                    )
-                except LLMNotConfiguredError:
+                llm_result = subjective_outcomes.get(question.id)
+                if isinstance(llm_result, LLMNotConfiguredError):
                     steps.append(
                         PipelineStep(
                             name="AI 主观题评分",
@@ -199,12 +283,12 @@ def auto_grade_submission(
                     response.score = None
                     response.is_correct = None
                     submission.status = SubmissionStatus.needs_review
-                except LLMInvocationError as exc:
+                elif isinstance(llm_result, Exception) or llm_result is None:
                     steps.append(
                         PipelineStep(
                             name="AI 主观题评分",
                             status="error",
-                            detail=f"调用失败：{exc}",
+                            detail=f"调用失败：{llm_result}",
                         ),
                     )
                     response.score = None
@@ -233,13 +317,8 @@ def auto_grade_submission(
         if response.score is not None:
             total_scores.append(response.score)
 
-        session.add(response)
-        session.flush()
         responses.append(response)
-
-        _sync_mistake_record(session, submission, question, response)
-        if response.mistake:
-            mistakes.append(response.mistake)
+        graded.append((question, response))
 
         summary_payload.append(
             {
@@ -252,7 +331,19 @@ def auto_grade_submission(
             },
         )
 
-    session.commit()
+    # 作答一次性批量写入以取得主键，错题再按预取结果批量新增/更新。
+    responses = _bulk_insert(session, Response, responses, key="question_id")
+    persisted = {response.question_id: response for response in responses}
+    graded = [(question, persisted[question.id]) for question, _ in graded]
+    mistake_changes = _sync_mistake_records(session, submission, graded)
+    mistakes = [mistake for outcome, mistake in mistake_changes if outcome != "resolved"]
+    if mistake_changes:
+        apply_mistake_stats_delta(
+            session,
+            submission.student_id,
+            created=[mistake for outcome, mistake in mistake_changes if outcome == "created"],
+            seen_at=max(mistake.last_seen_at for _, mistake in mistake_changes),
+        )
 
     if total_scores:
         submission.total_score = sum(total_scores)
@@ -262,10 +353,9 @@ def auto_grade_submission(
         submission.total_score = None
 
     session.add(submission)
-    session.commit()
-
-    for response in responses:
-        session.refresh(response)
+    refresh_analytics_rollups(session, submission.exam_id)
+    # 作答与错题的字段均由 RETURNING 或预取填充，提交后无需逐行重新加载。
+    commit_keep_loaded(session)
 
     ai_summary: Optional[str] = None
     try:
@@ -300,41 +390,136 @@ def auto_grade_submission(
     return GradingArtifacts(responses=responses, mistakes=mistakes, steps=steps, ai_summary=ai_summary)
 
 
-def _sync_mistake_record(
+def _sync_mistake_records(
     session: Session,
     submission: Submission,
-    question: Question,
-    response: Response,
-) -> None:
-    if not response.applies_to_student:
-        return
-
-    existing_stmt = select(Mistake).where(
-        Mistake.student_id == submission.student_id,
-        Mistake.question_id == question.id,
+    graded: List[Tuple[Question, Response]],
+) -> List[Tuple[str, Mistake]]:
+    """同步错题本记录，返回发生变化的 (``created`` / ``updated`` / ``resolved``, 错题) 列表。
+
+    该学生在这些题目上的已有错题一次查询预取；新增错题用一条多值 INSERT 写入，
+    已有错题按主键批量 UPDATE。作答需已写入并取得主键。
+    """
+
+    question_ids = [question.id for question, _ in graded]
+    existing: Dict[int, Mistake] = {}
+    if question_ids:
+        for mistake in session.exec(
+            select(Mistake)
+            .where(
+                Mistake.student_id == submission.student_id,
+                Mistake.question_id.in_(question_ids),
+            )
+            .order_by(Mistake.id),
+        ).all():
+            existing.setdefault(mistake.question_id, mistake)
+
+    now = datetime.utcnow()
+    changes: List[Tuple[str, Mistake]] = []
+    created: List[Mistake] = []
+    updates: List[Tuple[Mistake, Dict[str, Any]]] = []
+    for question, response in graded:
+        mistake = existing.get(question.id)
+        if response.is_correct is False:
+            if mistake:
+                updates.append(
+                    (
+                        mistake,
+                        {
+                            "response_id": response.id,
+                            "last_seen_at": now,
+                            "times_practiced": mistake.times_practiced or 0,
+                        },
+                    ),
+                )
+                changes.append(("updated", mistake))
+            else:
+                mistake = Mistake(
+                    student_id=submission.student_id,
+                    response_id=response.id,
+                    question_id=question.id,
+                    knowledge_tags=question.knowledge_tags,
+                    created_at=now,
+                    last_seen_at=now,
+                )
+                created.append(mistake)
+                changes.append(("created", mistake))
+        elif response.is_correct is True and mistake:
+            updates.append((mistake, {"resolution_notes": "Mastered on latest attempt", "last_seen_at": now}))
+            changes.append(("resolved", mistake))
+
+    _bulk_update(session, Mistake, updates)
+    persisted = dict(zip(map(id, created), _upsert_mistakes(session, created)))
+    results: List[Tuple[str, Mistake]] = []
+    for outcome, mistake in changes:
+        stored = persisted.get(id(mistake), mistake)
+        # 预取之后并发的批改已为同一题建了错题，本次按再次出错计入（error_count 已累加）。
+        if outcome == "created" and stored.error_count > 1:
+            outcome = "updated"
+        results.append((outcome, stored))
+    return results
+
+
+def _upsert_mistakes(session: Session, mistakes: List[Mistake]) -> List[Mistake]:
+    """按 (学生, 题目) 唯一键 ``INSERT ... ON CONFLICT DO UPDATE`` 写入新错题，返回按输入顺序排列的行。
+
+    预取与写入之间其他事务（重复上传、同一压缩包中同一学生的两份答卷）可能已插入同一错题；
+    冲突时改为更新作答与时间并累加 ``error_count``，而不是触发唯一约束错误使整份批改失败。
+    """
+
+    if not mistakes:
+        return []
+    stmt = upsert_statement(
+        session,
+        Mistake,
+        [mistake.model_dump(exclude={"id"}) for mistake in mistakes],
+        index_elements=["student_id", "question_id"],
+        update_columns=["response_id", "last_seen_at"],
+        increment_columns=["error_count"],
     )
-    existing_mistake = session.exec(existing_stmt).first()
+    # 同一批内题目互不相同；SQLite 不保证 RETURNING 的行序，按题目对齐。
+    by_question = {
+        mistake.question_id: mistake
+        for mistake in session.scalars(
+            stmt.returning(Mistake),
+            execution_options={"populate_existing": True},
+        ).all()
+    }
+    return [by_question[mistake.question_id] for mistake in mistakes]
 
-    if response.is_correct is False:
-        if existing_mistake:
-            existing_mistake.response_id = response.id
-            existing_mistake.last_seen_at = datetime.utcnow()
-            existing_mistake.times_practiced = existing_mistake.times_practiced or 0
-        else:
-            existing_mistake = Mistake(
-                student_id=submission.student_id,
-                response_id=response.id,
-                question_id=question.id,
-                knowledge_tags=question.knowledge_tags,
-            )
-            session.add(existing_mistake)
-        response.mistake = existing_mistake
-    elif response.is_correct is True and existing_mistake:
-        existing_mistake.resolution_notes = "Mastered on latest attempt"
-        existing_mistake.last_seen_at = datetime.utcnow()
-        session.add(existing_mistake)
-
-    session.flush()
+
+ModelT = TypeVar("ModelT", bound=SQLModel)
+
+
+def _bulk_insert(session: Session, model: Type[ModelT], objects: List[ModelT], *, key: str) -> List[ModelT]:
+    """用一条 ``INSERT ... RETURNING`` 写入多行，返回按输入顺序排列、字段已填充的持久化对象。
+
+    SQLite 不保证 RETURNING 的行序，按 ``key``（批内唯一）对齐；``render_nulls`` 让各行参数
+    结构一致，才能合并为一条多值 INSERT。
+    """
+
+    if not objects:
+        return []
+    rows = [item.model_dump(exclude={"id"}) for item in objects]
+    inserted = session.scalars(
+        insert(model).returning(model).execution_options(render_nulls=True),
+        rows,
+    ).all()
+    by_key = {getattr(item, key): item for item in inserted}
+    return [by_key[getattr(item, key)] for item in objects]
+
+
+def _bulk_update(session: Session, model: Type[ModelT], changes: List[Tuple[ModelT, Dict[str, Any]]]) -> None:
+    """按主键批量 UPDATE（相同列集合合并为一次 executemany），并同步内存中对象的已提交值。"""
+
+    if not changes:
+        return
+    # 只有相邻且列集合相同的行才会合并，先按列集合排序。
+    rows = sorted(({"id": item.id, **values} for item, values in changes), key=lambda row: sorted(row))
+    session.execute(update(model), rows)
+    for item, values in changes:
+        for name, value in values.items():
+            set_committed_value(item, name, value)
 
 
 def compute_submission_statistics(responses: List[Response]) -> Dict[str, float]:
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+
+from .cache import read_int_env
+
+DEFAULT_VISION_IMAGE_MAX_EDGE = 1600
+DEFAULT_VISION_IMAGE_QUALITY = 80
+
+_FORMAT_MIME_TYPES = {
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "png": "image/png",
+    "gif": "image/gif",
+    "bmp": "image/bmp",
+    "tiff": "image/tiff",
+}
+
+
+@dataclass(frozen=True)
+class VisionImageSettings:
+    max_edge: int = DEFAULT_VISION_IMAGE_MAX_EDGE
+    output_format: str = "jpeg"
+    quality: int = DEFAULT_VISION_IMAGE_QUALITY
+    grayscale: bool = True
+
+    @property
+    def signature(self) -> str:
+        if self.output_format == "original":
+            return "original"
+        mode = "gray" if self.grayscale else "color"
+        return f"{self.output_format}-{self.max_edge}-q{self.quality}-{mode}"
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_size: int
+
+
+def vision_image_settings() -> VisionImageSettings:
+    """读取视觉模型图片预处理配置；``VISION_IMAGE_FORMAT=original`` 时原图直传。"""
+
+    output_format = (os.getenv("VISION_IMAGE_FORMAT") or "jpeg").strip().lower()
+    if output_format == "jpg":
+        output_format = "jpeg"
+    if output_format not in {"jpeg", "webp", "original"}:
+        output_format = "jpeg"
+    quality = min(max(read_int_env("VISION_IMAGE_QUALITY", DEFAULT_VISION_IMAGE_QUALITY), 1), 95)
+    grayscale = (os.getenv("VISION_IMAGE_GRAYSCALE") or "1").strip().lower() not in {"0", "false", "no", "off"}
+    return VisionImageSettings(
+        max_edge=max(read_int_env("VISION_IMAGE_MAX_EDGE", DEFAULT_VISION_IMAGE_MAX_EDGE), 0),
+        output_format=output_format,
+        quality=quality,
+        grayscale=grayscale,
+    )
+
+
+def sniff_image_mime_type(image_bytes: bytes) -> str:
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            return _FORMAT_MIME_TYPES.get((image.format or "").lower(), "image/png")
+    except (UnidentifiedImageError, OSError):
+        return "image/png"
+
+
+def prepare_image_for_vision(
+    image_bytes: bytes,
+    settings: Optional[VisionImageSettings] = None,
+) -> PreparedImage:
+    """Downsample and recompress an answer sheet before it is base64-encoded for the vision model.
+
+    The long edge is capped at ``max_edge`` (0 keeps the original size) and the
+    result is re-encoded as grayscale JPEG/WebP. Bytes that Pillow cannot decode
+    are passed through unchanged, as is any result that would be larger than the
+    upload itself.
+    """
+
+    from PIL import Image, ImageOps, UnidentifiedImageError  # Lazy import，避免拖慢应用启动
+
+    settings = settings or vision_image_settings()
+    try:
+        with Image.open(BytesIO(image_bytes)) as source:
+            source_format = (source.format or "").lower()
+            image = ImageOps.exif_transpose(source)
+            width, height = image.size
+            if settings.output_format == "original":
+                return PreparedImage(
+                    data=image_bytes,
+                    mime_type=_FORMAT_MIME_TYPES.get(source_format, "image/png"),
+                    width=width,
+                    height=height,
+                    original_size=len(image_bytes),
+                )
+
+            if settings.max_edge and max(width, height) > settings.max_edge:
+                image.thumbnail((settings.max_edge, settings.max_edge), Image.Resampling.LANCZOS)
+            image = image.convert("L" if settings.grayscale else "RGB")
+
+            buffer = BytesIO()
+            image.save(buffer, format=settings.output_format.upper(), quality=settings.quality, optimize=True)
+            encoded = buffer.getvalue()
+    except (UnidentifiedImageError, OSError):
+        return PreparedImage(
+            data=image_bytes,
+            mime_type="image/png",
+            width=0,
+            height=0,
+            original_size=len(image_bytes),
+        )
+
+    resized = image.size != (width, height)
+    if len(encoded) >= len(image_bytes) and not resized:
+        return PreparedImage(
+            data=image_bytes,
+            mime_type=_FORMAT_MIME_TYPES.get(source_format, "image/png"),
+            width=width,
+            height=height,
+            original_size=len(image_bytes),
+        )
+    return PreparedImage(
+        data=encoded,
+        mime_type=_FORMAT_MIME_TYPES[settings.output_format],
+        width=image.size[0],
+        height=image.size[1],
+        original_size=len(image_bytes),
+    )
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, select
+
+from ..models import ProcessingLog, Submission, SubmissionJobState, SubmissionStatus
+
+logger = logging.getLogger(__name__)
+
+JOB_ACTOR_TYPE = "worker"
+DEFAULT_JOB_WORKERS = 4
+
+JOB_STEP_NAMES: Dict[SubmissionJobState, str] = {
+    SubmissionJobState.queued: "异步批改 · 已排队",
+    SubmissionJobState.running: "异步批改 · 处理中",
+    SubmissionJobState.completed: "异步批改 · 已完成",
+    SubmissionJobState.failed: "异步批改 · 失败",
+}
+
+JobRunner = Callable[[Session, Submission], None]
+
+# 启动时如何处理上次进程退出时仍在排队或处理中的任务：off（默认，不处理）、requeue（原图仍在
+# 则重新排队，否则标记失败）、fail（全部标记失败）。恢复时不区分任务属于哪个进程，多个 worker
+# 或副本共享数据库时会抢走其他进程正在处理的任务，因此只应在单进程部署或唯一的实例上开启。
+JOB_RECOVERY_MODES = ("requeue", "fail", "off")
+UNFINISHED_JOB_STATES = {SubmissionJobState.queued.value, SubmissionJobState.running.value}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _job_worker_count() -> int:
+    raw_value = os.getenv("SUBMISSION_JOB_WORKERS")
+    try:
+        count = int(raw_value) if raw_value else DEFAULT_JOB_WORKERS
+    except ValueError:
+        count = DEFAULT_JOB_WORKERS
+    return max(1, count)
+
+
+def get_job_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_job_worker_count(),
+                thread_name_prefix="submission-job",
+            )
+        return _executor
+
+
+def shutdown_job_executor(*, wait: bool = True) -> None:
+    """Stop the worker pool; a new one is created lazily on the next enqueue."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def get_job_state(submission: Submission) -> Optional[Dict[str, object]]:
+    extra = submission.extra_metadata if isinstance(submission.extra_metadata, dict) else {}
+    job = extra.get("job")
+    return job if isinstance(job, dict) else None
+
+
+def record_job_state(
+    session: Session,
+    submission: Submission,
+    state: SubmissionJobState,
+    *,
+    detail: Optional[str] = None,
+) -> None:
+    extra = submission.extra_metadata.copy() if isinstance(submission.extra_metadata, dict) else {}
+    extra["job"] = {
+        "state": state.value,
+        "detail": detail,
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+    submission.extra_metadata = extra
+    session.add(submission)
+    session.add(
+        ProcessingLog(
+            submission_id=submission.id,
+            step=JOB_STEP_NAMES[state],
+            actor_type=JOB_ACTOR_TYPE,
+            detail=detail,
+            extra={
+                "status": "error" if state == SubmissionJobState.failed else "success",
+                "job_state": state.value,
+            },
+        ),
+    )
+    session.commit()
+
+
+def enqueue_submission_job(
+    session: Session,
+    submission: Submission,
+    runner: JobRunner,
+    *,
+    detail: str = "等待后台批改",
+) -> Future:
+    """Mark the submission as queued and hand OCR + grading to the worker pool.
+
+    The worker opens its own session on the same bind as ``session`` so that the
+    request thread can return immediately.
+    """
+
+    record_job_state(session, submission, SubmissionJobState.queued, detail=detail)
+    bind = session.get_bind()
+    return get_job_executor().submit(_run_submission_job, bind, submission.id, runner)
+
+
+def _run_submission_job(
+    bind: Engine | Connection,
+    submission_id: int,
+    runner: JobRunner,
+) -> None:
+    with Session(bind) as session:
+        submission = session.get(Submission, submission_id)
+        if submission is None:
+            logger.warning("Submission %s disappeared before its job started", submission_id)
+            return
+
+        record_job_state(session, submission, SubmissionJobState.running, detail="正在识别与批改")
+        try:
+            runner(session, submission)
+        except Exception as exc:  # noqa: BLE001 - surface every failure through the job status
+            logger.exception("Submission job %s failed", submission_id)
+            session.rollback()
+            submission = session.get(Submission, submission_id)
+            if submission is None:
+                return
+            submission.status = SubmissionStatus.needs_review
+            record_job_state(session, submission, SubmissionJobState.failed, detail=str(exc))
+            return
+
+        session.refresh(submission)
+        record_job_state(session, submission, SubmissionJobState.completed, detail="批改完成")
+
+
+def job_recovery_mode() -> str:
+    mode = (os.getenv("SUBMISSION_JOB_RECOVERY") or "off").strip().lower()
+    return mode if mode in JOB_RECOVERY_MODES else "off"
+
+
+def recover_submission_jobs(
+    session: Session,
+    runner: JobRunner,
+    can_resume: Callable[[Submission], bool],
+) -> Tuple[List[int], List[int]]:
+    """处理进程重启前未完成的任务，返回 (重新排队, 标记失败) 的提交编号。
+
+    任务只存在于进程内的线程池中，重启后仍处于 queued/running 的提交不会再有 worker 处理。
+    ``can_resume`` 判断任务输入（如保存的原图）是否仍然可用。
+    """
+
+    mode = job_recovery_mode()
+    if mode == "off":
+        return [], []
+
+    requeued: List[int] = []
+    failed: List[int] = []
+    for submission in session.exec(
+        select(Submission).where(Submission.status == SubmissionStatus.pending).order_by(Submission.id),
+    ).all():
+        job = get_job_state(submission)
+        if job is None or job.get("state") not in UNFINISHED_JOB_STATES:
+            continue
+        if mode == "requeue" and can_resume(submission):
+            enqueue_submission_job(session, submission, runner, detail="服务重启后重新排队")
+            requeued.append(submission.id)
+        else:
+            submission.status = SubmissionStatus.needs_review
+            record_job_state(session, submission, SubmissionJobState.failed, detail="服务重启，任务未完成")
+            failed.append(submission.id)
+    if requeued or failed:
+        logger.info("Recovered submission jobs: requeued %s, failed %s", requeued, failed)
+    return requeued, failed
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import SelectOfScalar
+
+from ..database import upsert_statement
+from ..models import KnowledgeTag, Question, QuestionKnowledgeTag
+
+UNSPECIFIED_TAG = "Unspecified"
+
+
+def split_knowledge_tags(raw: Optional[str]) -> List[str]:
+    """拆分逗号分隔的知识点字符串，去除空白并按忽略大小写去重，保持原有顺序。"""
+
+    tags: List[str] = []
+    seen = set()
+    for part in (raw or "").split(","):
+        name = part.strip()
+        if name and normalize_tag(name) not in seen:
+            seen.add(normalize_tag(name))
+            tags.append(name)
+    return tags
+
+
+def normalize_tag(name: str) -> str:
+    return name.strip().lower()
+
+
+def questions_tagged_with(names: Iterable[str]) -> SelectOfScalar[int]:
+    """带有任一指定标签的题目 ID 子查询（忽略大小写精确匹配，走关联表索引）。"""
+
+    normalized = sorted({normalize_tag(name) for name in names if name and name.strip()})
+    return (
+        select(QuestionKnowledgeTag.question_id)
+        .join(KnowledgeTag, KnowledgeTag.id == QuestionKnowledgeTag.tag_id)
+        .where(KnowledgeTag.normalized_name.in_(normalized))
+    )
+
+
+def _ensure_tags(session: Session, names: Iterable[str]) -> Dict[str, int]:
+    wanted = {normalize_tag(name): name for name in names}
+    if not wanted:
+        return {}
+    existing = session.exec(
+        select(KnowledgeTag).where(KnowledgeTag.normalized_name.in_(list(wanted))),
+    ).all()
+    tag_ids = {tag.normalized_name: tag.id for tag in existing}
+    missing = [
+        {"name": name, "normalized_name": normalized}
+        for normalized, name in wanted.items()
+        if normalized not in tag_ids
+    ]
+    if missing:
+        # 并发请求可能同时创建同名标签：冲突行跳过，再查回对方写入的主键。
+        inserted = session.execute(
+            upsert_statement(session, KnowledgeTag, missing, index_elements=["normalized_name"]).returning(
+                KnowledgeTag.normalized_name,
+                KnowledgeTag.id,
+            ),
+        ).all()
+        tag_ids.update(dict(inserted))
+        still_missing = [item["normalized_name"] for item in missing if item["normalized_name"] not in tag_ids]
+        if still_missing:
+            tag_ids.update(
+                session.exec(
+                    select(KnowledgeTag.normalized_name, KnowledgeTag.id).where(
+                        KnowledgeTag.normalized_name.in_(still_missing),
+                    ),
+                ).all(),
+            )
+    return tag_ids
+
+
+def sync_question_knowledge_tags(session: Session, questions: Iterable[Question]) -> None:
+    """按 ``Question.knowledge_tags`` 重建题目的标签关联；题目需已 flush 拿到主键。"""
+
+    questions = [question for question in questions if question.id is not None]
+    if not questions:
+        return
+    tags_by_question = {question.id: split_knowledge_tags(question.knowledge_tags) for question in questions}
+    tag_ids = _ensure_tags(session, [name for names in tags_by_question.values() for name in names])
+
+    session.execute(
+        delete(QuestionKnowledgeTag).where(QuestionKnowledgeTag.question_id.in_(list(tags_by_question))),
+    )
+    links = [
+        {"question_id": question_id, "tag_id": tag_ids[normalize_tag(name)]}
+        for question_id, names in tags_by_question.items()
+        for name in names
+    ]
+    if links:
+        session.execute(insert(QuestionKnowledgeTag), links)
+
+
+def backfill_question_knowledge_tags(connection: Connection) -> int:
+    """迁移：为尚无关联记录的题目补建标签关联，返回处理的题目数。"""
+
+    rows = connection.exec_driver_sql(
+        "SELECT id, knowledge_tags FROM question "
+        "WHERE knowledge_tags IS NOT NULL AND knowledge_tags != '' "
+        "AND id NOT IN (SELECT question_id FROM questionknowledgetag)",
+    ).fetchall()
+    if not rows:
+        return 0
+
+    tag_ids: Dict[str, int] = {
+        normalized: tag_id
+        for tag_id, normalized in connection.exec_driver_sql(
+            "SELECT id, normalized_name FROM knowledgetag",
+        ).fetchall()
+    }
+    links = []
+    for question_id, raw_tags in rows:
+        for name in split_knowledge_tags(raw_tags):
+            normalized = normalize_tag(name)
+            if normalized not in tag_ids:
+                result = connection.execute(
+                    insert(KnowledgeTag).values(name=name, normalized_name=normalized),
+                )
+                tag_ids[normalized] = result.inserted_primary_key[0]
+            links.append({"question_id": question_id, "tag_id": tag_ids[normalized]})
+    if links:
+        connection.execute(insert(QuestionKnowledgeTag), links)
+    return len(rows)
@@ -1,13 +1,22 @@
 from __future__ import annotations
 
 import base64
+import hashlib
 import json
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from typing import Any, Dict, Iterator, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
 
-from openai import OpenAI
+from .cache import CacheBackend, MemoryLRUCache, SQLiteCache, cache_path_from_env, read_int_env
+from .imaging import prepare_image_for_vision, sniff_image_mime_type
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+T = TypeVar("T")
 
 
 class LLMNotConfiguredError(RuntimeError):
@@ -25,6 +34,10 @@ def _read_env(var_name: str, fallback: Optional[str] = None) -> Optional[str]:
     return fallback
 
 
+def llm_credentials_configured() -> bool:
+    return bool(_read_env("DASHSCOPE_API_KEY") or _read_env("QWEN_API_KEY"))
+
+
 def reset_llm_client_cache() -> None:
     """Clear cached LLM clients so new credentials take effect immediately."""
     _get_client.cache_clear()  # type: ignore[attr-defined]
@@ -61,9 +74,115 @@ def _get_client() -> OpenAI:
         )
 
     base_url = _read_env("QWEN_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+    from openai import OpenAI  # Lazy import，openai SDK 导入较慢，首次调用时再加载
+
     return OpenAI(api_key=api_key, base_url=base_url)
 
 
+LLM_CACHE_DEFAULT_TTLS: Dict[str, int] = {
+    "subjective_score": 30 * 24 * 3600,
+    "batch_score": 30 * 24 * 3600,
+    "exam_outline": 7 * 24 * 3600,
+    "vision_ocr": 7 * 24 * 3600,
+}
+DEFAULT_LLM_CACHE_MAX_ENTRIES = 20000
+
+_cache_counters: Dict[str, Dict[str, int]] = {}
+_cache_counter_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_llm_cache(call_type: str) -> Optional[CacheBackend]:
+    """Response cache for one deterministic call type, chosen by ``LLM_CACHE_BACKEND``.
+
+    ``sqlite`` (default) persists replies next to the OCR cache, ``memory`` keeps an
+    in-process LRU, and ``off`` disables caching. TTLs can be overridden per call
+    type with ``LLM_CACHE_TTL_<CALL_TYPE>`` (seconds).
+    """
+
+    backend = (_read_env("LLM_CACHE_BACKEND", "sqlite") or "sqlite").strip().lower()
+    ttl_seconds = read_int_env(
+        f"LLM_CACHE_TTL_{call_type.upper()}",
+        LLM_CACHE_DEFAULT_TTLS.get(call_type, 24 * 3600),
+    )
+    max_entries = read_int_env("LLM_CACHE_MAX_ENTRIES", DEFAULT_LLM_CACHE_MAX_ENTRIES)
+    if backend == "memory":
+        return MemoryLRUCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+    if backend == "sqlite":
+        return SQLiteCache(
+            cache_path_from_env("LLM_CACHE_PATH"),
+            namespace=f"llm:{call_type}",
+            ttl_seconds=ttl_seconds,
+            max_entries=max_entries,
+        )
+    return None
+
+
+def reset_llm_response_cache() -> None:
+    """Drop cache backends and hit counters so configuration changes take effect."""
+    get_llm_cache.cache_clear()  # type: ignore[attr-defined]
+    with _cache_counter_lock:
+        _cache_counters.clear()
+
+
+def get_llm_cache_stats() -> Dict[str, Dict[str, float]]:
+    with _cache_counter_lock:
+        snapshot = {call_type: dict(counts) for call_type, counts in _cache_counters.items()}
+    stats: Dict[str, Dict[str, float]] = {}
+    for call_type, counts in snapshot.items():
+        lookups = counts["hits"] + counts["misses"]
+        stats[call_type] = {
+            "hits": counts["hits"],
+            "misses": counts["misses"],
+            "hit_ratio": round(counts["hits"] / lookups, 4) if lookups else 0.0,
+        }
+    return stats
+
+
+def _record_cache_lookup(call_type: str, *, hit: bool) -> None:
+    with _cache_counter_lock:
+        counts = _cache_counters.setdefault(call_type, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+
+def _llm_cache_key(params: Dict[str, Any]) -> str:
+    encoded = json.dumps(params, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _cached_completion(
+    client: OpenAI,
+    call_type: str,
+    params: Dict[str, Any],
+    parse: Callable[[str], T],
+    *,
+    use_cache: bool = True,
+    empty_error: str = "LLM returned no choices.",
+) -> T:
+    """Run a chat completion and parse its content, reusing cached replies for identical requests.
+
+    The key covers the model, the messages and every sampling parameter. Only
+    replies that ``parse`` accepts are stored.
+    """
+
+    cache = get_llm_cache(call_type) if use_cache else None
+    cache_key = _llm_cache_key(params) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(cache_key)
+        _record_cache_lookup(call_type, hit=isinstance(cached, str))
+        if isinstance(cached, str):
+            return parse(cached)
+
+    response = client.chat.completions.create(**params)
+    if not response.choices:
+        raise LLMInvocationError(empty_error)
+    content = response.choices[0].message.content or ""
+    result = parse(content)
+    if cache is not None:
+        cache.set(cache_key, content)
+    return result
+
+
 def _parse_json_payload(content: str) -> Dict[str, Any]:
     text = content.strip()
     if not text:
@@ -109,6 +228,13 @@ def _build_data_url(image_bytes: bytes, *, mime_type: str = "image/png") -> str:
     return f"data:{mime_type};base64,{base64_image}"
 
 
+def _vision_image_url(image_bytes: bytes, *, prepare_image: bool = True) -> str:
+    if not prepare_image:
+        return _build_data_url(image_bytes, mime_type=sniff_image_mime_type(image_bytes))
+    prepared = prepare_image_for_vision(image_bytes)
+    return _build_data_url(prepared.data, mime_type=prepared.mime_type)
+
+
 class QwenClient:
     """Wrapper around the qwen3-vl-plus multimodal API for JSON outputs."""
 
@@ -116,10 +242,10 @@ class QwenClient:
         self._client = _get_client()
         self._vision_model = _read_env("QWEN_VL_MODEL", "qwen3-vl-plus")
 
-    def _image_payload(self, image_bytes: bytes, *, mime_type: str = "image/png") -> Dict[str, Any]:
+    def _image_payload(self, image_bytes: bytes) -> Dict[str, Any]:
         return {
             "type": "image_url",
-            "image_url": {"url": _build_data_url(image_bytes, mime_type=mime_type)},
+            "image_url": {"url": _vision_image_url(image_bytes)},
         }
 
     def _request_json(
@@ -128,19 +254,26 @@ class QwenClient:
         *,
         temperature: float = 0.0,
         max_retries: int = 2,
+        call_type: Optional[str] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
+        params = {"model": self._vision_model, "messages": messages, "temperature": temperature}
         last_error: Optional[Exception] = None
         for _ in range(max_retries):
             try:
-                response = self._client.chat.completions.create(
-                    model=self._vision_model,
-                    messages=messages,
-                    temperature=temperature,
+                if call_type is None:
+                    response = self._client.chat.completions.create(**params)
+                    if not response.choices:
+                        raise LLMInvocationError("LLM returned no choices.")
+                    content = response.choices[0].message.content or ""
+                    return _parse_json_payload(content)
+                return _cached_completion(
+                    self._client,
+                    call_type,
+                    params,
+                    _parse_json_payload,
+                    use_cache=use_cache,
                 )
-                if not response.choices:
-                    raise LLMInvocationError("LLM returned no choices.")
-                content = response.choices[0].message.content or ""
-                return _parse_json_payload(content)
             except Exception as exc:  # noqa: BLE001 - propagate after retries
                 last_error = exc
         raise LLMInvocationError(
@@ -150,7 +283,13 @@ class QwenClient:
             ),
         ) from last_error
 
-    def parse_exam_outline(self, image_bytes: bytes, *, locale: str = "zh-CN") -> Dict[str, Any]:
+    def parse_exam_outline(
+        self,
+        image_bytes: bytes,
+        *,
+        locale: str = "zh-CN",
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
         system_prompt = (
             "You are an experienced curriculum specialist who extracts structured data from exam scans."
             "Always respond with JSON using camelCase field names."
@@ -174,7 +313,7 @@ class QwenClient:
                 ],
             },
         ]
-        payload = self._request_json(messages)
+        payload = self._request_json(messages, call_type="exam_outline", use_cache=use_cache)
         if "questions" not in payload:
             raise LLMInvocationError("LLM payload is missing the questions field.")
         return payload
@@ -227,8 +366,8 @@ def get_qwen_client() -> QwenClient:
     return QwenClient()
 
 
-def parse_exam_outline(image_bytes: bytes, *, locale: str = "zh-CN") -> Dict[str, Any]:
-    return get_qwen_client().parse_exam_outline(image_bytes, locale=locale)
+def parse_exam_outline(image_bytes: bytes, *, locale: str = "zh-CN", use_cache: bool = True) -> Dict[str, Any]:
+    return get_qwen_client().parse_exam_outline(image_bytes, locale=locale, use_cache=use_cache)
 
 
 def grade_exam_submission_with_ai(
@@ -255,12 +394,29 @@ def _ensure_confidence(value: Any) -> float:
     return max(0.0, min(confidence, 1.0))
 
 
-def run_vision_ocr(image_bytes: bytes) -> Tuple[List[Dict[str, Optional[str]]], str]:
-    """Use Qwen-VL to extract question rows from an exam image."""
+# Bump whenever the OCR prompt below changes so cached OCR results are not reused.
+VISION_OCR_PROMPT_VERSION = "v1"
+
+
+def vision_model_name() -> str:
+    return _read_env("QWEN_VL_MODEL", "qwen3-vl-plus") or "qwen3-vl-plus"
+
+
+def run_vision_ocr(
+    image_bytes: bytes,
+    *,
+    use_cache: bool = True,
+    prepare_image: bool = True,
+) -> Tuple[List[Dict[str, Optional[str]]], str]:
+    """Use Qwen-VL to extract question rows from an exam image.
+
+    The image is downsampled and recompressed first (see ``prepare_image_for_vision``);
+    pass ``prepare_image=False`` to send the upload as-is.
+    """
 
     client = _get_client()
-    model_name = _read_env("QWEN_VL_MODEL", "qwen3-vl-plus")
-    image_url = _build_data_url(image_bytes)
+    model_name = vision_model_name()
+    image_url = _vision_image_url(image_bytes, prepare_image=prepare_image)
 
     messages = [
         {
@@ -290,16 +446,18 @@ def run_vision_ocr(image_bytes: bytes) -> Tuple[List[Dict[str, Optional[str]]],
         },
     ]
 
-    response = client.chat.completions.create(
-        model=model_name,
-        messages=messages,
-        temperature=0.1,
+    params = {"model": model_name, "messages": messages, "temperature": 0.1}
+    return _cached_completion(
+        client,
+        "vision_ocr",
+        params,
+        _parse_vision_rows,
+        use_cache=use_cache,
+        empty_error="LLM returned no results.",
     )
 
-    if not response.choices:
-        raise LLMInvocationError("LLM returned no results.")
 
-    content = response.choices[0].message.content or ""
+def _parse_vision_rows(content: str) -> Tuple[List[Dict[str, Optional[str]]], str]:
     payload = _parse_json_payload(content)
     if isinstance(payload, list):
         rows_payload = payload
@@ -338,6 +496,7 @@ def score_subjective_answer(
     max_score: float,
     rubric: Optional[Dict[str, Any]] = None,
     reference_answer: Optional[Dict[str, Any]] = None,
+    use_cache: bool = True,
 ) -> Dict[str, Any]:
     """Let Qwen generate a score and feedback for a subjective (short-answer) question."""
 
@@ -368,16 +527,19 @@ def score_subjective_answer(
         },
     ]
 
-    response = client.chat.completions.create(
-        model=model_name,
-        messages=messages,
-        temperature=0.0,
+    params = {"model": model_name, "messages": messages, "temperature": 0.0}
+    return _cached_completion(
+        client,
+        "subjective_score",
+        params,
+        lambda content: _parse_single_score(content, max_score),
+        use_cache=use_cache,
+        empty_error="LLM did not return a scoring result.",
     )
 
-    if not response.choices:
-        raise LLMInvocationError("LLM did not return a scoring result.")
 
-    payload = _parse_json_payload(response.choices[0].message.content or "")
+def _parse_single_score(content: str, max_score: float) -> Dict[str, Any]:
+    payload = _parse_json_payload(content)
     score = payload.get("score")
     explanation = payload.get("explanation") or payload.get("feedback") or ""
 
@@ -386,13 +548,129 @@ def score_subjective_answer(
     except (TypeError, ValueError):
         raise LLMInvocationError("澶фā鍨嬭繑鍥炵殑寰楀垎鏃犳晥锛歿}".format(score))
 
-    bounded_score = max(0.0, min(numeric_score, max_score))
+    return _bounded_score_result(numeric_score, explanation, max_score)
+
+
+def _bounded_score_result(score: float, explanation: Any, max_score: float) -> Dict[str, Any]:
+    bounded_score = max(0.0, min(score, max_score))
     return {
         "score": round(bounded_score, 2),
-        "explanation": str(explanation).strip() or "AI grading succeeded but no explanation was provided.",
+        "explanation": str(explanation or "").strip() or "AI grading succeeded but no explanation was provided.",
     }
 
 
+def _parse_batch_scores(content: str, items: List[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+    payload = _parse_json_payload(content)
+    if isinstance(payload, dict):
+        payload = payload.get("results") or payload.get("scores") or []
+    if not isinstance(payload, list):
+        raise LLMInvocationError("Batch scoring reply is not a JSON array.")
+
+    max_scores = {str(item["question_id"]): (item["question_id"], item["max_score"]) for item in items}
+    parsed: Dict[Any, Dict[str, Any]] = {}
+    for entry in payload:
+        if not isinstance(entry, dict):
+            continue
+        key = str(entry.get("question_id"))
+        if key not in max_scores:
+            continue
+        question_id, max_score = max_scores[key]
+        try:
+            numeric_score = float(entry.get("score"))
+        except (TypeError, ValueError):
+            continue
+        explanation = entry.get("explanation") or entry.get("feedback")
+        parsed[question_id] = _bounded_score_result(numeric_score, explanation, max_score)
+    return parsed
+
+
+def score_subjective_answers_batch(
+    items: List[Dict[str, Any]],
+    *,
+    use_cache: bool = True,
+    max_workers: int = 1,
+) -> Dict[Any, Union[Dict[str, Any], LLMInvocationError]]:
+    """Score all subjective answers of one submission with a single chat completion.
+
+    Each item carries ``question_id`` plus the keyword arguments of
+    :func:`score_subjective_answer`. Answers that the batch reply omits or
+    mangles are re-scored individually, at most ``max_workers`` at a time; a
+    failure there is returned as the ``LLMInvocationError`` for that question
+    instead of being raised.
+    """
+
+    if not items:
+        return {}
+
+    client = _get_client()
+    model_name = _read_env("QWEN_TEXT_MODEL", "qwen-max")
+
+    batch_payload = [
+        {
+            "question_id": item["question_id"],
+            "question": item.get("question_prompt") or "",
+            "max_score": item["max_score"],
+            "reference_answer": item.get("reference_answer"),
+            "rubric": item.get("rubric"),
+            "student_answer": item["student_answer"],
+        }
+        for item in items
+    ]
+    messages = [
+        {
+            "role": "system",
+            "content": (
+                "You are a meticulous grader. For every item, use its question, reference answer, and rubric to "
+                "assign a score between 0 and that item's max_score inclusive and provide one sentence of feedback. "
+                "Return only a JSON array of objects with fields question_id, score (number) and explanation (string)."
+            ),
+        },
+        {
+            "role": "user",
+            "content": (
+                "Grade each student answer below:\n"
+                + json.dumps(batch_payload, ensure_ascii=False)
+                + "\n\nReturn a JSON array like [{\"question_id\": 1, \"score\": 3, \"explanation\": \"Short feedback\"}]."
+            ),
+        },
+    ]
+
+    params = {"model": model_name, "messages": messages, "temperature": 0.0}
+    try:
+        results: Dict[Any, Union[Dict[str, Any], LLMInvocationError]] = dict(
+            _cached_completion(
+                client,
+                "batch_score",
+                params,
+                lambda content: _parse_batch_scores(content, items),
+                use_cache=use_cache,
+                empty_error="LLM did not return a batch scoring result.",
+            ),
+        )
+    except (LLMInvocationError, ValueError):  # unusable reply (incl. JSONDecodeError): score one by one
+        results = {}
+
+    def _score_single(item: Dict[str, Any]) -> Union[Dict[str, Any], LLMInvocationError]:
+        single_kwargs = {key: value for key, value in item.items() if key != "question_id"}
+        try:
+            return score_subjective_answer(**single_kwargs, use_cache=use_cache)
+        except LLMInvocationError as exc:
+            return exc
+
+    missing = [item for item in items if item["question_id"] not in results]
+    if len(missing) <= 1 or max_workers <= 1:
+        results.update({item["question_id"]: _score_single(item) for item in missing})
+        return results
+
+    with ThreadPoolExecutor(
+        max_workers=min(len(missing), max_workers),
+        thread_name_prefix="subjective-fallback",
+    ) as executor:
+        futures = {item["question_id"]: executor.submit(_score_single, item) for item in missing}
+        results.update({question_id: future.result() for question_id, future in futures.items()})
+    return results
+
+
 def summarize_submission(responses: List[Dict[str, Any]]) -> str:
     """Generate a concise Chinese summary for the submission result."""
 
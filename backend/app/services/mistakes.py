@@ -2,11 +2,69 @@ from __future__ import annotations
 
 from typing import List
 
+from sqlalchemy import delete, func, update
+from sqlalchemy.engine import Connection
 from sqlmodel import Session, select
 
-from ..models import Mistake
+from ..models import Mistake, PracticeItem, StudentProfile
 
 
 def get_student_mistakes(session: Session, student_id: int) -> List[Mistake]:
     stmt = select(Mistake).where(Mistake.student_id == student_id)
     return session.exec(stmt).all()
+
+
+def merge_duplicate_mistakes(connection: Connection) -> int:
+    """迁移：把同一学生同一题目的多条错题合并到 id 最小的一条，返回删除的记录数。
+
+    错误次数累加，练习次数与最近出现时间取最大值，关联的练习题改指向保留的记录；
+    受影响学生的档案统计置空，下次读取时重建。
+    """
+
+    mistake = Mistake.__table__
+    groups = connection.execute(
+        select(mistake.c.student_id, mistake.c.question_id)
+        .group_by(mistake.c.student_id, mistake.c.question_id)
+        .having(func.count(mistake.c.id) > 1),
+    ).all()
+    removed = 0
+    for student_id, question_id in groups:
+        rows = connection.execute(
+            select(
+                mistake.c.id,
+                mistake.c.response_id,
+                mistake.c.error_count,
+                mistake.c.times_practiced,
+                mistake.c.created_at,
+                mistake.c.last_seen_at,
+            )
+            .where(mistake.c.student_id == student_id, mistake.c.question_id == question_id)
+            .order_by(mistake.c.id),
+        ).all()
+        keeper, duplicates = rows[0], rows[1:]
+        latest = max(rows, key=lambda row: (row.last_seen_at is not None, row.last_seen_at, row.id))
+        duplicate_ids = [row.id for row in duplicates]
+        connection.execute(
+            update(mistake)
+            .where(mistake.c.id == keeper.id)
+            .values(
+                response_id=latest.response_id,
+                error_count=sum(row.error_count or 1 for row in rows),
+                times_practiced=max(row.times_practiced or 0 for row in rows),
+                created_at=min(row.created_at for row in rows if row.created_at is not None),
+                last_seen_at=latest.last_seen_at,
+            ),
+        )
+        connection.execute(
+            update(PracticeItem.__table__)
+            .where(PracticeItem.__table__.c.source_mistake_id.in_(duplicate_ids))
+            .values(source_mistake_id=keeper.id),
+        )
+        connection.execute(delete(mistake).where(mistake.c.id.in_(duplicate_ids)))
+        connection.execute(
+            update(StudentProfile.__table__)
+            .where(StudentProfile.__table__.c.student_id == student_id)
+            .values(latest_mistake_stats=None),
+        )
+        removed += len(duplicate_ids)
+    return removed
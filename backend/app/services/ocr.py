@@ -1,14 +1,37 @@
 ﻿from __future__ import annotations
 
+import hashlib
+import importlib.util
+import multiprocessing
+import os
 import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from functools import lru_cache
 from io import BytesIO
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
-import numpy as np
-from PIL import Image
+from .cache import SQLiteCache, cache_enabled, cache_path_from_env, read_int_env
+from .imaging import vision_image_settings
+from .llm import (
+    VISION_OCR_PROMPT_VERSION,
+    LLMInvocationError,
+    LLMNotConfiguredError,
+    llm_credentials_configured,
+    run_vision_ocr,
+    vision_model_name,
+)
 
-from .llm import LLMInvocationError, LLMNotConfiguredError, run_vision_ocr
+if TYPE_CHECKING:
+    import numpy as np
+
+EASYOCR_ENGINE_NAME = "easyocr"
+DEFAULT_OCR_CACHE_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_OCR_CACHE_MAX_ENTRIES = 5000
+
+_easyocr_pool: Optional[ProcessPoolExecutor] = None
+_easyocr_pool_lock = threading.Lock()
 
 
 ANNOTATION_TOKENS = {
@@ -32,6 +55,9 @@ class OCRProcessingError(RuntimeError):
 
 
 def _load_image(image_bytes: bytes) -> np.ndarray:
+    import numpy as np  # Lazy import，仅 EasyOCR 回退识别需要
+    from PIL import Image
+
     pil_image = Image.open(BytesIO(image_bytes)).convert("RGB")
     return np.array(pil_image)
 
@@ -43,11 +69,91 @@ def _get_easyocr_reader():
     return easyocr.Reader(["ch_sim", "en"], gpu=False)
 
 
+def _easyocr_worker_count() -> int:
+    """EasyOCR 工作进程数，默认等于 CPU 核数；``EASYOCR_WORKERS=0`` 时在当前进程内识别。"""
+
+    return max(read_int_env("EASYOCR_WORKERS", os.cpu_count() or 1), 0)
+
+
+def _init_easyocr_worker() -> None:
+    """子进程初始化：每个进程只用一个 torch 线程，并预先加载 EasyOCR 模型。"""
+
+    try:
+        import torch
+
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    try:
+        _get_easyocr_reader()
+    except Exception:  # noqa: BLE001 - 依赖缺失时留到实际识别时再报错
+        pass
+
+
+def _warm_easyocr_worker() -> int:
+    _get_easyocr_reader()
+    return os.getpid()
+
+
+def preload_easyocr_reader() -> None:
+    """在当前进程加载 EasyOCR 模型（未启用进程池时使用）。"""
+
+    _get_easyocr_reader()
+
+
+def get_easyocr_pool() -> Optional[ProcessPoolExecutor]:
+    global _easyocr_pool
+
+    workers = _easyocr_worker_count()
+    if workers <= 0:
+        return None
+    with _easyocr_pool_lock:
+        if _easyocr_pool is None:
+            # spawn 避免在多线程的服务进程中 fork。
+            _easyocr_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_easyocr_worker,
+            )
+        return _easyocr_pool
+
+
+def warm_easyocr_pool() -> List[Future]:
+    """启动全部工作进程并加载模型；未安装 EasyOCR 时不做任何事。"""
+
+    if importlib.util.find_spec("easyocr") is None:
+        return []
+    pool = get_easyocr_pool()
+    if pool is None:
+        return []
+    return [pool.submit(_warm_easyocr_worker) for _ in range(_easyocr_worker_count())]
+
+
+def shutdown_easyocr_pool(*, wait: bool = True) -> None:
+    global _easyocr_pool
+
+    with _easyocr_pool_lock:
+        pool, _easyocr_pool = _easyocr_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
 def _extract_with_easyocr(image_bytes: bytes) -> List[Dict[str, Optional[str]]]:
+    pool = get_easyocr_pool()
+    if pool is None:
+        return _extract_with_easyocr_local(image_bytes)
+    try:
+        return pool.submit(_extract_with_easyocr_local, image_bytes).result()
+    except BrokenProcessPool as exc:
+        shutdown_easyocr_pool(wait=False)
+        raise OCRProcessingError("EasyOCR 工作进程异常退出，请稍后重试。") from exc
+
+
+def _extract_with_easyocr_local(image_bytes: bytes) -> List[Dict[str, Optional[str]]]:
     image = _load_image(image_bytes)
     try:
         reader = _get_easyocr_reader()
-    except RuntimeError as exc:  # pragma: no cover - dependency missing
+    except (ImportError, RuntimeError) as exc:  # pragma: no cover - dependency missing
         raise OCRProcessingError("未检测到 EasyOCR，请安装依赖以启用回退识别能力。") from exc
 
     results = reader.readtext(image)
@@ -102,9 +208,30 @@ def _extract_with_easyocr(image_bytes: bytes) -> List[Dict[str, Optional[str]]]:
     return rows
 
 
-def run_ocr_pipeline(image_bytes: bytes) -> Tuple[List[Dict[str, Optional[str]]], List[Dict[str, str]]]:
-    """尝试首先使用大模型识别，若失败则回退至 EasyOCR。"""
+@lru_cache(maxsize=1)
+def get_ocr_cache() -> Optional[SQLiteCache]:
+    """OCR 结果缓存，按图片 SHA-256 + 模型 + 提示词版本寻址；``OCR_CACHE_ENABLED=0`` 时关闭。"""
+
+    if not cache_enabled("OCR_CACHE_ENABLED"):
+        return None
+    return SQLiteCache(
+        cache_path_from_env("OCR_CACHE_PATH"),
+        namespace="ocr",
+        ttl_seconds=read_int_env("OCR_CACHE_TTL_SECONDS", DEFAULT_OCR_CACHE_TTL_SECONDS),
+        max_entries=read_int_env("OCR_CACHE_MAX_ENTRIES", DEFAULT_OCR_CACHE_MAX_ENTRIES),
+    )
+
 
+def _ocr_cache_key(image_digest: str, engine_name: str) -> str:
+    if engine_name == EASYOCR_ENGINE_NAME:
+        return f"{image_digest}:{engine_name}:{VISION_OCR_PROMPT_VERSION}"
+    # 视觉模型的识别结果取决于送入的预处理图片，配置变化时不复用旧缓存。
+    return f"{image_digest}:{engine_name}:{VISION_OCR_PROMPT_VERSION}:{vision_image_settings().signature}"
+
+
+def _run_ocr_engines(
+    image_bytes: bytes,
+) -> Tuple[List[Dict[str, Optional[str]]], List[Dict[str, str]], str]:
     steps: List[Dict[str, str]] = []
 
     try:
@@ -115,33 +242,62 @@ def run_ocr_pipeline(image_bytes: bytes) -> Tuple[List[Dict[str, Optional[str]]]
             "status": "warning",
             "detail": "未配置访问密钥，正在回退至 EasyOCR。",
         })
-        rows = _extract_with_easyocr(image_bytes)
-        steps.append({
-            "name": "EasyOCR 回退识别",
-            "status": "success",
-            "detail": f"识别到 {len(rows)} 条题目信息。",
-        })
-        return rows, steps
     except LLMInvocationError as exc:
         steps.append({
             "name": "通义千问 · 视觉识别",
             "status": "error",
             "detail": f"大模型解析失败：{exc}",
         })
-        rows = _extract_with_easyocr(image_bytes)
+    else:
         steps.append({
-            "name": "EasyOCR 回退识别",
+            "name": "通义千问 · 视觉识别",
             "status": "success",
             "detail": f"识别到 {len(rows)} 条题目信息。",
         })
-        return rows, steps
+        return rows, steps, vision_model_name()
 
+    rows = _extract_with_easyocr(image_bytes)
     steps.append({
-        "name": "通义千问 · 视觉识别",
+        "name": "EasyOCR 回退识别",
         "status": "success",
         "detail": f"识别到 {len(rows)} 条题目信息。",
     })
-    return rows, steps
+    return rows, steps, EASYOCR_ENGINE_NAME
+
+
+def run_ocr_pipeline(image_bytes: bytes) -> Tuple[List[Dict[str, Optional[str]]], List[Dict[str, str]]]:
+    """尝试首先使用大模型识别，若失败则回退至 EasyOCR；相同图片优先命中 OCR 缓存。
+
+    EasyOCR 的缓存结果仅在未配置大模型密钥时复用，避免一次调用失败后长期不再重试大模型。
+    """
+
+    cache = get_ocr_cache()
+    if cache is None:
+        rows, steps, _engine_name = _run_ocr_engines(image_bytes)
+        return rows, steps
+
+    image_digest = hashlib.sha256(image_bytes).hexdigest()
+    engine_names = [vision_model_name()]
+    if not llm_credentials_configured():
+        engine_names.append(EASYOCR_ENGINE_NAME)
+    for engine_name in engine_names:
+        cached = cache.get(_ocr_cache_key(image_digest, engine_name))
+        if isinstance(cached, dict) and cached.get("rows"):
+            hit_step = {
+                "name": "OCR 缓存",
+                "status": "success",
+                "detail": f"命中缓存（{engine_name}），跳过重复识别。",
+            }
+            return cached["rows"], [hit_step, *cached.get("steps", [])]
+
+    rows, steps, engine_name = _run_ocr_engines(image_bytes)
+    cache.set(_ocr_cache_key(image_digest, engine_name), {"rows": rows, "steps": steps})
+    miss_step = {
+        "name": "OCR 缓存",
+        "status": "success",
+        "detail": "未命中缓存，识别结果已写入缓存。",
+    }
+    return rows, [miss_step, *steps]
 
 
 def extract_question_rows(image_bytes: bytes) -> List[Dict[str, Optional[str]]]:
@@ -2,11 +2,8 @@
 
 from datetime import date
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import List, Optional
 
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.pdfgen import canvas
 from sqlmodel import Session, select
 
 from ..models import (
@@ -16,30 +13,19 @@ from ..models import (
     PracticeStatus,
     Question,
 )
+from .knowledge import questions_tagged_with
 
 
 GENERATED_DIR = Path(__file__).resolve().parent.parent / "generated"
 GENERATED_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def _filter_mistakes(
-    mistakes: Iterable[Mistake],
-    knowledge_filters: Optional[List[str]],
-) -> List[Mistake]:
-    if not knowledge_filters:
-        return list(mistakes)
-
-    lowered_filters = [tag.lower() for tag in knowledge_filters]
-    filtered: List[Mistake] = []
-    for mistake in mistakes:
-        tags = (mistake.knowledge_tags or "").lower().split(",")
-        tags = [tag.strip() for tag in tags if tag.strip()]
-        if any(tag in lowered_filters for tag in tags):
-            filtered.append(mistake)
-    return filtered
-
-
 def _create_pdf(assignment: PracticeAssignment, items: List[PracticeItem]) -> str:
+    # Lazy import，reportlab 只在生成练习 PDF 时才需要
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
     pdf_path = GENERATED_DIR / f"practice_{assignment.id}.pdf"
     c = canvas.Canvas(str(pdf_path), pagesize=A4)
     width, height = A4
@@ -85,9 +71,9 @@ def generate_practice_assignment(
     max_items: int = 10,
 ) -> PracticeAssignment:
     mistake_stmt = select(Mistake).where(Mistake.student_id == student_id).order_by(Mistake.last_seen_at)
-    mistake_results = session.exec(mistake_stmt).all()
-
-    filtered_mistakes = _filter_mistakes(mistake_results, knowledge_filters)[:max_items]
+    if knowledge_filters:
+        mistake_stmt = mistake_stmt.where(Mistake.question_id.in_(questions_tagged_with(knowledge_filters)))
+    filtered_mistakes = session.exec(mistake_stmt.limit(max_items)).all()
 
     if not filtered_mistakes:
         raise ValueError("当前筛选条件下没有可用错题，请先完成考试上传或调整筛选条件。")
@@ -2,11 +2,15 @@ from __future__ import annotations
 
 from collections import Counter
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
+from sqlalchemy import case, func
 from sqlmodel import Session, select
 
-from ..models import ClassEnrollment, Mistake, Student, StudentProfile
+from ..models import ClassEnrollment, KnowledgeTag, Mistake, QuestionKnowledgeTag, Student, StudentProfile
+
+# 统计结构版本；缺少该版本号的旧数据在首次读取或增量更新前会整体重建一次。
+MISTAKE_STATS_VERSION = 2
 
 
 def ensure_student_profile(session: Session, student_id: int) -> StudentProfile:
@@ -22,7 +26,7 @@ def ensure_student_profile(session: Session, student_id: int) -> StudentProfile:
     profile = StudentProfile(
         student_id=student_id,
         profile_status=status,
-        latest_mistake_stats=_empty_stats(),
+        latest_mistake_stats=_build_mistake_stats(session, student_id),
         updated_at=datetime.utcnow(),
     )
     session.add(profile)
@@ -30,10 +34,17 @@ def ensure_student_profile(session: Session, student_id: int) -> StudentProfile:
     return profile
 
 
-def refresh_student_profile_stats(session: Session, student_id: int) -> StudentProfile:
+def refresh_student_profile_stats(
+    session: Session,
+    student_id: int,
+    *,
+    rebuild: bool = False,
+) -> StudentProfile:
+    """刷新档案状态；错题统计由批改增量维护，仅在 ``rebuild=True`` 或数据过旧时全量重建。"""
+
     profile = ensure_student_profile(session, student_id)
-    stats = _build_mistake_stats(session, student_id)
-    profile.latest_mistake_stats = stats
+    if rebuild or not _stats_are_current(profile.latest_mistake_stats):
+        profile.latest_mistake_stats = _build_mistake_stats(session, student_id)
 
     student = session.get(Student, student_id)
     if student:
@@ -45,40 +56,105 @@ def refresh_student_profile_stats(session: Session, student_id: int) -> StudentP
     return profile
 
 
+def apply_mistake_stats_delta(
+    session: Session,
+    student_id: int,
+    *,
+    created: Iterable[Mistake] = (),
+    seen_at: Optional[datetime] = None,
+) -> StudentProfile:
+    """把一次批改产生的错题变化累加到档案统计上，无需重新扫描该学生的全部错题。
+
+    ``created`` 为本次新建的错题；``seen_at`` 为本次被再次答错或已订正的错题的最新时间。
+    错题需已写入数据库：档案不存在时按错题表全量建立统计，其中已包含本次的错题，不再累加。
+    """
+
+    profile = session.get(StudentProfile, student_id)
+    if profile is None:
+        return ensure_student_profile(session, student_id)
+    stats = profile.latest_mistake_stats
+    if not _stats_are_current(stats):
+        profile.latest_mistake_stats = _build_mistake_stats(session, student_id)
+        session.add(profile)
+        session.flush()
+        return profile
+
+    created = list(created)
+    stats = dict(stats)
+    if created:
+        stats["total_mistakes"] = int(stats.get("total_mistakes") or 0) + len(created)
+        stats["incomplete_count"] = int(stats.get("incomplete_count") or 0) + sum(
+            1 for mistake in created if mistake.data_status != "complete"
+        )
+        tag_counter = Counter(
+            {item["tag"]: int(item["count"]) for item in stats.get("knowledge_distribution") or []},
+        )
+        question_ids = [mistake.question_id for mistake in created]
+        tag_rows = session.exec(
+            select(QuestionKnowledgeTag.question_id, KnowledgeTag.name)
+            .join(KnowledgeTag, KnowledgeTag.id == QuestionKnowledgeTag.tag_id)
+            .where(QuestionKnowledgeTag.question_id.in_(set(question_ids)))
+        ).all()
+        tags_by_question: Dict[int, List[str]] = {}
+        for question_id, name in tag_rows:
+            tags_by_question.setdefault(question_id, []).append(name)
+        for question_id in question_ids:
+            tag_counter.update(tags_by_question.get(question_id, []))
+        stats["knowledge_distribution"] = [
+            {"tag": tag, "count": count}
+            for tag, count in sorted(tag_counter.items(), key=lambda item: (-item[1], item[0]))
+        ]
+
+    latest_seen = max(
+        [moment for moment in [seen_at, *(mistake.last_seen_at for mistake in created)] if moment is not None],
+        default=None,
+    )
+    previous_seen = stats.get("last_mistake_at")
+    if latest_seen is not None and (
+        previous_seen is None or latest_seen > datetime.fromisoformat(str(previous_seen))
+    ):
+        stats["last_mistake_at"] = latest_seen.isoformat()
+
+    profile.latest_mistake_stats = stats
+    session.add(profile)
+    session.flush()
+    return profile
+
+
+def _stats_are_current(stats: Optional[Dict[str, object]]) -> bool:
+    return isinstance(stats, dict) and stats.get("stats_version") == MISTAKE_STATS_VERSION
+
+
 def _build_mistake_stats(session: Session, student_id: int) -> Dict[str, Optional[object]]:
-    mistakes: List[Mistake] = session.exec(
-        select(Mistake).where(Mistake.student_id == student_id)
+    total, incomplete_count, last_seen_at = session.exec(
+        select(
+            func.count(Mistake.id),
+            func.sum(case((Mistake.data_status != "complete", 1), else_=0)),
+            func.max(Mistake.last_seen_at),
+        ).where(Mistake.student_id == student_id)
+    ).one()
+
+    mistake_count = func.count(Mistake.id)
+    tag_rows = session.exec(
+        select(KnowledgeTag.name, mistake_count)
+        .join(QuestionKnowledgeTag, QuestionKnowledgeTag.question_id == Mistake.question_id)
+        .join(KnowledgeTag, KnowledgeTag.id == QuestionKnowledgeTag.tag_id)
+        .where(Mistake.student_id == student_id)
+        .group_by(KnowledgeTag.id, KnowledgeTag.name)
+        .order_by(mistake_count.desc(), KnowledgeTag.name)
     ).all()
 
-    total = len(mistakes)
-    tag_counter: Counter[str] = Counter()
-    incomplete_count = 0
-    last_seen_at: Optional[datetime] = None
-
-    for mistake in mistakes:
-        if mistake.knowledge_tags:
-            tags = [
-                tag.strip()
-                for tag in mistake.knowledge_tags.split(",")
-                if tag.strip()
-            ]
-            tag_counter.update(tags)
-        if mistake.data_status != "complete":
-            incomplete_count += 1
-        if mistake.last_seen_at:
-            if last_seen_at is None or mistake.last_seen_at > last_seen_at:
-                last_seen_at = mistake.last_seen_at
-
     distribution = [
         {"tag": tag, "count": count}
-        for tag, count in tag_counter.most_common()
+        for tag, count in tag_rows
     ]
 
     return {
         "total_mistakes": total,
         "knowledge_distribution": distribution,
         "last_mistake_at": last_seen_at.isoformat() if last_seen_at else None,
-        "incomplete_count": incomplete_count,
+        "incomplete_count": incomplete_count or 0,
+        "stats_version": MISTAKE_STATS_VERSION,
     }
 
 
@@ -90,12 +166,3 @@ def _has_core_fields(session: Session, student: Student) -> bool:
         select(ClassEnrollment.id).where(ClassEnrollment.student_id == student.id).limit(1)
     ).first()
     return enrollment_exists is not None
-
-
-def _empty_stats() -> Dict[str, Optional[object]]:
-    return {
-        "total_mistakes": 0,
-        "knowledge_distribution": [],
-        "last_mistake_at": None,
-        "incomplete_count": 0,
-    }
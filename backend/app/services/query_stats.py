@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+QUERY_TIME_HEADER = "X-Query-Time-Ms"
+DEFAULT_REPEAT_THRESHOLD = 10
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+_install_lock = threading.Lock()
+_installed = False
+_IN_LIST_PATTERN = re.compile(r"\((?:\?|%\(\w+\)s)(?:, (?:\?|%\(\w+\)s))+\)")
+
+
+@dataclass
+class QueryStats:
+    """一次请求（或一段代码）内执行的 SQL 语句数与累计耗时。"""
+
+    count: int = 0
+    duration_ms: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    def repeated(self, threshold: int = DEFAULT_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """执行次数不少于 ``threshold`` 的同构语句，通常意味着循环内逐行查询（N+1）。"""
+
+        return [(statement, times) for statement, times in self.statements.most_common() if times >= threshold]
+
+
+def query_debug_enabled() -> bool:
+    return (os.getenv("QUERY_DEBUG") or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _repeat_threshold() -> int:
+    try:
+        return max(2, int(os.getenv("QUERY_REPEAT_THRESHOLD", str(DEFAULT_REPEAT_THRESHOLD))))
+    except ValueError:
+        return DEFAULT_REPEAT_THRESHOLD
+
+
+def _normalize(statement: str) -> str:
+    # IN 列表长度不同的同一条语句归为一类。
+    return _IN_LIST_PATTERN.sub("(?)", " ".join(statement.split()))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_stats_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current_stats.get()
+    started = conn.info.get("query_stats_started")
+    if stats is None or not started:
+        return
+    stats.count += 1
+    stats.duration_ms += (time.perf_counter() - started.pop()) * 1000
+    stats.statements[_normalize(statement)] += 1
+
+
+def install_query_instrumentation() -> None:
+    """在所有 Engine 上注册游标事件；重复调用无副作用。"""
+
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _installed = True
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """统计代码块内执行的语句。
+
+    统计对象通过 contextvar 传递，FastAPI 在线程池中执行的同步依赖与路由函数会复制上下文，
+    因而一并计入；自行创建的工作线程不计入。
+    """
+
+    install_query_instrumentation()
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def report_repeated_queries(label: str, stats: QueryStats) -> List[Tuple[str, int]]:
+    repeated = stats.repeated(_repeat_threshold())
+    for statement, times in repeated:
+        logger.warning("Possible N+1 in %s: %d executions of %s", label, times, statement[:200])
+    return repeated
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Type, TypeVar
+
+from sqlalchemy import func, text
+from sqlmodel import Session, SQLModel, select
+
+from ..database import upsert_statement
+from ..models import ClassroomAnalyticsRollup, Exam, ExamAnalyticsRollup, Submission
+from .analytics import knowledge_tag_stats, merge_tag_stats, score_sketch, submission_totals
+from .sketches import ScoreSketch
+
+RollupT = TypeVar("RollupT", bound=SQLModel)
+
+# PostgreSQL advisory lock 两参数形式的命名空间，按汇总行的主键加锁。
+EXAM_ROLLUP_LOCK = 7240_01
+CLASSROOM_ROLLUP_LOCK = 7240_02
+
+
+def _lock_rollup(session: Session, namespace: int, key: int) -> None:
+    """持有事务级锁直到提交，串行化同一汇总行的重算。
+
+    汇总行由本事务所见的数据整行重算。PostgreSQL 上并发批改的事务互相看不到对方未提交的提交，
+    不加锁时后写入者会覆盖先写入者，汇总行漏掉提交；持锁后再聚合，READ COMMITTED 下能读到
+    先提交者的数据。SQLite 同一时刻只有一个写事务，调用方 flush 分数改动时已持有写锁。
+    """
+
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :key)"),
+            {"namespace": namespace, "key": key},
+        )
+
+
+def refresh_analytics_rollups(session: Session, exam_id: int) -> None:
+    """重算考试及其所属班级的预聚合行；只 flush，由调用方与分数改动一起提交。"""
+
+    session.flush()
+    classroom_id = session.exec(select(Exam.classroom_id).where(Exam.id == exam_id)).first()
+    # 先锁班级再锁考试：重建班级汇总时会顺带锁同班其他考试，统一顺序避免死锁。
+    if classroom_id is not None:
+        _lock_rollup(session, CLASSROOM_ROLLUP_LOCK, classroom_id)
+    refresh_exam_rollup(session, exam_id)
+    if classroom_id is not None:
+        refresh_classroom_rollup(session, classroom_id)
+
+
+def _upsert_rollup(session: Session, model: Type[RollupT], key: str, values: Dict[str, Any]) -> RollupT:
+    """按主键 ``INSERT ... ON CONFLICT DO UPDATE`` 写入汇总行；多个副本并发刷新同一行时不会主键冲突。"""
+
+    stmt = upsert_statement(
+        session,
+        model,
+        values,
+        index_elements=[key],
+        update_columns=[column for column in values if column != key],
+    )
+    return session.scalars(
+        stmt.returning(model),
+        execution_options={"populate_existing": True},
+    ).one()
+
+
+def refresh_exam_rollup(session: Session, exam_id: int) -> ExamAnalyticsRollup:
+    _lock_rollup(session, EXAM_ROLLUP_LOCK, exam_id)
+    conditions = [Submission.exam_id == exam_id]
+    values = {
+        "exam_id": exam_id,
+        **submission_totals(session, conditions),
+        "score_histogram": score_sketch(session, conditions).to_json(),
+        "tag_stats": knowledge_tag_stats(session, conditions),
+        "updated_at": datetime.utcnow(),
+    }
+    return _upsert_rollup(session, ExamAnalyticsRollup, "exam_id", values)
+
+
+def refresh_classroom_rollup(session: Session, classroom_id: int) -> ClassroomAnalyticsRollup:
+    """合并班级内各考试的汇总行；缺失或格式过旧的考试汇总（如历史数据）会先重建。"""
+
+    _lock_rollup(session, CLASSROOM_ROLLUP_LOCK, classroom_id)
+    exam_ids = session.exec(select(Exam.id).where(Exam.classroom_id == classroom_id)).all()
+    exam_rollups = {
+        rollup.exam_id: rollup
+        for rollup in session.exec(
+            select(ExamAnalyticsRollup).where(ExamAnalyticsRollup.exam_id.in_(exam_ids)),
+        ).all()
+    }
+    for exam_id in exam_ids:
+        rollup = exam_rollups.get(exam_id)
+        if rollup is None or ScoreSketch.from_json(rollup.score_histogram) is None:
+            exam_rollups[exam_id] = refresh_exam_rollup(session, exam_id)
+    parts = list(exam_rollups.values())
+
+    # 学生去重无法由各考试的计数相加得到，单独查询一次。
+    student_count = session.exec(
+        select(func.count(func.distinct(Submission.student_id))).where(Submission.exam_id.in_(exam_ids)),
+    ).one()
+
+    values = {
+        "classroom_id": classroom_id,
+        "submission_count": sum(part.submission_count for part in parts),
+        "student_count": int(student_count or 0),
+        "scored_count": sum(part.scored_count for part in parts),
+        "score_sum": sum(part.score_sum for part in parts),
+        "score_histogram": ScoreSketch.merge(
+            ScoreSketch.from_json(part.score_histogram) for part in parts
+        ).to_json(),
+        "tag_stats": merge_tag_stats(part.tag_stats for part in parts),
+        "updated_at": datetime.utcnow(),
+    }
+    return _upsert_rollup(session, ClassroomAnalyticsRollup, "classroom_id", values)
+
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 直方图分箱精度（分）与分箱上限：常见试卷按 0.5 分一箱；满分过高时箱宽取 0.5 的整数倍，
+# 保证不同试卷的分箱中心始终对齐。
+SKETCH_RESOLUTION = 0.5
+SKETCH_MAX_BINS = 256
+DISTRIBUTION_BUCKETS = 10
+# 序列化格式版本；旧版按下取整分箱，读回时视为缺失，由调用方重建或回退到实时聚合。
+SKETCH_FORMAT = 2
+
+
+def sketch_bin_width(max_score: float) -> float:
+    steps = int(max_score / SKETCH_RESOLUTION + 0.5) + 1
+    return SKETCH_RESOLUTION * max(1, math.ceil(steps / SKETCH_MAX_BINS))
+
+
+@dataclass
+class ScoreSketch:
+    """按满分定宽分箱的分数直方图，可合并，用于估算中位数与分位数。
+
+    第 i 箱以 ``i * bin_width`` 为中心，分数四舍五入到最近的箱，读回时取箱中心；
+    落在分箱网格上的分数（如按 0.5 分给分的总分）因此可以精确还原。
+    只保存每箱的计数，存储大小与提交数无关；超出满分的分数计入最后一箱。
+    箱宽相同的直方图可逐箱相加，合并结果是精确的。
+    """
+
+    max_score: float
+    bin_width: float = 0.0
+    counts: List[int] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if self.max_score <= 0:
+            self.max_score = 1.0
+        if self.bin_width <= 0:
+            self.bin_width = sketch_bin_width(self.max_score)
+        if not self.counts:
+            self.counts = [0] * (int(self.max_score / self.bin_width + 0.5) + 1)
+
+    @classmethod
+    def from_bin_counts(cls, max_score: float, bin_counts: Iterable[Tuple[int, int]]) -> "ScoreSketch":
+        """由 ``(分箱序号, 计数)`` 构建，通常来自数据库按 ``round(score / bin_width)`` 的 GROUP BY 结果。"""
+
+        sketch = cls(max_score)
+        for index, count in bin_counts:
+            sketch.counts[sketch._clamp(int(index))] += int(count)
+        return sketch
+
+    @classmethod
+    def from_json(cls, payload: Optional[Dict[str, object]]) -> Optional["ScoreSketch"]:
+        if not isinstance(payload, dict) or not isinstance(payload.get("counts"), list):
+            return None
+        if payload.get("format") != SKETCH_FORMAT:
+            return None
+        try:
+            return cls(
+                float(payload["max_score"]),
+                float(payload["bin_width"]),
+                [int(count) for count in payload["counts"]],
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            "format": SKETCH_FORMAT,
+            "max_score": self.max_score,
+            "bin_width": self.bin_width,
+            "counts": list(self.counts),
+        }
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def _clamp(self, index: int) -> int:
+        return min(max(index, 0), len(self.counts) - 1)
+
+    def index_of(self, score: float) -> int:
+        """分数所在分箱的序号（四舍五入到最近的箱中心）。"""
+
+        return self._clamp(math.floor(score / self.bin_width + 0.5))
+
+    def add(self, score: float, count: int = 1) -> None:
+        self.counts[self.index_of(score)] += count
+
+    def rebin(self, max_score: float, bin_width: float) -> "ScoreSketch":
+        """按箱中心把计数映射到另一套分箱网格。"""
+
+        target = ScoreSketch(max_score, bin_width)
+        for index, count in enumerate(self.counts):
+            if count:
+                target.add(index * self.bin_width, count)
+        return target
+
+    @classmethod
+    def merge(cls, sketches: Iterable[Optional["ScoreSketch"]]) -> "ScoreSketch":
+        """合并多份直方图（如班级内各考试、年级内各班级），满分与箱宽取各份中的最大值。"""
+
+        parts = [sketch for sketch in sketches if sketch is not None]
+        if not parts:
+            return cls(1.0)
+        merged = cls(
+            max(part.max_score for part in parts),
+            max(part.bin_width for part in parts),
+        )
+        for part in parts:
+            source = part if part.bin_width == merged.bin_width else part.rebin(merged.max_score, merged.bin_width)
+            for index, count in enumerate(source.counts):
+                merged.counts[merged._clamp(index)] += count
+        return merged
+
+    def _value_at(self, rank: int) -> float:
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if rank < seen:
+                return min(index * self.bin_width, self.max_score)
+        return self.max_score
+
+    def quantile(self, q: float) -> float:
+        """与 ``statistics.quantiles(method="inclusive")`` 相同的线性插值口径；q=0.5 即中位数。"""
+
+        total = self.count
+        if not total:
+            return 0.0
+        position = min(max(q, 0.0), 1.0) * (total - 1)
+        lower = int(position)
+        fraction = position - lower
+        value = self._value_at(lower)
+        if fraction:
+            value += fraction * (self._value_at(lower + 1) - value)
+        return value
+
+    def distribution(self, buckets: int = DISTRIBUTION_BUCKETS) -> List[Tuple[float, float, int]]:
+        """把 ``[0, max_score]`` 等分为 ``buckets`` 段，返回 ``(下界, 上界, 人数)``，满分计入最后一段。"""
+
+        width = self.max_score / buckets
+        counts = [0] * buckets
+        for index, count in enumerate(self.counts):
+            if count:
+                # 容差避免 1.4 / 0.7 这类浮点误差把恰在段边界上的分数划入前一段。
+                center = index * self.bin_width
+                counts[min(int(center / width + 1e-9), buckets - 1)] += count
+        return [(index * width, (index + 1) * width, count) for index, count in enumerate(counts)]
@@ -54,9 +54,26 @@ def build_analysis_context(
     mistakes_payload: List[Dict[str, object]] = []
     tag_counter: Counter[str] = Counter()
 
+    # 题目与作答各用一次 IN 查询批量取回，避免逐条 session.get。
+    questions = {
+        question.id: question
+        for question in session.exec(
+            select(Question).where(Question.id.in_({mistake.question_id for mistake in usable_mistakes})),
+        ).all()
+    }
+    response_ids = {mistake.response_id for mistake in usable_mistakes if mistake.response_id}
+    responses = (
+        {
+            response.id: response
+            for response in session.exec(select(Response).where(Response.id.in_(response_ids))).all()
+        }
+        if response_ids
+        else {}
+    )
+
     for mistake in usable_mistakes:
-        question = session.get(Question, mistake.question_id)
-        response = session.get(Response, mistake.response_id) if mistake.response_id else None
+        question = questions.get(mistake.question_id)
+        response = responses.get(mistake.response_id) if mistake.response_id else None
 
         if mistake.knowledge_tags:
             tags = [
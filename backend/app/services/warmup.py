@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import importlib.util
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .llm import get_qwen_client, llm_available
+from .ocr import preload_easyocr_reader, warm_easyocr_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WARMUP_COMPONENTS = "llm,easyocr"
+
+WARMUP_PENDING = "pending"
+WARMUP_READY = "ready"
+WARMUP_SKIPPED = "skipped"
+WARMUP_FAILED = "failed"
+
+WarmupResult = Tuple[str, str]
+
+_states: Dict[str, Dict[str, object]] = {}
+_states_lock = threading.Lock()
+
+
+def _warm_llm_client() -> WarmupResult:
+    if not llm_available():
+        return WARMUP_SKIPPED, "未配置大模型访问密钥"
+    get_qwen_client()
+    return WARMUP_READY, "大模型客户端已创建"
+
+
+def _warm_easyocr() -> WarmupResult:
+    if importlib.util.find_spec("easyocr") is None:
+        return WARMUP_SKIPPED, "未安装 EasyOCR"
+    futures = warm_easyocr_pool()
+    if futures:
+        for future in futures:
+            future.result()
+        return WARMUP_READY, f"已预热 {len(futures)} 个 EasyOCR 进程"
+    preload_easyocr_reader()
+    return WARMUP_READY, "EasyOCR 模型已在当前进程加载"
+
+
+WARMUP_TASKS: Dict[str, Callable[[], WarmupResult]] = {
+    "llm": _warm_llm_client,
+    "easyocr": _warm_easyocr,
+}
+
+
+def warmup_components() -> List[str]:
+    """需要预热的组件，由 ``STARTUP_WARMUP`` 逗号分隔配置；设为 ``none`` 时跳过预热。"""
+
+    raw_value = os.getenv("STARTUP_WARMUP", DEFAULT_WARMUP_COMPONENTS)
+    names = [name.strip().lower() for name in raw_value.split(",") if name.strip()]
+    if names == ["none"]:
+        return []
+    unknown = [name for name in names if name not in WARMUP_TASKS]
+    if unknown:
+        logger.warning("Ignoring unknown warm-up components: %s", ", ".join(unknown))
+    return [name for name in names if name in WARMUP_TASKS]
+
+
+def _set_state(name: str, status: str, detail: Optional[str] = None, duration_ms: Optional[float] = None) -> None:
+    with _states_lock:
+        _states[name] = {"name": name, "status": status, "detail": detail, "duration_ms": duration_ms}
+
+
+def _run_warmup(names: List[str]) -> None:
+    for name in names:
+        started = time.perf_counter()
+        try:
+            status, detail = WARMUP_TASKS[name]()
+        except Exception as exc:  # noqa: BLE001 - a failed warm-up must not block readiness forever
+            logger.exception("Warm-up of %s failed", name)
+            status, detail = WARMUP_FAILED, str(exc)
+        _set_state(name, status, detail, round((time.perf_counter() - started) * 1000, 1))
+
+
+def start_warmup() -> Optional[threading.Thread]:
+    """Preload OCR models and LLM clients in a background thread.
+
+    Startup returns immediately; :func:`get_readiness` reports progress until
+    every configured component has either loaded, been skipped or failed.
+    """
+
+    names = warmup_components()
+    with _states_lock:
+        _states.clear()
+    for name in names:
+        _set_state(name, WARMUP_PENDING)
+    if not names:
+        return None
+    thread = threading.Thread(target=_run_warmup, args=(names,), name="startup-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_readiness() -> Tuple[bool, List[Dict[str, object]]]:
+    with _states_lock:
+        components = [dict(state) for state in _states.values()]
+    ready = all(component["status"] != WARMUP_PENDING for component in components)
+    return ready, components
@@ -0,0 +1,113 @@
+"""对比 SQLite 默认配置与 WAL 配置在并发写入下的吞吐量与锁冲突次数。
+
+用法::
+
+    python -m backend.scripts.benchmark_sqlite_writes --workers 8 --writes 200
+
+每个工作线程模拟一次上传：读取考试题目、写入提交与作答、再写处理日志，各自独立提交事务。
+同时有读线程持续查询提交列表，用于体现 WAL 下读写互不阻塞。
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, select
+
+from backend.app import models  # noqa: F401 - ensure SQLModel metadata is populated
+from backend.app.database import SQLITE_PROFILES, create_sqlite_engine
+from backend.app.models import Exam, ProcessingLog, Question, Response, Submission
+
+
+def _seed(engine) -> int:
+    with Session(engine) as session:
+        exam = Exam(title="基准测试", teacher_id=1)
+        session.add(exam)
+        session.flush()
+        session.add_all([Question(exam_id=exam.id, number=str(number)) for number in range(1, 21)])
+        session.commit()
+        return exam.id
+
+
+def _upload(engine, exam_id: int, worker: int, writes: int, errors: Dict[str, int]) -> None:
+    for index in range(writes):
+        try:
+            with Session(engine) as session:
+                question_ids = session.exec(select(Question.id).where(Question.exam_id == exam_id)).all()
+                submission = Submission(student_id=worker, exam_id=exam_id)
+                session.add(submission)
+                session.flush()
+                session.add_all(
+                    [Response(submission_id=submission.id, question_id=question_id) for question_id in question_ids],
+                )
+                session.add(ProcessingLog(submission_id=submission.id, step="grading", detail=str(index)))
+                session.commit()
+        except OperationalError:
+            errors["locked"] += 1
+
+
+def _reader(engine, stop: threading.Event, reads: Dict[str, int]) -> None:
+    while not stop.is_set():
+        try:
+            with Session(engine) as session:
+                session.exec(select(Submission).order_by(Submission.id.desc()).limit(50)).all()
+            reads["count"] += 1
+        except OperationalError:
+            reads["locked"] += 1
+
+
+def run(profile: str, workers: int, writes: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(f"sqlite:///{Path(directory) / 'bench.db'}", profile=profile)
+        SQLModel.metadata.create_all(engine)
+        exam_id = _seed(engine)
+        errors = {"locked": 0}
+        reads = {"count": 0, "locked": 0}
+        stop = threading.Event()
+        reader = threading.Thread(target=_reader, args=(engine, stop, reads), daemon=True)
+
+        reader.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for worker in range(workers):
+                executor.submit(_upload, engine, exam_id, worker, writes, errors)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        reader.join()
+        engine.dispose()
+
+    committed = workers * writes - errors["locked"]
+    return {
+        "profile": profile,
+        "seconds": round(elapsed, 2),
+        "uploads_per_second": round(committed / elapsed, 1),
+        "locked_errors": errors["locked"],
+        "reads": reads["count"],
+        "read_errors": reads["locked"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200, help="每个线程模拟的上传次数")
+    args = parser.parse_args()
+
+    for profile in reversed(SQLITE_PROFILES):
+        result = run(profile, args.workers, args.writes)
+        print(
+            f"{result['profile']:>8}: {result['uploads_per_second']:>8} uploads/s  "
+            f"{result['seconds']:>6}s  locked={result['locked_errors']}  "
+            f"reads={result['reads']} (locked={result['read_errors']})",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""对比视觉 OCR 在原图直传与预处理（缩放 + 灰度重压缩）两种模式下的体积、耗时、token 与准确率。
+
+用法::
+
+    python -m backend.scripts.benchmark_vision_images samples/ --expected samples/answers.json
+
+``answers.json`` 形如 ``{"sheet01.jpg": {"1": "A", "2": "42"}}``；未提供时以原图结果为基准计算一致率。
+未配置 DASHSCOPE_API_KEY 时只统计请求体积。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.app.services import llm
+from backend.app.services.imaging import prepare_image_for_vision, sniff_image_mime_type
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"}
+MODES = ("original", "prepared")
+
+
+def _normalize(text: Optional[str]) -> str:
+    return "".join((text or "").split()).upper()
+
+
+class _UsageRecorder:
+    """包装 OpenAI 客户端，记录每次请求返回的 prompt token 数。"""
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+        self.prompt_tokens: List[int] = []
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs: Any) -> Any:
+        response = self._client.chat.completions.create(**kwargs)
+        usage = getattr(response, "usage", None)
+        self.prompt_tokens.append(int(getattr(usage, "prompt_tokens", 0) or 0))
+        return response
+
+
+def _accuracy(rows: List[Dict[str, Any]], expected: Dict[str, str]) -> Optional[float]:
+    if not expected:
+        return None
+    recognized = {str(row["question_number"]): _normalize(row.get("raw_text")) for row in rows}
+    matches = sum(1 for number, answer in expected.items() if recognized.get(str(number)) == _normalize(answer))
+    return matches / len(expected)
+
+
+def _benchmark_sheet(path: Path, expected: Dict[str, str], recorder: Optional[_UsageRecorder]) -> Dict[str, Any]:
+    image_bytes = path.read_bytes()
+    prepared = prepare_image_for_vision(image_bytes)
+    result: Dict[str, Any] = {
+        "file": path.name,
+        "original": {"bytes": len(image_bytes), "mime_type": sniff_image_mime_type(image_bytes)},
+        "prepared": {
+            "bytes": len(prepared.data),
+            "mime_type": prepared.mime_type,
+            "size": f"{prepared.width}x{prepared.height}",
+        },
+    }
+    if recorder is None:
+        return result
+
+    rows_by_mode: Dict[str, List[Dict[str, Any]]] = {}
+    for mode in MODES:
+        started = time.perf_counter()
+        try:
+            rows, _content = llm.run_vision_ocr(image_bytes, use_cache=False, prepare_image=mode == "prepared")
+        except llm.LLMInvocationError as exc:
+            result[mode]["error"] = str(exc)
+            continue
+        result[mode]["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result[mode]["prompt_tokens"] = recorder.prompt_tokens[-1] if recorder.prompt_tokens else None
+        rows_by_mode[mode] = rows
+
+    baseline = expected
+    if not baseline and "original" in rows_by_mode:
+        baseline = {str(row["question_number"]): row.get("raw_text") or "" for row in rows_by_mode["original"]}
+    for mode, rows in rows_by_mode.items():
+        result[mode]["accuracy" if expected else "agreement"] = _accuracy(rows, baseline)
+    return result
+
+
+def _summarize(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Optional[float]]]:
+    summary: Dict[str, Dict[str, Optional[float]]] = {}
+    for mode in MODES:
+        entries = [item[mode] for item in results]
+        summary[mode] = {}
+        for metric in ("bytes", "latency_ms", "prompt_tokens", "accuracy", "agreement"):
+            values = [entry[metric] for entry in entries if isinstance(entry.get(metric), (int, float))]
+            summary[mode][metric] = round(sum(values) / len(values), 4) if values else None
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("images", type=Path, help="答题卡图片目录")
+    parser.add_argument("--expected", type=Path, default=None, help="标准答案 JSON 文件")
+    args = parser.parse_args(argv)
+
+    expected_answers: Dict[str, Dict[str, str]] = {}
+    if args.expected:
+        expected_answers = json.loads(args.expected.read_text(encoding="utf-8"))
+
+    recorder: Optional[_UsageRecorder] = None
+    if llm.llm_available():
+        recorder = _UsageRecorder(llm._get_client())
+        llm._get_client = lambda: recorder  # type: ignore[assignment]
+    else:
+        print("未配置大模型访问密钥，仅统计请求体积。")
+
+    paths = sorted(path for path in args.images.iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+    results = [_benchmark_sheet(path, expected_answers.get(path.name, {}), recorder) for path in paths]
+    print(json.dumps({"sheets": results, "summary": _summarize(results)}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
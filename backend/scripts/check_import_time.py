@@ -0,0 +1,83 @@
+"""冷启动导入 ``backend.app.main`` 的耗时预算检查。
+
+用法::
+
+    python -m backend.scripts.check_import_time --budget-ms 2000
+
+在全新解释器中以 ``-X importtime`` 导入应用并打印耗时最多的模块。总耗时超过预算，
+或提前加载了应延迟导入的重量级依赖时，以非零状态码退出，可直接用于 CI。
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+TARGET_MODULE = "backend.app.main"
+DEFAULT_BUDGET_MS = 2000.0
+DEFERRED_MODULES = ("openai", "numpy", "PIL", "reportlab", "easyocr", "torch", "cv2", "pandas", "matplotlib")
+
+
+def measure_import(module: str = TARGET_MODULE) -> Dict[str, Tuple[float, float]]:
+    """返回 ``{模块名: (自身耗时 ms, 累计耗时 ms)}``。"""
+
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings: Dict[str, Tuple[float, float]] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        columns = line.split(":", 1)[1].split("|")
+        if len(columns) != 3:
+            continue
+        self_us, cumulative_us, name = columns
+        try:
+            timings[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+        except ValueError:  # 表头行
+            continue
+    return timings
+
+
+def eagerly_imported(timings: Dict[str, Tuple[float, float]]) -> List[str]:
+    return [name for name in DEFERRED_MODULES if name in timings]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the cold import time of the FastAPI app.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="允许的累计导入耗时（毫秒）")
+    parser.add_argument("--runs", type=int, default=3, help="重复测量次数，取最小值以降低噪声")
+    parser.add_argument("--top", type=int, default=15, help="打印耗时最多的模块数量")
+    args = parser.parse_args(argv)
+
+    runs = [measure_import() for _ in range(max(args.runs, 1))]
+    timings = min(runs, key=lambda run: run.get(TARGET_MODULE, (0.0, float("inf")))[1])
+    total_ms = timings[TARGET_MODULE][1]
+
+    print(f"{'self ms':>10} {'cumulative ms':>14}  module")
+    slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[: args.top]
+    for name, (self_ms, cumulative_ms) in slowest:
+        print(f"{self_ms:>10.1f} {cumulative_ms:>14.1f}  {name}")
+    print(f"\n{TARGET_MODULE}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    eager = eagerly_imported(timings)
+    if eager:
+        print(f"应延迟导入的模块在启动时被加载：{', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("导入耗时超出预算。")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app import models  # noqa: F401 - ensure SQLModel metadata is populated
+from backend.app.models import (
+    Classroom,
+    ClassroomAnalyticsRollup,
+    Exam,
+    ExamAnalyticsRollup,
+    Question,
+    QuestionType,
+    Response,
+    Student,
+    Submission,
+    Teacher,
+)
+from backend.app.schemas import AnalyticsFilter
+from backend.app.services.analytics import build_analytics
+from backend.app.services.knowledge import sync_question_knowledge_tags
+from backend.app.services.rollups import refresh_analytics_rollups
+
+
+@pytest.fixture(name="session")
+def session_fixture() -> Generator[Session, None, None]:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def _seed(session: Session) -> dict:
+    teacher = Teacher(name="李老师")
+    session.add(teacher)
+    session.commit()
+    classroom = Classroom(name="七年级一班", teacher_id=teacher.id)
+    session.add(classroom)
+    session.commit()
+    exam = Exam(title="期中", teacher_id=teacher.id, classroom_id=classroom.id)
+    other_exam = Exam(title="其他班级", teacher_id=teacher.id)
+    session.add(exam)
+    session.add(other_exam)
+    session.commit()
+
+    q1 = Question(exam_id=exam.id, number="1", type=QuestionType.multiple_choice, max_score=2, knowledge_tags="分数, 小数")
+    q2 = Question(exam_id=exam.id, number="2", type=QuestionType.subjective, max_score=5, knowledge_tags=None)
+    q3 = Question(exam_id=other_exam.id, number="1", type=QuestionType.multiple_choice, max_score=2, knowledge_tags="分数")
+    students = [Student(name=f"学生{index}") for index in range(3)]
+    session.add_all([q1, q2, q3, *students])
+    session.flush()
+    sync_question_knowledge_tags(session, [q1, q2, q3])
+    session.commit()
+
+    plan = [
+        (students[0], exam, 7.0, [(q1, 2.0, True, True), (q2, 5.0, True, True)]),
+        (students[1], exam, 2.0, [(q1, 0.0, False, True), (q2, 2.0, None, True)]),
+        (students[2], exam, None, [(q1, 0.0, False, False), (q2, None, None, True)]),
+        (students[0], other_exam, 0.0, [(q3, 0.0, False, True)]),
+    ]
+    for index, (student, target_exam, total, responses) in enumerate(plan):
+        submission = Submission(
+            student_id=student.id,
+            exam_id=target_exam.id,
+            total_score=total,
+            submitted_at=datetime(2024, 3, 1 + index),
+        )
+        session.add(submission)
+        session.commit()
+        for question, score, is_correct, applies in responses:
+            session.add(
+                Response(
+                    submission_id=submission.id,
+                    question_id=question.id,
+                    score=score,
+                    is_correct=is_correct,
+                    applies_to_student=applies,
+                ),
+            )
+    session.commit()
+    return {"exam": exam, "other_exam": other_exam, "classroom": classroom}
+
+
+def test_analytics_aggregates_in_database(session: Session) -> None:
+    seeded = _seed(session)
+
+    summary = build_analytics(session, AnalyticsFilter())
+    assert summary.total_submissions == 4
+    assert summary.total_students == 3
+    assert summary.average_score == pytest.approx(3.0)
+    assert summary.median_score == pytest.approx(2.0)
+    by_tag = {item.knowledge_tag: item for item in summary.knowledge_breakdown}
+    assert by_tag["分数"].total_attempts == 3
+    assert by_tag["分数"].incorrect_count == 2
+    assert by_tag["小数"].total_attempts == 2
+    assert by_tag["Unspecified"].total_attempts == 3
+    assert by_tag["Unspecified"].average_score == pytest.approx(7 / 3, abs=0.01)
+    assert summary.knowledge_breakdown[0].accuracy <= summary.knowledge_breakdown[-1].accuracy
+
+    classroom_summary = build_analytics(session, AnalyticsFilter(classroom_id=seeded["classroom"].id))
+    assert classroom_summary.total_submissions == 3
+    assert classroom_summary.median_score == pytest.approx(4.5)
+    assert {item.knowledge_tag for item in classroom_summary.knowledge_breakdown} == {"分数", "小数", "Unspecified"}
+
+    dated = build_analytics(session, AnalyticsFilter(start_date=date(2024, 3, 2), end_date=date(2024, 3, 4)))
+    assert dated.total_submissions == 2
+
+
+def test_analytics_on_empty_database(session: Session) -> None:
+    summary = build_analytics(session, AnalyticsFilter(exam_id=999))
+    assert summary.total_submissions == 0
+    assert summary.average_score == 0.0
+    assert summary.median_score == 0.0
+    assert summary.knowledge_breakdown == []
+
+
+def test_analytics_reads_rollups_for_exam_and_classroom(session: Session) -> None:
+    seeded = _seed(session)
+    exam, classroom = seeded["exam"], seeded["classroom"]
+    exam_filter = AnalyticsFilter(exam_id=exam.id)
+    classroom_filter = AnalyticsFilter(classroom_id=classroom.id)
+    computed = build_analytics(session, exam_filter)
+
+    refresh_analytics_rollups(session, exam.id)
+    refresh_analytics_rollups(session, seeded["other_exam"].id)
+    session.commit()
+    assert session.get(ExamAnalyticsRollup, exam.id).score_sum == pytest.approx(9.0)
+    assert session.get(ClassroomAnalyticsRollup, classroom.id).submission_count == 3
+
+    from_rollup = build_analytics(session, exam_filter)
+    assert from_rollup.total_submissions == computed.total_submissions
+    assert from_rollup.total_students == computed.total_students
+    assert from_rollup.average_score == computed.average_score
+    assert from_rollup.median_score == computed.median_score
+    assert sorted(from_rollup.knowledge_breakdown, key=lambda item: item.knowledge_tag) == sorted(
+        computed.knowledge_breakdown, key=lambda item: item.knowledge_tag
+    )
+    assert build_analytics(session, classroom_filter).model_dump() == from_rollup.model_dump()
+
+    # 汇总行只在刷新时变化；刷新后与基础表重新一致。
+    late = Submission(student_id=1, exam_id=exam.id, total_score=10.0, submitted_at=datetime(2024, 3, 9))
+    session.add(late)
+    session.commit()
+    assert build_analytics(session, exam_filter).total_submissions == 3
+    refresh_analytics_rollups(session, exam.id)
+    session.commit()
+    assert build_analytics(session, exam_filter).total_submissions == 4
+    assert build_analytics(session, classroom_filter).average_score == pytest.approx(19 / 3, abs=0.01)
+
+    dated = build_analytics(session, AnalyticsFilter(exam_id=exam.id, start_date=date(2024, 3, 2)))
+    assert dated.total_submissions == 3
+
+
+def test_grade_level_analytics_merge_classroom_sketches(session: Session) -> None:
+    seeded = _seed(session)
+    classroom = seeded["classroom"]
+    classroom.grade_level = "七年级"
+    sibling = Classroom(name="七年级二班", grade_level="七年级", teacher_id=classroom.teacher_id)
+    session.add_all([classroom, sibling])
+    session.commit()
+    sibling_exam = Exam(title="期中", teacher_id=classroom.teacher_id, classroom_id=sibling.id)
+    session.add(sibling_exam)
+    session.commit()
+    session.add(Question(exam_id=sibling_exam.id, number="1", max_score=10))
+    for student_id, total in [(1, 9.0), (2, 4.0), (3, 6.0)]:
+        session.add(Submission(student_id=student_id, exam_id=sibling_exam.id, total_score=total))
+    session.commit()
+
+    grade_filter = AnalyticsFilter(grade_level="七年级")
+    computed = build_analytics(session, grade_filter)
+    assert computed.total_submissions == 6
+    assert computed.total_students == 3
+    assert computed.median_score == pytest.approx(6.0)
+    assert computed.p25_score == pytest.approx(4.0)
+    assert computed.p75_score == pytest.approx(7.0)
+    assert computed.p90_score == pytest.approx(8.2)
+    assert sum(bucket.count for bucket in computed.score_distribution) == 5
+
+    refresh_analytics_rollups(session, seeded["exam"].id)
+    refresh_analytics_rollups(session, sibling_exam.id)
+    session.commit()
+    from_rollup = build_analytics(session, grade_filter)
+    assert from_rollup.total_submissions == computed.total_submissions
+    assert from_rollup.total_students == computed.total_students
+    assert from_rollup.average_score == computed.average_score
+    for name in ("p25_score", "median_score", "p75_score", "p90_score"):
+        assert getattr(from_rollup, name) == getattr(computed, name)
+    assert [bucket.count for bucket in from_rollup.score_distribution] == [
+        bucket.count for bucket in computed.score_distribution
+    ]
+
+
+@pytest.mark.parametrize(
+    "scores",
+    [[8.0], [8.0, 8.0, 8.0, 9.0, 9.0], [0.0, 3.5, 6.0, 9.5, 10.0, 10.0]],
+)
+def test_rollup_and_live_quantiles_agree(session: Session, scores: list) -> None:
+    teacher = Teacher(name="王老师")
+    session.add(teacher)
+    session.commit()
+    exam = Exam(title="单元测验", teacher_id=teacher.id)
+    session.add(exam)
+    session.commit()
+    session.add(Question(exam_id=exam.id, number="1", max_score=10))
+    for index, total in enumerate(scores):
+        student = Student(name=f"学生{index}")
+        session.add(student)
+        session.flush()
+        session.add(
+            Submission(student_id=student.id, exam_id=exam.id, total_score=total, submitted_at=datetime(2024, 3, 1)),
+        )
+    refresh_analytics_rollups(session, exam.id)
+    session.commit()
+
+    from_rollup = build_analytics(session, AnalyticsFilter(exam_id=exam.id))
+    # 带日期范围时不命中汇总行，走实时聚合。
+    live = build_analytics(session, AnalyticsFilter(exam_id=exam.id, start_date=date(2024, 1, 1)))
+    assert from_rollup.model_dump() == live.model_dump()
+    if len(scores) == 1:
+        assert from_rollup.median_score == scores[0]
+
+
+def test_exam_rollup_median_matches_exact_median(session: Session) -> None:
+    seeded = _seed(session)
+    exam_filter = AnalyticsFilter(exam_id=seeded["exam"].id)
+    classroom_filter = AnalyticsFilter(classroom_id=seeded["classroom"].id)
+    refresh_analytics_rollups(session, seeded["exam"].id)
+    session.commit()
+
+    # 期中只有 7.0 与 2.0 两个分数，中位数取两者平均。
+    assert build_analytics(session, exam_filter).median_score == 4.5
+
+    rollup = session.get(ExamAnalyticsRollup, seeded["exam"].id)
+    rollup.score_histogram = {"bin_width": 1.0, "counts": {"2": 1, "7": 1}}
+    session.add(rollup)
+    session.commit()
+    # 旧格式的直方图不再使用，回退到实时聚合，结果不变。
+    assert build_analytics(session, exam_filter).median_score == 4.5
+
+    ungraded = session.exec(select(Submission).where(Submission.total_score == 7.0)).one()
+    ungraded.total_score = None
+    session.add(ungraded)
+    refresh_analytics_rollups(session, seeded["exam"].id)
+    session.commit()
+    assert build_analytics(session, exam_filter).median_score == 2.0
+    assert build_analytics(session, classroom_filter).median_score == 2.0
@@ -35,27 +35,14 @@ def engine_fixture() -> Generator[Engine, None, None]:
 
 @pytest.fixture(name="client")
 def client_fixture(engine: Engine) -> Generator[TestClient, None, None]:
-    from backend.app import security
-
-    from contextlib import contextmanager
-
     def session_dependency() -> Generator[Session, None, None]:
         with Session(engine) as session:
             yield session
 
-    @contextmanager
-    def get_session_override() -> Generator[Session, None, None]:
-        with Session(engine) as session:
-            yield session
-
-    original_get_session = security.get_session
-    security.get_session = get_session_override  # type: ignore[assignment]
-
     app.dependency_overrides[_get_db] = session_dependency
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
-    security.get_session = original_get_session  # type: ignore[assignment]
 
 
 def _login(client: TestClient, email: str, password: str) -> str:
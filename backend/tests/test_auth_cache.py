@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Generator, List
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app import models  # noqa: F401 - ensure SQLModel metadata is populated
+from backend.app import security
+from backend.app.main import app, _get_db
+from backend.app.models import User
+from backend.app.services.cache import MemoryLRUCache
+from backend.app.services.query_stats import track_queries
+
+
+@pytest.fixture(name="engine")
+def engine_fixture() -> Generator[Engine, None, None]:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture(name="opened_sessions")
+def opened_sessions_fixture() -> List[Session]:
+    return []
+
+
+@pytest.fixture(name="client")
+def client_fixture(
+    engine: Engine,
+    opened_sessions: List[Session],
+    monkeypatch: pytest.MonkeyPatch,
+) -> Generator[TestClient, None, None]:
+    def session_dependency() -> Generator[Session, None, None]:
+        with Session(engine) as session:
+            opened_sessions.append(session)
+            yield session
+
+    monkeypatch.setenv("STARTUP_WARMUP", "none")
+    security.clear_user_cache()
+    app.dependency_overrides[_get_db] = session_dependency
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+    security.clear_user_cache()
+
+
+def _auth_headers(client: TestClient) -> dict[str, str]:
+    client.post(
+        "/auth/register",
+        json={"email": "cache@example.com", "password": "CachePass123!", "name": "Cache Teacher"},
+    )
+    token_resp = client.post(
+        "/auth/token",
+        data={"username": "cache@example.com", "password": "CachePass123!"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert token_resp.status_code == 200, token_resp.text
+    return {"Authorization": f"Bearer {token_resp.json()['access_token']}"}
+
+
+def _user_selects(stats) -> int:
+    return sum(times for statement, times in stats.statements.items() if "FROM user" in statement)
+
+
+def test_auth_shares_the_request_session(client: TestClient, opened_sessions: List[Session]) -> None:
+    headers = _auth_headers(client)
+    opened_sessions.clear()
+
+    response = client.get("/students", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert len(opened_sessions) == 1
+
+
+def test_repeat_requests_skip_the_user_lookup(client: TestClient) -> None:
+    headers = _auth_headers(client)
+    with track_queries() as first:
+        assert client.get("/auth/me", headers=headers).status_code == 200
+    with track_queries() as second:
+        assert client.get("/auth/me", headers=headers).status_code == 200
+
+    assert _user_selects(first) == 1
+    assert _user_selects(second) == 0
+
+
+def test_user_updates_invalidate_the_cached_snapshot(client: TestClient, engine: Engine) -> None:
+    headers = _auth_headers(client)
+    assert client.get("/auth/me", headers=headers).json()["name"] == "Cache Teacher"
+
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.email == "cache@example.com")).one()
+        user.name = "Renamed Teacher"
+        session.add(user)
+        session.commit()
+
+    assert client.get("/auth/me", headers=headers).json()["name"] == "Renamed Teacher"
+
+
+def test_deleted_user_is_rejected_immediately(client: TestClient, engine: Engine) -> None:
+    headers = _auth_headers(client)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+    with Session(engine) as session:
+        session.delete(session.exec(select(User).where(User.email == "cache@example.com")).one())
+        session.commit()
+
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+
+def test_expired_snapshot_is_reloaded(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(security, "_user_cache", MemoryLRUCache(ttl_seconds=30, max_entries=8))
+    headers = _auth_headers(client)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+    now = time.time()
+    monkeypatch.setattr("backend.app.services.cache.time.time", lambda: now + 31)
+    with track_queries() as stats:
+        assert client.get("/auth/me", headers=headers).status_code == 200
+
+    assert _user_selects(stats) == 1
+
+
+def test_cache_can_be_disabled(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(security, "USER_CACHE_TTL_SECONDS", 0)
+    headers = _auth_headers(client)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    with track_queries() as stats:
+        assert client.get("/auth/me", headers=headers).status_code == 200
+
+    assert _user_selects(stats) == 1
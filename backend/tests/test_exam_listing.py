@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app import models  # noqa: F401 - ensure SQLModel metadata is populated
+from backend.app.main import NEXT_CURSOR_HEADER, app, _get_db
+from backend.app.models import Exam, Question, User
+
+
+@pytest.fixture(name="engine")
+def engine_fixture() -> Generator[Engine, None, None]:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine: Engine, monkeypatch: pytest.MonkeyPatch) -> Generator[TestClient, None, None]:
+    def session_dependency() -> Generator[Session, None, None]:
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setenv("STARTUP_WARMUP", "none")
+
+    app.dependency_overrides[_get_db] = session_dependency
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="headers")
+def headers_fixture(client: TestClient) -> dict[str, str]:
+    client.post(
+        "/auth/register",
+        json={"email": "exams@example.com", "password": "ExamsPass123!", "name": "Exams Teacher"},
+    )
+    token_resp = client.post(
+        "/auth/token",
+        data={"username": "exams@example.com", "password": "ExamsPass123!"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert token_resp.status_code == 200, token_resp.text
+    return {"Authorization": f"Bearer {token_resp.json()['access_token']}"}
+
+
+def _seed_exams(engine: Engine, count: int) -> list[int]:
+    with Session(engine) as session:
+        owner_id = session.exec(select(User.id)).one()
+        exams = [
+            Exam(title=f"考试 {index}", teacher_id=1, owner_id=owner_id, parsed_outline={"questions": [index]})
+            for index in range(count)
+        ]
+        session.add_all(exams)
+        session.flush()
+        session.add_all(
+            [
+                Question(exam_id=exam.id, number=str(number), answer_key={"correct": "A"})
+                for index, exam in enumerate(exams)
+                for number in range(index + 1)
+            ],
+        )
+        session.commit()
+        return [exam.id for exam in exams]
+
+
+def test_exam_list_defaults_to_slim_summaries(
+    client: TestClient,
+    engine: Engine,
+    headers: dict[str, str],
+) -> None:
+    exam_ids = _seed_exams(engine, 3)
+
+    resp = client.get("/exams", headers=headers)
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert [item["id"] for item in body] == exam_ids
+    assert [item["question_count"] for item in body] == [1, 2, 3]
+    assert all("questions" not in item and "parsed_outline" not in item for item in body)
+
+
+def test_exam_list_pages_and_expands_questions(
+    client: TestClient,
+    engine: Engine,
+    headers: dict[str, str],
+) -> None:
+    exam_ids = _seed_exams(engine, 5)
+
+    seen: list[int] = []
+    cursor = None
+    while True:
+        params = {"limit": 2, "expand": "questions"}
+        if cursor:
+            params["cursor"] = cursor
+        resp = client.get("/exams", params=params, headers=headers)
+        assert resp.status_code == 200, resp.text
+        for item in resp.json():
+            assert len(item["questions"]) == exam_ids.index(item["id"]) + 1
+            seen.append(item["id"])
+        cursor = resp.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+
+    assert seen == exam_ids
+
+
+def test_unknown_expansion_is_rejected(client: TestClient, headers: dict[str, str]) -> None:
+    resp = client.get("/exams", params={"expand": "submissions"}, headers=headers)
+    assert resp.status_code == 400
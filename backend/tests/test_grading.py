@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app import models  # noqa: F401 - ensure SQLModel metadata is populated
+from backend.app.models import Exam, Question, QuestionType, Student, Submission, SubmissionStatus
+from backend.app.services import grading
+from backend.app.services.llm import LLMInvocationError, LLMNotConfiguredError
+
+
+@pytest.fixture(name="engine")
+def engine_fixture() -> Generator[Engine, None, None]:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture(name="db_session")
+def db_session_fixture(engine: Engine) -> Generator[Session, None, None]:
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(autouse=True)
+def _no_summary(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fake_summary(_rows):
+        raise LLMNotConfiguredError("not configured")
+
+    monkeypatch.setattr(grading, "summarize_submission", fake_summary)
+
+
+def _bootstrap_exam(session: Session, subjective_count: int) -> Submission:
+    student = Student(name="测试学生")
+    exam = Exam(title="主观题测试", teacher_id=1)
+    session.add(student)
+    session.add(exam)
+    session.commit()
+
+    session.add(
+        Question(
+            exam_id=exam.id,
+            number="1",
+            type=QuestionType.multiple_choice,
+            max_score=1.0,
+            answer_key={"correct": "A"},
+        ),
+    )
+    for index in range(subjective_count):
+        session.add(
+            Question(
+                exam_id=exam.id,
+                number=str(index + 2),
+                type=QuestionType.subjective,
+                prompt=f"简答题 {index + 2}",
+                max_score=10.0,
+                knowledge_tags="光合作用",
+            ),
+        )
+    submission = Submission(student_id=student.id, exam_id=exam.id)
+    session.add(submission)
+    session.commit()
+    session.refresh(exam, attribute_names=["questions"])
+    submission.exam = exam
+    return submission
+
+
+def test_subjective_questions_are_scored_concurrently(
+    db_session: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    submission = _bootstrap_exam(db_session, subjective_count=4)
+    rows = [{"question_number": "1", "raw_text": "A", "annotation": None, "confidence": 0.9}]
+    rows += [
+        {"question_number": str(number), "raw_text": f"答案{number}", "annotation": None, "confidence": 0.9}
+        for number in range(2, 6)
+    ]
+
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def fake_score(*, question_prompt, student_answer, max_score, rubric=None, reference_answer=None):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        if student_answer == "答案4":
+            raise LLMInvocationError("timeout")
+        return {"score": float(student_answer[-1]), "explanation": f"评语 {student_answer}"}
+
+    monkeypatch.setattr(grading, "score_subjective_answer", fake_score)
+    monkeypatch.setenv("SUBJECTIVE_SCORING_CONCURRENCY", "4")
+
+    artifacts = grading.auto_grade_submission(db_session, submission, rows)
+
+    assert peak > 1
+    scores = [response.score for response in artifacts.responses]
+    assert scores == [1.0, 2.0, 3.0, None, 5.0]
+    assert artifacts.responses[1].comments == "评语 答案2"
+    assert submission.status == SubmissionStatus.needs_review
+    assert submission.total_score == pytest.approx(11.0)
+    subjective_steps = [step.status for step in artifacts.steps if step.name == "AI 主观题评分"]
+    assert subjective_steps == ["success", "success", "error", "success"]
+    assert len(artifacts.mistakes) == 3
+
+
+@pytest.mark.parametrize("profile_exists", [True, False])
+def test_mistake_stats_are_maintained_incrementally(
+    db_session: Session,
+    monkeypatch: pytest.MonkeyPatch,
+    profile_exists: bool,
+) -> None:
+    from backend.app.models import StudentProfile
+    from backend.app.services import profile as profile_service
+    from backend.app.services.knowledge import sync_question_knowledge_tags
+
+    submission = _bootstrap_exam(db_session, subjective_count=2)
+    sync_question_knowledge_tags(db_session, submission.exam.questions)
+    # 首次批改时档案尚不存在，按错题表建立的统计已包含本次错题，不能再累加一次。
+    if profile_exists:
+        profile_service.ensure_student_profile(db_session, submission.student_id)
+    db_session.commit()
+
+    monkeypatch.setattr(
+        grading,
+        "score_subjective_answer",
+        lambda **kwargs: {"score": 2.0, "explanation": "要点缺失"},
+    )
+    rows = [
+        {"question_number": "1", "raw_text": "B", "annotation": None, "confidence": 0.9},
+        {"question_number": "2", "raw_text": "答案", "annotation": None, "confidence": 0.9},
+        {"question_number": "3", "raw_text": "答案", "annotation": None, "confidence": 0.9},
+    ]
+    grading.auto_grade_submission(db_session, submission, rows)
+
+    rebuild_calls = []
+    original_build = profile_service._build_mistake_stats
+    monkeypatch.setattr(
+        profile_service,
+        "_build_mistake_stats",
+        lambda session, student_id: rebuild_calls.append(student_id) or original_build(session, student_id),
+    )
+
+    stats = db_session.get(StudentProfile, submission.student_id).latest_mistake_stats
+    assert stats["total_mistakes"] == 3
+    assert stats["knowledge_distribution"] == [{"tag": "光合作用", "count": 2}]
+
+    retry = Submission(student_id=submission.student_id, exam_id=submission.exam_id)
+    db_session.add(retry)
+    db_session.commit()
+    retry.exam = submission.exam
+    rows[0]["raw_text"] = "A"
+    grading.auto_grade_submission(db_session, retry, rows)
+
+    refreshed = profile_service.refresh_student_profile_stats(db_session, submission.student_id)
+    assert rebuild_calls == []
+    assert refreshed.latest_mistake_stats == original_build(db_session, submission.student_id)
+
+
+def test_responses_and_mistakes_are_written_in_bulk(engine: Engine, db_session: Session) -> None:
+    from sqlalchemy import event
+
+    from backend.app.models import Mistake
+
+    submission = _bootstrap_exam(db_session, subjective_count=0)
+    for index in range(2, 31):
+        db_session.add(
+            Question(
+                exam_id=submission.exam_id,
+                number=str(index),
+                type=QuestionType.multiple_choice,
+                answer_key={"correct": "A"},
+            ),
+        )
+    db_session.commit()
+    db_session.refresh(submission.exam, attribute_names=["questions"])
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2].split()[0:3]))
+
+    rows = [{"question_number": str(number), "raw_text": "B", "confidence": 0.9} for number in range(1, 31)]
+    artifacts = grading.auto_grade_submission(db_session, submission, rows)
+    assert len(artifacts.mistakes) == 30
+    assert [response.question_id for response in artifacts.responses] == [
+        question.id for question in submission.exam.questions
+    ]
+    assert statements.count(["INSERT", "INTO", "response"]) == 1
+    assert statements.count(["INSERT", "INTO", "mistake"]) == 1
+    assert statements.count(["SELECT", "mistake.id,", "mistake.student_id,"]) == 1
+
+    retry = Submission(student_id=submission.student_id, exam_id=submission.exam_id)
+    db_session.add(retry)
+    db_session.commit()
+    retry.exam = submission.exam
+    rows = [{**row, "raw_text": "A" if int(row["question_number"]) % 2 else "B"} for row in rows]
+    statements.clear()
+    artifacts = grading.auto_grade_submission(db_session, retry, rows)
+
+    assert len(artifacts.mistakes) == 15
+    assert {mistake.response_id for mistake in artifacts.mistakes} <= {response.id for response in artifacts.responses}
+    assert statements.count(["INSERT", "INTO", "mistake"]) == 0
+    assert sum(1 for statement in statements if statement[:2] == ["UPDATE", "mistake"]) == 2
+    mistakes = db_session.exec(select(Mistake)).all()
+    assert len(mistakes) == 30
+    assert sum(1 for mistake in mistakes if mistake.resolution_notes) == 15
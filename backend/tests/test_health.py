@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app.main import app
+from backend.app.services import warmup
+
+
+def test_ready_endpoint_waits_for_warmup(monkeypatch: pytest.MonkeyPatch) -> None:
+    release = threading.Event()
+
+    def slow_model():
+        release.wait(timeout=10)
+        return warmup.WARMUP_READY, "loaded"
+
+    def failing_client():
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(warmup.WARMUP_TASKS, "easyocr", slow_model)
+    monkeypatch.setitem(warmup.WARMUP_TASKS, "llm", failing_client)
+    monkeypatch.setenv("STARTUP_WARMUP", "llm,easyocr")
+
+    with TestClient(app) as client:
+        cold = client.get("/health/ready")
+        assert cold.status_code == 503
+        assert cold.json()["ready"] is False
+
+        release.set()
+        for _ in range(100):
+            warm = client.get("/health/ready")
+            if warm.status_code == 200:
+                break
+            threading.Event().wait(0.05)
+
+    assert warm.status_code == 200, warm.text
+    statuses = {item["name"]: item["status"] for item in warm.json()["components"]}
+    assert statuses == {"llm": "failed", "easyocr": "ready"}
+
+
+def test_warmup_can_be_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("STARTUP_WARMUP", "none")
+
+    with TestClient(app) as client:
+        response = client.get("/health/ready")
+
+    assert response.status_code == 200
+    assert response.json() == {"ready": True, "components": []}
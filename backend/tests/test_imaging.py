@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app.services.imaging import VisionImageSettings, prepare_image_for_vision, vision_image_settings
+
+
+def _png_bytes(width: int, height: int) -> bytes:
+    image = Image.new("RGB", (width, height), color=(250, 250, 240))
+    for x in range(0, width, 7):
+        for y in range(0, height, 11):
+            image.putpixel((x, y), ((x * 13) % 256, (y * 7) % 256, 40))
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_large_scan_is_downsampled_to_grayscale_jpeg() -> None:
+    original = _png_bytes(4000, 3000)
+
+    prepared = prepare_image_for_vision(original, VisionImageSettings(max_edge=1600, quality=75))
+
+    assert prepared.mime_type == "image/jpeg"
+    assert (prepared.width, prepared.height) == (1600, 1200)
+    assert prepared.original_size == len(original)
+    assert len(prepared.data) < len(original)
+    with Image.open(BytesIO(prepared.data)) as decoded:
+        assert decoded.format == "JPEG"
+        assert decoded.mode == "L"
+
+
+def test_original_mode_and_unreadable_bytes_pass_through(monkeypatch: pytest.MonkeyPatch) -> None:
+    original = _png_bytes(64, 48)
+    monkeypatch.setenv("VISION_IMAGE_FORMAT", "original")
+
+    prepared = prepare_image_for_vision(original, vision_image_settings())
+    assert prepared.data == original
+    assert prepared.mime_type == "image/png"
+
+    garbage = prepare_image_for_vision(b"not-an-image", VisionImageSettings(output_format="webp"))
+    assert garbage.data == b"not-an-image"
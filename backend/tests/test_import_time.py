@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.scripts.check_import_time import DEFERRED_MODULES
+
+
+def test_app_import_defers_heavy_dependencies() -> None:
+    probe = (
+        "import sys\n"
+        "import backend.app.main\n"
+        f"print(','.join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert completed.stdout.strip() == ""
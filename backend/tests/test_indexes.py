@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Generator, List
+
+import pytest
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app import models  # noqa: F401 - ensure SQLModel metadata is populated
+from backend.app.migrations import ensure_indexes
+from backend.app.models import (
+    ClassEnrollment,
+    Mistake,
+    PracticeItem,
+    Question,
+    Response,
+    StudentProfile,
+    Submission,
+)
+from backend.app.services.mistakes import merge_duplicate_mistakes
+
+
+@pytest.fixture(name="engine")
+def engine_fixture() -> Generator[Engine, None, None]:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+def _query_plan(engine: Engine, stmt) -> List[str]:
+    compiled = stmt.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+    return [row[-1] for row in rows]
+
+
+HOT_QUERIES = {
+    "mistake prefetch during grading": (
+        select(Mistake).where(Mistake.student_id == 1, Mistake.question_id.in_([1, 2, 3])),
+        "uq_mistake_student_question",
+    ),
+    "mistakes by student": (
+        select(Mistake).where(Mistake.student_id == 1),
+        "uq_mistake_student_question",
+    ),
+    "responses of a page of submissions": (
+        select(Response).where(Response.submission_id.in_([1, 2, 3])),
+        "ix_response_submission_id",
+    ),
+    "responses by question": (
+        select(Response.id).where(Response.question_id == 1),
+        "ix_response_question_id",
+    ),
+    "submission page for an owner": (
+        select(Submission)
+        .where(Submission.owner_id == 1, Submission.submitted_at < datetime(2024, 1, 1))
+        .order_by(Submission.submitted_at.desc(), Submission.id.desc())
+        .limit(51),
+        "ix_submission_owner_submitted_at",
+    ),
+    "score quantile within an exam": (
+        select(Submission.total_score)
+        .where(Submission.exam_id == 1, Submission.total_score.is_not(None))
+        .order_by(Submission.total_score)
+        .offset(10)
+        .limit(2),
+        "ix_submission_exam_total_score",
+    ),
+    "submissions by student": (
+        select(Submission.id).where(Submission.student_id == 1),
+        "ix_submission_student_id",
+    ),
+    "questions of an exam": (
+        select(Question).where(Question.exam_id == 1),
+        "ix_question_exam_id",
+    ),
+    "enrollments of a classroom": (
+        select(ClassEnrollment).where(ClassEnrollment.classroom_id == 1),
+        "ix_classenrollment_classroom_id",
+    ),
+    "enrollments of a student": (
+        select(ClassEnrollment).where(ClassEnrollment.student_id == 1),
+        "ix_classenrollment_student_id",
+    ),
+    "items of practice assignments": (
+        select(PracticeItem).where(PracticeItem.assignment_id.in_([1, 2])),
+        "ix_practiceitem_assignment_id",
+    ),
+}
+
+
+@pytest.mark.parametrize("label", sorted(HOT_QUERIES))
+def test_hot_queries_use_indexes(engine: Engine, label: str) -> None:
+    stmt, index_name = HOT_QUERIES[label]
+    plan = _query_plan(engine, stmt)
+
+    assert any(index_name in step for step in plan), plan
+    assert not any(step.startswith("SCAN") and "INDEX" not in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_ensure_indexes_adds_missing_indexes_idempotently(engine: Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_response_submission_id")
+        connection.exec_driver_sql("DROP INDEX uq_mistake_student_question")
+
+    with engine.begin() as connection:
+        assert ensure_indexes(connection) == ["ix_response_submission_id", "uq_mistake_student_question"]
+        assert ensure_indexes(connection) == []
+
+
+def test_duplicate_mistakes_are_merged_before_unique_index(engine: Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX uq_mistake_student_question")
+    with Session(engine) as session:
+        rows = [
+            Mistake(student_id=1, question_id=7, response_id=10, error_count=2, last_seen_at=datetime(2024, 3, 1)),
+            Mistake(student_id=1, question_id=7, response_id=11, error_count=1, last_seen_at=datetime(2024, 5, 1)),
+            Mistake(student_id=1, question_id=8, response_id=12),
+        ]
+        session.add_all(rows)
+        session.add(StudentProfile(student_id=1, latest_mistake_stats={"total_mistakes": 3}))
+        session.flush()
+        session.add(PracticeItem(assignment_id=1, question_id=7, source_mistake_id=rows[1].id))
+        session.commit()
+        keeper_id = rows[0].id
+
+    with engine.begin() as connection:
+        assert merge_duplicate_mistakes(connection) == 1
+        assert ensure_indexes(connection) == ["uq_mistake_student_question"]
+
+    with Session(engine) as session:
+        merged = session.exec(select(Mistake).where(Mistake.question_id == 7)).one()
+        assert merged.id == keeper_id
+        assert merged.error_count == 3
+        assert merged.response_id == 11
+        assert merged.last_seen_at == datetime(2024, 5, 1)
+        assert session.exec(select(PracticeItem.source_mistake_id)).one() == keeper_id
+        assert session.get(StudentProfile, 1).latest_mistake_stats is None
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app import models  # noqa: F401 - ensure SQLModel metadata is populated
+from backend.app.models import Exam, KnowledgeTag, Question, QuestionKnowledgeTag
+from backend.app.services.knowledge import (
+    backfill_question_knowledge_tags,
+    questions_tagged_with,
+    split_knowledge_tags,
+    sync_question_knowledge_tags,
+)
+
+
+@pytest.fixture(name="engine")
+def engine_fixture() -> Generator[Engine, None, None]:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+def _questions(session: Session, *raw_tags: str) -> list[Question]:
+    exam = Exam(title="标签测试", teacher_id=1)
+    session.add(exam)
+    session.flush()
+    questions = [
+        Question(exam_id=exam.id, number=str(index + 1), knowledge_tags=tags)
+        for index, tags in enumerate(raw_tags)
+    ]
+    session.add_all(questions)
+    session.flush()
+    return questions
+
+
+def test_split_knowledge_tags_deduplicates_and_strips() -> None:
+    assert split_knowledge_tags(" 分数, 小数 ,,分数, Fractions,fractions ") == ["分数", "小数", "Fractions"]
+    assert split_knowledge_tags(None) == []
+
+
+def test_sync_and_filter_by_tag(engine: Engine) -> None:
+    with Session(engine) as session:
+        first, second, untagged = _questions(session, "Linear_Equations, 函数", "函数", "")
+        sync_question_knowledge_tags(session, [first, second, untagged])
+
+        assert set(session.exec(questions_tagged_with(["linear_equations"])).all()) == {first.id}
+        assert set(session.exec(questions_tagged_with(["函数"])).all()) == {first.id, second.id}
+
+        first.knowledge_tags = "几何"
+        sync_question_knowledge_tags(session, [first])
+        assert set(session.exec(questions_tagged_with(["函数"])).all()) == {second.id}
+        assert len(session.exec(select(KnowledgeTag)).all()) == 3
+
+
+def test_backfill_links_legacy_questions_once(engine: Engine) -> None:
+    with Session(engine) as session:
+        legacy, synced = _questions(session, "概率, 统计", "统计")
+        sync_question_knowledge_tags(session, [synced])
+        session.commit()
+        legacy_id = legacy.id
+
+    with engine.begin() as connection:
+        assert backfill_question_knowledge_tags(connection) == 1
+        assert backfill_question_knowledge_tags(connection) == 0
+
+    with Session(engine) as session:
+        links = session.exec(select(QuestionKnowledgeTag).where(QuestionKnowledgeTag.question_id == legacy_id)).all()
+        assert len(links) == 2
+        assert len(session.exec(select(KnowledgeTag)).all()) == 2
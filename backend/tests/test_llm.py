@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app.services import llm
+
+
+class FakeCompletions:
+    def __init__(self, replies: List[str]) -> None:
+        self.replies = list(replies)
+        self.calls: List[Dict[str, Any]] = []
+
+    def create(self, **kwargs: Any) -> SimpleNamespace:
+        self.calls.append(kwargs)
+        content = self.replies.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@pytest.fixture(autouse=True)
+def _memory_llm_cache(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "memory")
+    llm.reset_llm_response_cache()
+    yield
+    llm.reset_llm_response_cache()
+
+
+def _install_fake_client(monkeypatch: pytest.MonkeyPatch, replies: List[str]) -> FakeCompletions:
+    completions = FakeCompletions(replies)
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(llm, "_get_client", lambda: fake_client)
+    return completions
+
+
+def _items() -> List[Dict[str, Any]]:
+    return [
+        {
+            "question_id": 11,
+            "question_prompt": "什么是光合作用？",
+            "student_answer": "光合作用",
+            "max_score": 5.0,
+            "rubric": None,
+            "reference_answer": {"text": "植物利用光能合成有机物"},
+        },
+        {
+            "question_id": 12,
+            "question_prompt": "简述蒸腾作用",
+            "student_answer": "水分散失",
+            "max_score": 4.0,
+            "rubric": None,
+            "reference_answer": None,
+        },
+    ]
+
+
+def test_batch_scoring_uses_single_completion(monkeypatch: pytest.MonkeyPatch) -> None:
+    reply = json.dumps(
+        [
+            {"question_id": 11, "score": 9, "explanation": "要点完整"},
+            {"question_id": "12", "score": 2.5, "explanation": "不够具体"},
+        ],
+        ensure_ascii=False,
+    )
+    completions = _install_fake_client(monkeypatch, [f"```json\n{reply}\n```"])
+
+    results = llm.score_subjective_answers_batch(_items())
+
+    assert len(completions.calls) == 1
+    assert results[11] == {"score": 5.0, "explanation": "要点完整"}
+    assert results[12] == {"score": 2.5, "explanation": "不够具体"}
+
+
+def test_batch_scoring_falls_back_for_missing_questions(monkeypatch: pytest.MonkeyPatch) -> None:
+    completions = _install_fake_client(
+        monkeypatch,
+        [
+            json.dumps([{"question_id": 11, "score": 3, "explanation": "基本正确"}], ensure_ascii=False),
+            json.dumps({"score": 1, "explanation": "单题回退"}, ensure_ascii=False),
+        ],
+    )
+
+    results = llm.score_subjective_answers_batch(_items())
+
+    assert len(completions.calls) == 2
+    assert results[11]["score"] == 3.0
+    assert results[12] == {"score": 1.0, "explanation": "单题回退"}
+
+
+def test_batch_scoring_falls_back_when_reply_is_unparseable(monkeypatch: pytest.MonkeyPatch) -> None:
+    completions = _install_fake_client(
+        monkeypatch,
+        [
+            "抱歉，无法评分。",
+            json.dumps({"score": 4, "explanation": "正确"}, ensure_ascii=False),
+            "still not json",
+        ],
+    )
+
+    results = llm.score_subjective_answers_batch(_items())
+
+    assert len(completions.calls) == 3
+    assert results[11]["score"] == 4.0
+    assert isinstance(results[12], llm.LLMInvocationError)
+
+
+def test_batch_fallback_runs_concurrently_within_the_cap(monkeypatch: pytest.MonkeyPatch) -> None:
+    import threading
+    import time
+
+    _install_fake_client(monkeypatch, ["not json"])
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def fake_single(**kwargs: Any) -> Dict[str, Any]:
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return {"score": 1.0, "explanation": kwargs["student_answer"]}
+
+    monkeypatch.setattr(llm, "score_subjective_answer", fake_single)
+    items = [dict(_items()[0], question_id=question_id, student_answer=str(question_id)) for question_id in range(5)]
+
+    results = llm.score_subjective_answers_batch(items, max_workers=2)
+
+    assert active["peak"] == 2
+    assert {question_id: result["explanation"] for question_id, result in results.items()} == {
+        question_id: str(question_id) for question_id in range(5)
+    }
+
+
+def test_batch_scoring_does_not_hide_programming_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    _install_fake_client(monkeypatch, ["[]"])
+
+    def broken_parser(_content: str, _items: List[Dict[str, Any]]):
+        raise AttributeError("bug")
+
+    monkeypatch.setattr(llm, "_parse_batch_scores", broken_parser)
+
+    with pytest.raises(AttributeError):
+        llm.score_subjective_answers_batch(_items())
+
+
+def test_identical_scoring_requests_are_served_from_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    completions = _install_fake_client(
+        monkeypatch,
+        [json.dumps({"score": 4, "explanation": "正确"}, ensure_ascii=False)],
+    )
+    kwargs = {key: value for key, value in _items()[0].items() if key != "question_id"}
+
+    first = llm.score_subjective_answer(**kwargs)
+    second = llm.score_subjective_answer(**kwargs)
+
+    assert first == second == {"score": 4.0, "explanation": "正确"}
+    assert len(completions.calls) == 1
+    assert llm.get_llm_cache_stats()["subjective_score"] == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_cache_can_be_bypassed_and_skips_unparseable_replies(monkeypatch: pytest.MonkeyPatch) -> None:
+    completions = _install_fake_client(
+        monkeypatch,
+        [
+            "not json",
+            json.dumps({"score": 2, "explanation": "部分正确"}, ensure_ascii=False),
+            json.dumps({"score": 3, "explanation": "重新评分"}, ensure_ascii=False),
+        ],
+    )
+    kwargs = {key: value for key, value in _items()[1].items() if key != "question_id"}
+
+    with pytest.raises(llm.LLMInvocationError):
+        llm.score_subjective_answer(**kwargs)
+    assert llm.score_subjective_answer(**kwargs)["score"] == 2.0
+    assert llm.score_subjective_answer(**kwargs, use_cache=False)["score"] == 3.0
+    assert llm.score_subjective_answer(**kwargs)["score"] == 2.0
+    assert len(completions.calls) == 3
+
+
+def test_cache_is_disabled_when_backend_is_off(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "off")
+    llm.reset_llm_response_cache()
+    reply = json.dumps([{"question_id": 11, "score": 1, "explanation": "ok"}, {"question_id": 12, "score": 1, "explanation": "ok"}])
+    completions = _install_fake_client(monkeypatch, [reply, reply])
+
+    llm.score_subjective_answers_batch(_items())
+    llm.score_subjective_answers_batch(_items())
+
+    assert len(completions.calls) == 2
+    assert llm.get_llm_cache_stats() == {}
+
+
+def test_vision_ocr_sends_prepared_jpeg(monkeypatch: pytest.MonkeyPatch) -> None:
+    from io import BytesIO
+
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", (3000, 2000), color=(255, 255, 255)).save(buffer, format="PNG")
+    reply = json.dumps({"rows": [{"question_number": "1", "raw_text": "A", "confidence": 0.9}]})
+    completions = _install_fake_client(monkeypatch, [reply, reply])
+
+    rows, _content = llm.run_vision_ocr(buffer.getvalue())
+    llm.run_vision_ocr(buffer.getvalue(), use_cache=False, prepare_image=False)
+
+    prepared_url = completions.calls[0]["messages"][1]["content"][0]["image_url"]["url"]
+    raw_url = completions.calls[1]["messages"][1]["content"][0]["image_url"]["url"]
+    assert rows[0]["raw_text"] == "A"
+    assert prepared_url.startswith("data:image/jpeg;base64,")
+    assert raw_url.startswith("data:image/png;base64,")
+    assert len(prepared_url) < len(raw_url)
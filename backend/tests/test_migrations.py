@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import List
+
+import pytest
+from sqlalchemy import inspect
+from sqlmodel import Session, SQLModel, select
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app import models  # noqa: F401 - ensure SQLModel metadata is populated
+from backend.app.database import create_sqlite_engine
+from backend.app.migrations import LATEST_SCHEMA_VERSION, MIGRATIONS, current_schema_version, run_migrations
+from backend.app.models import SchemaMigration
+from backend.app.services.query_stats import track_queries
+
+
+def test_fresh_database_applies_every_migration_once(tmp_path: Path) -> None:
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    try:
+        assert run_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+        assert current_schema_version(engine) == LATEST_SCHEMA_VERSION
+        assert inspect(engine).has_table("submission")
+
+        with track_queries() as stats:
+            assert run_migrations(engine) == []
+        # 已是最新版本：只查询版本表是否存在与最高版本。
+        assert stats.count <= 2
+    finally:
+        engine.dispose()
+
+
+def test_legacy_database_without_version_table_is_upgraded(tmp_path: Path) -> None:
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    try:
+        legacy_tables = [table for table in SQLModel.metadata.sorted_tables if table.name != "schemamigration"]
+        SQLModel.metadata.create_all(engine, tables=legacy_tables)
+        with engine.begin() as connection:
+            connection.exec_driver_sql("DROP INDEX ix_question_exam_id")
+            connection.exec_driver_sql("ALTER TABLE exam DROP COLUMN source_image_path")
+
+        assert run_migrations(engine) == [1, 2]
+
+        assert "source_image_path" in {column["name"] for column in inspect(engine).get_columns("exam")}
+        assert "ix_question_exam_id" in {index["name"] for index in inspect(engine).get_indexes("question")}
+        with Session(engine) as session:
+            assert session.exec(select(SchemaMigration.version)).all() == [1, 2]
+    finally:
+        engine.dispose()
+
+
+def test_concurrent_startups_run_migrations_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from backend.app import migrations
+
+    calls: List[int] = []
+    original = MIGRATIONS[0][2]
+
+    def counting_first_migration(connection) -> None:
+        calls.append(threading.get_ident())
+        original(connection)
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [(1, MIGRATIONS[0][1], counting_first_migration), *MIGRATIONS[1:]])
+    url = f"sqlite:///{tmp_path / 'shared.db'}"
+    engines = [create_sqlite_engine(url) for _ in range(4)]
+    results: List[List[int]] = []
+    errors: List[BaseException] = []
+    barrier = threading.Barrier(len(engines))
+
+    def start(engine) -> None:
+        barrier.wait()
+        try:
+            results.append(run_migrations(engine))
+        except BaseException as exc:  # noqa: BLE001 - surfaced by the assertion below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=start, args=(engine,)) for engine in engines]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for engine in engines:
+        engine.dispose()
+
+    assert errors == []
+    assert len(calls) == 1
+    assert sorted(results, key=len) == [[], [], [], [1, 2]]
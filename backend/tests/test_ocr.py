@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Generator
+
+import pytest
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app.services import ocr
+from backend.app.services.llm import LLMInvocationError, LLMNotConfiguredError
+
+
+@pytest.fixture(name="ocr_cache_path")
+def ocr_cache_path_fixture(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Generator[Path, None, None]:
+    cache_path = tmp_path / "cache.sqlite3"
+    monkeypatch.setenv("OCR_CACHE_PATH", str(cache_path))
+    monkeypatch.setenv("OCR_CACHE_ENABLED", "1")
+    ocr.get_ocr_cache.cache_clear()
+    yield cache_path
+    ocr.get_ocr_cache.cache_clear()
+
+
+def test_duplicate_upload_hits_ocr_cache(ocr_cache_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[bytes] = []
+
+    def fake_vision_ocr(image_bytes: bytes):
+        calls.append(image_bytes)
+        return [{"question_number": "1", "raw_text": "B", "annotation": None, "confidence": 0.8}], "{}"
+
+    monkeypatch.setattr(ocr, "run_vision_ocr", fake_vision_ocr)
+
+    rows, steps = ocr.run_ocr_pipeline(b"scan-1")
+    assert rows[0]["raw_text"] == "B"
+    assert steps[0]["name"] == "OCR 缓存"
+    assert "未命中" in steps[0]["detail"]
+
+    cached_rows, cached_steps = ocr.run_ocr_pipeline(b"scan-1")
+    assert cached_rows == rows
+    assert "命中缓存" in cached_steps[0]["detail"]
+    assert cached_steps[1:] == steps[1:]
+    assert calls == [b"scan-1"]
+
+    ocr.run_ocr_pipeline(b"scan-2")
+    assert calls == [b"scan-1", b"scan-2"]
+    assert ocr_cache_path.exists()
+
+
+def test_fallback_results_are_cached_under_easyocr(ocr_cache_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    easyocr_calls: list[bytes] = []
+
+    def not_configured(_: bytes):
+        raise LLMNotConfiguredError("missing key")
+
+    def fake_easyocr(image_bytes: bytes):
+        easyocr_calls.append(image_bytes)
+        return [{"question_number": "2", "raw_text": "42", "annotation": None, "confidence": 0.6}]
+
+    monkeypatch.delenv("DASHSCOPE_API_KEY", raising=False)
+    monkeypatch.delenv("QWEN_API_KEY", raising=False)
+    monkeypatch.setattr(ocr, "run_vision_ocr", not_configured)
+    monkeypatch.setattr(ocr, "_extract_with_easyocr", fake_easyocr)
+
+    ocr.run_ocr_pipeline(b"scan-3")
+    rows, steps = ocr.run_ocr_pipeline(b"scan-3")
+
+    assert easyocr_calls == [b"scan-3"]
+    assert rows[0]["raw_text"] == "42"
+    assert "easyocr" in steps[0]["detail"]
+    assert [step["name"] for step in steps[1:]] == ["通义千问 · 视觉识别", "EasyOCR 回退识别"]
+
+
+def test_fallback_cache_is_skipped_when_vision_is_configured(
+    ocr_cache_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    vision_calls: list[bytes] = []
+
+    def flaky_vision_ocr(image_bytes: bytes):
+        vision_calls.append(image_bytes)
+        if len(vision_calls) == 1:
+            raise LLMInvocationError("timeout")
+        return [{"question_number": "2", "raw_text": "41", "annotation": None, "confidence": 0.9}], "{}"
+
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "test-key")
+    monkeypatch.setattr(ocr, "run_vision_ocr", flaky_vision_ocr)
+    monkeypatch.setattr(
+        ocr,
+        "_extract_with_easyocr",
+        lambda _: [{"question_number": "2", "raw_text": "42", "annotation": None, "confidence": 0.6}],
+    )
+
+    fallback_rows, _ = ocr.run_ocr_pipeline(b"scan-4")
+    rows, steps = ocr.run_ocr_pipeline(b"scan-4")
+
+    assert fallback_rows[0]["raw_text"] == "42"
+    assert vision_calls == [b"scan-4", b"scan-4"]
+    assert rows[0]["raw_text"] == "41"
+    assert "未命中" in steps[0]["detail"]
+
+
+def test_expired_entries_are_evicted(ocr_cache_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OCR_CACHE_MAX_ENTRIES", "1")
+    ocr.get_ocr_cache.cache_clear()
+    cache = ocr.get_ocr_cache()
+    assert cache is not None
+
+    cache.set("a", {"rows": [1]})
+    cache.set("b", {"rows": [2]})
+    assert cache.get("a") is None
+    assert cache.get("b") == {"rows": [2]}
+
+    cache.ttl_seconds = 1
+    monkeypatch.setattr("backend.app.services.cache.time.time", lambda: 10**12)
+    assert cache.get("b") is None
+
+
+def test_cache_survives_deleted_database_file(ocr_cache_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[bytes] = []
+
+    def fake_vision_ocr(image_bytes: bytes):
+        calls.append(image_bytes)
+        return [{"question_number": "1", "raw_text": "C", "annotation": None, "confidence": 0.9}], "{}"
+
+    monkeypatch.setattr(ocr, "run_vision_ocr", fake_vision_ocr)
+
+    ocr.run_ocr_pipeline(b"scan-1")
+    # /bootstrap/clear 会删除 generated/ 下的缓存文件，而缓存实例仍由 lru_cache 持有。
+    ocr_cache_path.unlink()
+
+    rows, _ = ocr.run_ocr_pipeline(b"scan-1")
+    assert rows[0]["raw_text"] == "C"
+    assert calls == [b"scan-1", b"scan-1"]
+    assert ocr.run_ocr_pipeline(b"scan-1")[0] == rows
+    assert calls == [b"scan-1", b"scan-1"]
+
+
+def test_easyocr_runs_in_worker_process(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("EASYOCR_WORKERS", "1")
+    try:
+        pool = ocr.get_easyocr_pool()
+        assert pool is not None
+        assert pool.submit(ocr.os.getpid).result(timeout=60) != ocr.os.getpid()
+
+        from io import BytesIO
+
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (32, 32), color=(255, 255, 255)).save(buffer, format="PNG")
+        # 子进程中 EasyOCR 缺失或未识别到文字时，异常应原样传回调用方。
+        with pytest.raises(ocr.OCRProcessingError):
+            ocr._extract_with_easyocr(buffer.getvalue())
+    finally:
+        ocr.shutdown_easyocr_pool()
+
+
+def test_easyocr_pool_can_be_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("EASYOCR_WORKERS", "0")
+    calls: list[bytes] = []
+    monkeypatch.setattr(ocr, "_extract_with_easyocr_local", lambda image_bytes: calls.append(image_bytes) or [])
+
+    assert ocr.get_easyocr_pool() is None
+    assert ocr.warm_easyocr_pool() == []
+    ocr._extract_with_easyocr(b"scan")
+    assert calls == [b"scan"]
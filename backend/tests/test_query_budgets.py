@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app import models  # noqa: F401 - ensure SQLModel metadata is populated
+from backend.app.main import app, _get_db
+from backend.app.models import (
+    Exam,
+    Mistake,
+    PracticeAssignment,
+    PracticeItem,
+    Question,
+    Response,
+    Student,
+    Submission,
+    User,
+)
+from backend.app.services.query_stats import QUERY_COUNT_HEADER, QUERY_TIME_HEADER, track_queries
+from backend.app.services.student_analysis import build_analysis_context
+
+# 各列表接口的语句数上限，与返回行数无关；鉴权用户已缓存，不计查询用户的一条。
+QUERY_BUDGETS = {
+    "/exams": 1,
+    "/exams?expand=questions": 2,
+    "/submissions": 2,
+    "/practice": 2,
+}
+
+
+@pytest.fixture(name="engine")
+def engine_fixture() -> Generator[Engine, None, None]:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine: Engine, monkeypatch: pytest.MonkeyPatch) -> Generator[TestClient, None, None]:
+    def session_dependency() -> Generator[Session, None, None]:
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setenv("QUERY_DEBUG", "1")
+    monkeypatch.setenv("STARTUP_WARMUP", "none")
+
+    app.dependency_overrides[_get_db] = session_dependency
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def _auth_headers(client: TestClient) -> dict[str, str]:
+    client.post(
+        "/auth/register",
+        json={"email": "budget@example.com", "password": "BudgetPass123!", "name": "Budget Teacher"},
+    )
+    token_resp = client.post(
+        "/auth/token",
+        data={"username": "budget@example.com", "password": "BudgetPass123!"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert token_resp.status_code == 200, token_resp.text
+    headers = {"Authorization": f"Bearer {token_resp.json()['access_token']}"}
+    # 预热鉴权用户缓存，使各接口的计数只反映自身的查询。
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    return headers
+
+
+def _seed(engine: Engine, copies: int) -> None:
+    with Session(engine) as session:
+        owner_id = session.exec(select(User.id)).one()
+        student = Student(name="学生", owner_id=owner_id)
+        session.add(student)
+        session.flush()
+        for index in range(copies):
+            exam = Exam(title=f"考试 {index}", teacher_id=1, owner_id=owner_id)
+            session.add(exam)
+            session.flush()
+            questions = [Question(exam_id=exam.id, number=str(number)) for number in range(1, 4)]
+            submission = Submission(student_id=student.id, exam_id=exam.id, owner_id=owner_id)
+            assignment = PracticeAssignment(student_id=student.id, owner_id=owner_id)
+            session.add_all([*questions, submission, assignment])
+            session.flush()
+            session.add_all(
+                [Response(submission_id=submission.id, question_id=question.id) for question in questions]
+                + [PracticeItem(assignment_id=assignment.id, question_id=question.id) for question in questions],
+            )
+        session.commit()
+
+
+def _query_count(client: TestClient, path: str, headers: dict[str, str]) -> int:
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    assert float(response.headers[QUERY_TIME_HEADER]) >= 0.0
+    return int(response.headers[QUERY_COUNT_HEADER])
+
+
+@pytest.mark.parametrize("path", sorted(QUERY_BUDGETS))
+def test_list_endpoints_stay_within_query_budget(client: TestClient, engine: Engine, path: str) -> None:
+    headers = _auth_headers(client)
+    _seed(engine, copies=2)
+    small = _query_count(client, path, headers)
+    _seed(engine, copies=10)
+    large = _query_count(client, path, headers)
+
+    assert large == small, f"{path} issues more statements as rows grow (N+1)"
+    assert large <= QUERY_BUDGETS[path]
+
+
+def test_query_headers_are_omitted_outside_debug_mode(
+    client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.delenv("QUERY_DEBUG")
+    response = client.get("/exams", headers=_auth_headers(client))
+    assert QUERY_COUNT_HEADER not in response.headers
+
+
+def test_analysis_context_prefetches_questions_and_responses(engine: Engine) -> None:
+    with Session(engine) as session:
+        student = Student(name="学生", grade_level="七年级")
+        exam = Exam(title="考试", teacher_id=1)
+        session.add_all([student, exam])
+        session.flush()
+        questions = [Question(exam_id=exam.id, number=str(number), prompt=f"题 {number}") for number in range(12)]
+        submission = Submission(student_id=student.id, exam_id=exam.id)
+        session.add_all([*questions, submission])
+        session.flush()
+        responses = [Response(submission_id=submission.id, question_id=question.id) for question in questions]
+        session.add_all(responses)
+        session.flush()
+        mistakes = [
+            Mistake(student_id=student.id, response_id=response.id, question_id=response.question_id)
+            for response in responses
+        ]
+        session.add_all(mistakes)
+        session.commit()
+        student_id = student.id
+        mistake_ids = [mistake.id for mistake in mistakes]
+
+    with Session(engine) as session, track_queries() as stats:
+        context, usable = build_analysis_context(session, student_id=student_id, mistake_ids=mistake_ids)
+
+    assert len(usable) == 12
+    assert [item["prompt"] for item in context["mistakes"]] == [f"题 {number}" for number in range(12)]
+    assert stats.repeated(threshold=3) == []
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import random
+import statistics
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app.services.sketches import SKETCH_MAX_BINS, SKETCH_RESOLUTION, ScoreSketch
+
+
+def _sketch_of(scores, max_score: float) -> ScoreSketch:
+    sketch = ScoreSketch(max_score)
+    for score in scores:
+        sketch.add(score)
+    return sketch
+
+
+def test_quantiles_track_exact_values_within_bin_width() -> None:
+    generator = random.Random(7)
+    scores = [round(generator.uniform(0, 100) * 2) / 2 for _ in range(2000)]
+    sketch = _sketch_of(scores, 100.0)
+
+    assert sketch.bin_width == SKETCH_RESOLUTION
+    assert len(ScoreSketch(1000.0).counts) <= SKETCH_MAX_BINS
+    exact = statistics.quantiles(scores, n=20, method="inclusive")
+    for q, expected in [(0.25, exact[4]), (0.5, exact[9]), (0.75, exact[14]), (0.9, exact[17])]:
+        assert sketch.quantile(q) == pytest.approx(expected)
+    assert ScoreSketch(10.0).quantile(0.5) == 0.0
+
+    off_grid = [generator.uniform(0, 100) for _ in range(2000)]
+    exact = statistics.quantiles(off_grid, n=2, method="inclusive")
+    assert _sketch_of(off_grid, 100.0).quantile(0.5) == pytest.approx(exact[0], abs=SKETCH_RESOLUTION / 2)
+
+
+def test_scores_on_the_grid_are_recovered_exactly() -> None:
+    assert _sketch_of([8.0], 10.0).quantile(0.5) == 8.0
+    sketch = _sketch_of([8, 8, 8, 9, 9], 10.0)
+    assert sketch.quantile(0.5) == 8.0
+    assert sketch.quantile(0.9) == 9.0
+    assert _sketch_of([7.0, 2.0], 10.0).quantile(0.5) == 4.5
+
+
+def test_sketches_merge_across_grids() -> None:
+    left = _sketch_of([10, 20, 30, 50], 50.0)
+    right = _sketch_of([40, 100], 100.0)
+    merged = ScoreSketch.merge([left, right])
+
+    assert merged.max_score == 100.0
+    assert merged.count == 6
+    assert merged.quantile(0.5) == pytest.approx(35)
+    assert merged.quantile(1.0) == 100.0
+    assert ScoreSketch.merge([left, left]).counts[:len(left.counts)] == [count * 2 for count in left.counts]
+
+    coarse = _sketch_of([150, 300], 300.0)
+    assert coarse.bin_width > SKETCH_RESOLUTION
+    assert ScoreSketch.merge([left, coarse]).count == 6
+
+    restored = ScoreSketch.from_json(merged.to_json())
+    assert restored is not None and restored.counts == merged.counts
+    assert ScoreSketch.from_json({"bin_width": 1.0, "counts": {}}) is None
+    legacy = {key: value for key, value in merged.to_json().items() if key != "format"}
+    assert ScoreSketch.from_json(legacy) is None
+
+    buckets = merged.distribution(10)
+    assert len(buckets) == 10
+    assert [count for _, _, count in buckets] == [0, 1, 1, 1, 1, 1, 0, 0, 0, 1]
+    assert buckets[-1][1] == pytest.approx(100.0)
@@ -0,0 +1,417 @@
+from __future__ import annotations
+
+import io
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, create_engine
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app import models  # noqa: F401 - ensure SQLModel metadata is populated
+from backend.app.main import app, _get_db
+from backend.app.services.jobs import shutdown_job_executor
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(tmp_path: Path) -> Generator[Engine, None, None]:
+    # A file database gives the worker thread its own connection.
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'jobs.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    SQLModel.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine: Engine, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Generator[TestClient, None, None]:
+    def session_dependency() -> Generator[Session, None, None]:
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr("backend.app.main.SUBMISSION_STORAGE_DIR", tmp_path / "submissions")
+    monkeypatch.delenv("DASHSCOPE_API_KEY", raising=False)
+    monkeypatch.delenv("QWEN_API_KEY", raising=False)
+
+    app.dependency_overrides[_get_db] = session_dependency
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def _auth_headers(client: TestClient) -> dict[str, str]:
+    register_resp = client.post(
+        "/auth/register",
+        json={"email": "jobs@example.com", "password": "JobsPass123!", "name": "Jobs Teacher"},
+    )
+    assert register_resp.status_code == 201, register_resp.text
+    token_resp = client.post(
+        "/auth/token",
+        data={"username": "jobs@example.com", "password": "JobsPass123!"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert token_resp.status_code == 200, token_resp.text
+    return {"Authorization": f"Bearer {token_resp.json()['access_token']}"}
+
+
+def _create_exam_and_student(client: TestClient, headers: dict[str, str]) -> tuple[int, int]:
+    teacher_resp = client.post("/teachers", json={"name": "王老师"}, headers=headers)
+    assert teacher_resp.status_code == 200, teacher_resp.text
+    exam_resp = client.post(
+        "/exams",
+        json={
+            "title": "异步批改测试",
+            "teacher_id": teacher_resp.json()["id"],
+            "questions": [
+                {
+                    "number": "1",
+                    "type": "multiple_choice",
+                    "prompt": "2 + 3 = ?",
+                    "max_score": 2.0,
+                    "answer_key": {"correct": "C"},
+                },
+            ],
+        },
+        headers=headers,
+    )
+    assert exam_resp.status_code == 200, exam_resp.text
+    student_resp = client.post("/students", json={"name": "测试学生"}, headers=headers)
+    assert student_resp.status_code == 200, student_resp.text
+    return exam_resp.json()["id"], student_resp.json()["id"]
+
+
+def test_async_upload_returns_job_and_completes_in_background(
+    client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    headers = _auth_headers(client)
+    exam_id, student_id = _create_exam_and_student(client, headers)
+
+    def fake_run_ocr_pipeline(image_bytes: bytes):
+        assert image_bytes == b"fake-bytes"
+        return (
+            [{"question_number": "1", "raw_text": "C", "annotation": None, "confidence": 0.95}],
+            [{"name": "OCR 解析", "status": "success", "detail": "识别出 1 道题目"}],
+        )
+
+    monkeypatch.setattr("backend.app.main.run_ocr_pipeline", fake_run_ocr_pipeline)
+
+    upload_resp = client.post(
+        "/submissions/upload",
+        data={"student_id": student_id, "exam_id": exam_id, "async_mode": "true"},
+        files={"image": ("sheet.png", io.BytesIO(b"fake-bytes"), "image/png")},
+        headers=headers,
+    )
+    assert upload_resp.status_code == 200, upload_resp.text
+    job = upload_resp.json()
+    assert job["job_id"] == job["submission_id"]
+    assert job["state"] in {"queued", "running", "completed"}
+
+    shutdown_job_executor(wait=True)
+
+    status_resp = client.get(f"/submissions/{job['job_id']}/job", headers=headers)
+    assert status_resp.status_code == 200, status_resp.text
+    status_payload = status_resp.json()
+    assert status_payload["state"] == "completed"
+    assert status_payload["submission"]["status"] == "graded"
+    assert status_payload["submission"]["total_score"] == pytest.approx(2.0)
+    steps = [log["step"] for log in status_payload["processing_logs"]]
+    assert steps[0] == "异步批改 · 已排队"
+    assert steps[-1] == "异步批改 · 已完成"
+    assert "OCR 解析" in steps
+    assert list((tmp_path / "submissions").iterdir()) == []
+
+
+def test_async_upload_reports_failure(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    from backend.app.services.ocr import OCRProcessingError
+
+    headers = _auth_headers(client)
+    exam_id, student_id = _create_exam_and_student(client, headers)
+
+    def failing_ocr(_: bytes):
+        raise OCRProcessingError("无法识别图像中的文字")
+
+    monkeypatch.setattr("backend.app.main.run_ocr_pipeline", failing_ocr)
+
+    upload_resp = client.post(
+        "/submissions/upload",
+        data={"student_id": student_id, "exam_id": exam_id, "async_mode": "true"},
+        files={"image": ("sheet.png", io.BytesIO(b"fake-bytes"), "image/png")},
+        headers=headers,
+    )
+    assert upload_resp.status_code == 200, upload_resp.text
+    shutdown_job_executor(wait=True)
+
+    status_resp = client.get(f"/submissions/{upload_resp.json()['job_id']}/job", headers=headers)
+    payload = status_resp.json()
+    assert payload["state"] == "failed"
+    assert payload["detail"] == "无法识别图像中的文字"
+    assert payload["submission"]["status"] == "needs_review"
+
+
+def test_ungraded_submissions_are_counted_in_rollups(
+    client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from backend.app.services.ocr import OCRProcessingError
+
+    headers = _auth_headers(client)
+    exam_id, student_id = _create_exam_and_student(client, headers)
+
+    def first_sheet_only_ocr(image_bytes: bytes):
+        if image_bytes != b"graded":
+            raise OCRProcessingError("无法识别图像中的文字")
+        return [{"question_number": "1", "raw_text": "C", "annotation": None, "confidence": 0.9}], []
+
+    monkeypatch.setattr("backend.app.main.run_ocr_pipeline", first_sheet_only_ocr)
+    # 先批改一份，使考试已有汇总行。
+    graded_resp = client.post(
+        "/submissions/upload",
+        data={"student_id": student_id, "exam_id": exam_id},
+        files={"image": ("sheet.png", io.BytesIO(b"graded"), "image/png")},
+        headers=headers,
+    )
+    assert graded_resp.status_code == 200, graded_resp.text
+    # 只排队不执行，模拟仍在处理中的异步任务。
+    monkeypatch.setattr("backend.app.main.enqueue_submission_job", lambda *args, **kwargs: None)
+
+    sync_resp = client.post(
+        "/submissions/upload",
+        data={"student_id": student_id, "exam_id": exam_id},
+        files={"image": ("sheet.png", io.BytesIO(b"fake-bytes"), "image/png")},
+        headers=headers,
+    )
+    assert sync_resp.status_code == 400
+    async_resp = client.post(
+        "/submissions/upload",
+        data={"student_id": student_id, "exam_id": exam_id, "async_mode": "true"},
+        files={"image": ("sheet.png", io.BytesIO(b"fake-bytes"), "image/png")},
+        headers=headers,
+    )
+    assert async_resp.status_code == 200, async_resp.text
+    batch_resp = client.post(
+        "/submissions/upload/batch",
+        data={"exam_id": exam_id, "student_ids": [student_id]},
+        files=[("images", ("a.png", io.BytesIO(b"sheet-a"), "image/png"))],
+        headers=headers,
+    )
+    assert '"status":"error"' in batch_resp.text
+
+    from_rollup = client.post("/analytics", json={"exam_id": exam_id}).json()
+    # 带日期范围时不命中汇总行，走实时聚合。
+    live = client.post("/analytics", json={"exam_id": exam_id, "start_date": "2000-01-01"}).json()
+    assert from_rollup["total_submissions"] == live["total_submissions"] == 4
+
+
+def test_unfinished_jobs_are_recovered_after_restart(
+    client: TestClient,
+    engine: Engine,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    from backend.app import main
+    from backend.app.models import Submission, SubmissionJobState, SubmissionStatus
+    from backend.app.services.jobs import get_job_state, record_job_state, recover_submission_jobs
+
+    headers = _auth_headers(client)
+    exam_id, student_id = _create_exam_and_student(client, headers)
+    monkeypatch.setattr(
+        "backend.app.main.run_ocr_pipeline",
+        lambda _bytes: ([{"question_number": "1", "raw_text": "C", "annotation": None, "confidence": 0.9}], []),
+    )
+    monkeypatch.setenv("SUBMISSION_JOB_RECOVERY", "requeue")
+
+    image_path = tmp_path / "stored.png"
+    image_path.write_bytes(b"fake-bytes")
+    with Session(engine) as session:
+        # 模拟上一个进程留下的任务：一份原图仍在，一份原图已丢失，一份已批改完成。
+        stuck = [
+            Submission(student_id=student_id, exam_id=exam_id, extra_metadata={"source_image_path": str(path)})
+            for path in (image_path, tmp_path / "missing.png")
+        ]
+        finished = Submission(student_id=student_id, exam_id=exam_id, status=SubmissionStatus.graded)
+        session.add_all([*stuck, finished])
+        session.commit()
+        for submission, state in zip([*stuck, finished], ["running", "queued", "completed"]):
+            record_job_state(session, submission, SubmissionJobState(state))
+
+        requeued, failed = recover_submission_jobs(session, main._run_submission_job, main._submission_image_available)
+        assert (requeued, failed) == ([stuck[0].id], [stuck[1].id])
+        shutdown_job_executor(wait=True)
+
+        session.expire_all()
+        assert get_job_state(stuck[0])["state"] == "completed"
+        assert stuck[0].status == SubmissionStatus.graded
+        assert get_job_state(stuck[1])["state"] == "failed"
+        assert stuck[1].status == SubmissionStatus.needs_review
+        assert get_job_state(finished)["state"] == "completed"
+        assert not image_path.exists()
+
+        # 默认不做恢复：多进程部署时无法判断任务是否仍由其他进程处理。
+        monkeypatch.delenv("SUBMISSION_JOB_RECOVERY")
+        record_job_state(session, stuck[1], SubmissionJobState.queued)
+        stuck[1].status = SubmissionStatus.pending
+        session.commit()
+        assert recover_submission_jobs(session, main._run_submission_job, main._submission_image_available) == ([], [])
+
+
+def test_batch_upload_streams_one_result_per_sheet(
+    client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    import json
+    import zipfile
+
+    headers = _auth_headers(client)
+    exam_id, first_student = _create_exam_and_student(client, headers)
+    second_student = client.post("/students", json={"name": "第二位学生"}, headers=headers).json()["id"]
+
+    answers = {b"sheet-a": "C", b"sheet-b": "A"}
+
+    def fake_run_ocr_pipeline(image_bytes: bytes):
+        return (
+            [{"question_number": "1", "raw_text": answers[image_bytes], "annotation": None, "confidence": 0.9}],
+            [{"name": "OCR 解析", "status": "success", "detail": "识别出 1 道题目"}],
+        )
+
+    monkeypatch.setattr("backend.app.main.run_ocr_pipeline", fake_run_ocr_pipeline)
+
+    archive_buffer = io.BytesIO()
+    with zipfile.ZipFile(archive_buffer, "w") as archive:
+        archive.writestr(f"{first_student}_张三.png", b"sheet-a")
+        archive.writestr(f"{second_student}.png", b"sheet-b")
+    archive_buffer.seek(0)
+
+    batch_resp = client.post(
+        "/submissions/upload/batch",
+        data={"exam_id": exam_id},
+        files={"archive": ("class.zip", archive_buffer, "application/zip")},
+        headers=headers,
+    )
+    assert batch_resp.status_code == 200, batch_resp.text
+    results = [json.loads(line) for line in batch_resp.text.splitlines() if line]
+    assert len(results) == 2
+    by_student = {item["student_id"]: item for item in results}
+    assert by_student[first_student]["status"] == "success"
+    assert by_student[first_student]["result"]["submission"]["total_score"] == pytest.approx(2.0)
+    assert by_student[second_student]["result"]["submission"]["total_score"] == pytest.approx(0.0)
+    assert len(by_student[second_student]["result"]["mistakes"]) == 1
+
+    mismatched = client.post(
+        "/submissions/upload/batch",
+        data={"exam_id": exam_id, "student_ids": [first_student]},
+        files=[
+            ("images", ("a.png", io.BytesIO(b"sheet-a"), "image/png")),
+            ("images", ("b.png", io.BytesIO(b"sheet-b"), "image/png")),
+        ],
+        headers=headers,
+    )
+    assert mismatched.status_code == 400, mismatched.text
+
+
+def test_batch_archive_is_rejected_before_decompressing_oversized_sheets(
+    client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    import zipfile
+
+    headers = _auth_headers(client)
+    exam_id, student_id = _create_exam_and_student(client, headers)
+
+    def archive_of(*sizes: int) -> io.BytesIO:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for index, size in enumerate(sizes):
+                archive.writestr(f"{student_id}_{index}.png", b"\0" * size)
+        buffer.seek(0)
+        return buffer
+
+    def read_guard(*_args, **_kwargs):
+        raise AssertionError("archive members must not be decompressed")
+
+    monkeypatch.setattr("backend.app.main.MAX_BATCH_SHEET_SIZE", 1024)
+    monkeypatch.setattr("backend.app.main.MAX_BATCH_ARCHIVE_SIZE", 1536)
+    monkeypatch.setattr(zipfile.ZipFile, "read", read_guard)
+
+    for sizes in [(4096,), (1000, 1000)]:
+        response = client.post(
+            "/submissions/upload/batch",
+            data={"exam_id": exam_id},
+            files={"archive": ("class.zip", archive_of(*sizes), "application/zip")},
+            headers=headers,
+        )
+        assert response.status_code == 413, response.text
+
+
+def test_sync_upload_query_count_does_not_grow_with_questions(
+    client: TestClient,
+    engine: Engine,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from sqlalchemy import event
+
+    from backend.app.services import grading
+    from backend.app.services.llm import LLMNotConfiguredError
+
+    def no_summary(_rows):
+        raise LLMNotConfiguredError("not configured")
+
+    monkeypatch.setattr(grading, "summarize_submission", no_summary)
+    headers = _auth_headers(client)
+    teacher_id = client.post("/teachers", json={"name": "王老师"}, headers=headers).json()["id"]
+    student_id = client.post("/students", json={"name": "测试学生"}, headers=headers).json()["id"]
+
+    statements: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    def upload_count(question_count: int) -> int:
+        exam_resp = client.post(
+            "/exams",
+            json={
+                "title": f"{question_count} 题",
+                "teacher_id": teacher_id,
+                "questions": [
+                    {"number": str(number), "type": "multiple_choice", "answer_key": {"correct": "A"}}
+                    for number in range(1, question_count + 1)
+                ],
+            },
+            headers=headers,
+        )
+        rows = [
+            {"question_number": str(number), "raw_text": "A" if number % 2 else "B", "annotation": None, "confidence": 0.9}
+            for number in range(1, question_count + 1)
+        ]
+        monkeypatch.setattr(
+            "backend.app.main.run_ocr_pipeline",
+            lambda _: (rows, [{"name": "OCR 解析", "status": "success", "detail": "ok"}]),
+        )
+        statements.clear()
+        upload_resp = client.post(
+            "/submissions/upload",
+            data={"student_id": student_id, "exam_id": exam_resp.json()["id"]},
+            files={"image": ("sheet.png", io.BytesIO(b"fake-bytes"), "image/png")},
+            headers=headers,
+        )
+        assert upload_resp.status_code == 200, upload_resp.text
+        payload = upload_resp.json()
+        assert len(payload["responses"]) == question_count
+        assert all(response["id"] for response in payload["responses"])
+        assert len(payload["mistakes"]) == question_count // 2
+        return len(statements)
+
+    upload_count(5)  # 首次批改会额外创建学生档案
+    small, large = upload_count(5), upload_count(40)
+    assert large == small
+    assert large <= 35
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from backend.app import models  # noqa: F401 - ensure SQLModel metadata is populated
+from backend.app.main import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, app, _get_db
+from backend.app.models import Exam, Question, Response, Student, Submission, User
+
+
+@pytest.fixture(name="engine")
+def engine_fixture() -> Generator[Engine, None, None]:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine: Engine, monkeypatch: pytest.MonkeyPatch) -> Generator[TestClient, None, None]:
+    def session_dependency() -> Generator[Session, None, None]:
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setenv("STARTUP_WARMUP", "none")
+
+    app.dependency_overrides[_get_db] = session_dependency
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="headers")
+def headers_fixture(client: TestClient) -> dict[str, str]:
+    client.post(
+        "/auth/register",
+        json={"email": "pager@example.com", "password": "PagerPass123!", "name": "Pager Teacher"},
+    )
+    token_resp = client.post(
+        "/auth/token",
+        data={"username": "pager@example.com", "password": "PagerPass123!"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert token_resp.status_code == 200, token_resp.text
+    return {"Authorization": f"Bearer {token_resp.json()['access_token']}"}
+
+
+def _seed_submissions(engine: Engine, count: int) -> list[int]:
+    """按提交时间从新到旧返回 id；每两份共用同一提交时间，用于验证同一时间戳下按 id 断开。"""
+
+    base = datetime(2024, 9, 1, 8, 0, 0)
+    with Session(engine) as session:
+        owner_id = session.exec(select(User.id)).one()
+        student = Student(name="学生", owner_id=owner_id)
+        exam = Exam(title="单元测验", teacher_id=1, owner_id=owner_id)
+        session.add_all([student, exam])
+        session.flush()
+        question = Question(exam_id=exam.id, number="1")
+        session.add(question)
+        session.flush()
+        submissions = [
+            Submission(
+                student_id=student.id,
+                exam_id=exam.id,
+                owner_id=owner_id,
+                submitted_at=base + timedelta(minutes=index // 2),
+            )
+            for index in range(count)
+        ]
+        session.add_all(submissions)
+        session.flush()
+        session.add_all(
+            [Response(submission_id=submission.id, question_id=question.id) for submission in submissions],
+        )
+        session.commit()
+        ordered = sorted(submissions, key=lambda item: (item.submitted_at, item.id), reverse=True)
+        return [submission.id for submission in ordered]
+
+
+def test_cursor_pagination_walks_every_submission_once(
+    client: TestClient,
+    engine: Engine,
+    headers: dict[str, str],
+) -> None:
+    expected = _seed_submissions(engine, 7)
+
+    seen: list[int] = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        resp = client.get("/submissions", params=params, headers=headers)
+        assert resp.status_code == 200, resp.text
+        page = resp.json()
+        assert len(page) <= 3
+        assert all(len(item["responses"]) == 1 for item in page)
+        seen.extend(item["id"] for item in page)
+        pages += 1
+        cursor = resp.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert seen == expected
+
+
+def test_page_size_is_capped_and_responses_can_be_skipped(
+    client: TestClient,
+    engine: Engine,
+    headers: dict[str, str],
+) -> None:
+    _seed_submissions(engine, 3)
+
+    resp = client.get("/submissions", params={"limit": 10_000, "include_responses": "false"}, headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert NEXT_CURSOR_HEADER not in resp.headers
+    body = resp.json()
+    assert len(body) == 3
+    assert all("responses" not in item for item in body)
+
+
+def test_total_count_only_covers_own_submissions(
+    client: TestClient,
+    engine: Engine,
+    headers: dict[str, str],
+) -> None:
+    _seed_submissions(engine, 4)
+    with Session(engine) as session:
+        # 其他教师的提交不计入总数。
+        session.add(Submission(student_id=1, exam_id=1, owner_id=999))
+        session.commit()
+
+    resp = client.get(
+        "/submissions",
+        params={"limit": 2, "include_responses": "false", "include_total": "true"},
+        headers=headers,
+    )
+    assert resp.status_code == 200, resp.text
+    assert len(resp.json()) == 2
+    assert resp.headers[TOTAL_COUNT_HEADER] == "4"
+    assert TOTAL_COUNT_HEADER not in client.get("/submissions", headers=headers).headers
+
+
+def test_invalid_cursor_is_rejected(client: TestClient, headers: dict[str, str]) -> None:
+    resp = client.get("/submissions", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert resp.status_code == 400
@@ -7,6 +7,7 @@ import type {
   Classroom,
   Exam,
   ExamDraftResponse,
+  ExamSummary,
   GradingSession,
   Mistake,
   Student,
@@ -16,6 +17,7 @@ import type {
   SubmissionHistoryEntry,
   SubmissionProcessingResult,
   SubmissionResponse,
+  SubmissionSummary,
   Teacher,
   TeacherFeedback,
   TokenResponse,
@@ -127,11 +129,25 @@ export const createExam = async (payload: unknown) => {
   return data;
 };
 
-export const fetchExams = async () => {
-  const { data } = await apiClient.get<Exam[]>("/exams");
-  return data;
+const NEXT_CURSOR_HEADER = "x-next-cursor";
+const TOTAL_COUNT_HEADER = "x-total-count";
+
+// 列表接口按游标分页，下一页游标在响应头中返回；这里逐页取完。
+const fetchAllPages = async <T>(url: string, params: Record<string, unknown> = {}) => {
+  const items: T[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await apiClient.get<T[]>(url, { params: { ...params, limit: 200, cursor } });
+    items.push(...response.data);
+    cursor = response.headers[NEXT_CURSOR_HEADER] || undefined;
+  } while (cursor);
+  return items;
 };
 
+export const fetchExams = async () => fetchAllPages<Exam>("/exams", { expand: "questions" });
+
+export const fetchExamSummaries = async () => fetchAllPages<ExamSummary>("/exams");
+
 export const fetchExamDraft = async (formData: FormData) => {
   const { data } = await apiClient.post<ExamDraftResponse>("/exams/draft", formData, {
     headers: { "Content-Type": "multipart/form-data" },
@@ -187,9 +203,17 @@ export const fetchSubmissions = async (params: {
   exam_id?: number;
   student_id?: number;
   status?: string;
-} = {}) => {
-  const { data } = await apiClient.get<SubmissionDetail[]>("/submissions", { params });
-  return data;
+} = {}) => fetchAllPages<SubmissionDetail>("/submissions", params);
+
+// 返回最近的提交概要，以及当前教师名下的提交总数。
+export const fetchRecentSubmissions = async (limit = 6) => {
+  const response = await apiClient.get<SubmissionSummary[]>("/submissions", {
+    params: { limit, include_responses: false, include_total: true },
+  });
+  return {
+    items: response.data,
+    total: Number(response.headers[TOTAL_COUNT_HEADER] ?? response.data.length),
+  };
 };
 
 export const fetchSubmissionHistory = async (params: {
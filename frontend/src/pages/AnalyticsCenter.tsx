@@ -2,8 +2,8 @@
 import { Button, Card, DatePicker, Empty, Select, Space, Spin, Statistic, Table, Typography } from "antd";
 import dayjs from "dayjs";
 import * as echarts from "echarts";
-import type { AnalyticsSummary, Exam } from "../types";
-import { fetchAnalytics, fetchExams } from "../api/services";
+import type { AnalyticsSummary, ExamSummary } from "../types";
+import { fetchAnalytics, fetchExamSummaries } from "../api/services";
 import PageLayout from "../components/PageLayout";
 import useResponsive from "../hooks/useResponsive";
 import { formatKnowledgeTag } from "../utils/knowledge";
@@ -13,7 +13,7 @@ const { Paragraph, Title } = Typography;
 const AnalyticsCenter = () => {
   const { isMobile, isTablet } = useResponsive();
   const isCompact = isMobile || isTablet;
-  const [exams, setExams] = useState<Exam[]>([]);
+  const [exams, setExams] = useState<ExamSummary[]>([]);
   const [selectedExam, setSelectedExam] = useState<number | undefined>();
   const [summary, setSummary] = useState<AnalyticsSummary | null>(null);
   const [loading, setLoading] = useState(false);
@@ -25,7 +25,7 @@ const AnalyticsCenter = () => {
     setLoading(true);
     try {
       if (!exams.length) {
-        const examList = await fetchExams();
+        const examList = await fetchExamSummaries();
         setExams(examList);
       }
       const payload: Record<string, unknown> = {};
@@ -11,15 +11,15 @@ import dayjs from "dayjs";
 import { useCallback, useEffect, useMemo, useState } from "react";
 import type { ReactNode } from "react";
 import { useNavigate } from "react-router-dom";
-import type { AnalyticsSummary, SubmissionDetail, GradingSession } from "../types";
+import type { AnalyticsSummary, SubmissionSummary, GradingSession } from "../types";
 import {
   clearAllData,
   fetchActiveGradingSession,
   fetchAnalytics,
   fetchClassrooms,
-  fetchExams,
+  fetchExamSummaries,
   fetchStudents,
-  fetchSubmissions,
+  fetchRecentSubmissions,
   fetchTeachers,
   refreshDemoData,
 } from "../api/services";
@@ -92,28 +92,28 @@ const Dashboard = () => {
     submissions: 0,
   });
   const [analytics, setAnalytics] = useState<AnalyticsSummary | null>(null);
-  const [submissions, setSubmissions] = useState<SubmissionDetail[]>([]);
+  const [submissions, setSubmissions] = useState<SubmissionSummary[]>([]);
   const [activeSession, setActiveSession] = useState<GradingSession | null>(null);
 
   const loadData = useCallback(async () => {
     setLoading(true);
     try {
-      const [teachers, classrooms, students, exams, submissionsList] = await Promise.all([
+      const [teachers, classrooms, students, exams, recentSubmissions, analyticsData] = await Promise.all([
         fetchTeachers(),
         fetchClassrooms(),
         fetchStudents(),
-        fetchExams(),
-        fetchSubmissions(),
+        fetchExamSummaries(),
+        fetchRecentSubmissions(6),
+        fetchAnalytics({}),
       ]);
       setOverview({
         teachers: teachers.length,
         classrooms: classrooms.length,
         students: students.length,
         exams: exams.length,
-        submissions: submissionsList.length,
+        submissions: recentSubmissions.total,
       });
-      setSubmissions(submissionsList.slice(0, 6));
-      const analyticsData = await fetchAnalytics({});
+      setSubmissions(recentSubmissions.items);
       setAnalytics(analyticsData);
 
       const firstTeacherId = teachers[0]?.id;
@@ -32,7 +32,7 @@ import {
   createStudent,
   createTeacher,
   fetchClassrooms,
-  fetchExams,
+  fetchExamSummaries,
   fetchStudents,
   fetchTeachers,
 } from "../api/services";
@@ -106,7 +106,7 @@ const RosterSetup = () => {
       fetchTeachers(),
       fetchClassrooms(),
       fetchStudents(),
-      fetchExams(),
+      fetchExamSummaries(),
     ]);
     setTeachers(teacherList);
     setClassrooms(classroomList);
@@ -29,7 +29,7 @@ import { useCallback, useEffect, useMemo, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import {
   fetchActiveGradingSession,
-  fetchExams,
+  fetchExamSummaries,
   fetchStudents,
   fetchSubmission,
   fetchSubmissionHistory,
@@ -37,7 +37,7 @@ import {
 } from "../api/services";
 import PageLayout from "../components/PageLayout";
 import type {
-  Exam,
+  ExamSummary,
   GradingSession,
   ProcessingLog,
   SubmissionDetail,
@@ -106,7 +106,7 @@ const UploadCenter = () => {
   const navigate = useNavigate();
   const { isMobile, isTablet } = useResponsive();
   const isCompact = isMobile || isTablet;
-  const [exams, setExams] = useState<Exam[]>([]);
+  const [exams, setExams] = useState<ExamSummary[]>([]);
   const [students, setStudents] = useState<Student[]>([]);
   const [filters, setFilters] = useState<{ examId?: number; studentId?: number; status?: string }>({});
 
@@ -123,7 +123,7 @@ const UploadCenter = () => {
 
   const loadMetadata = useCallback(async () => {
     try {
-      const [examList, studentList] = await Promise.all([fetchExams(), fetchStudents()]);
+      const [examList, studentList] = await Promise.all([fetchExamSummaries(), fetchStudents()]);
       setExams(examList);
       setStudents(studentList);
     } catch (error) {
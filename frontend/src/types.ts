@@ -59,6 +59,17 @@ export interface Exam {
   parsed_outline?: Record<string, unknown> | null;
 }
 
+export interface ExamSummary {
+  id: number;
+  title: string;
+  subject?: string;
+  scheduled_date?: string;
+  teacher_id: number;
+  classroom_id?: number;
+  answer_key_version: number;
+  question_count: number;
+}
+
 export interface SubmissionResponse {
   id: number;
   question_id: number;
@@ -91,6 +102,8 @@ export interface SubmissionDetail {
   responses: SubmissionResponse[];
 }
 
+export type SubmissionSummary = Omit<SubmissionDetail, "responses">;
+
 export interface OCRRow {
   question_number: string;
   raw_text: string;
@@ -160,9 +173,19 @@ export interface AnalyticsSummary {
   total_submissions: number;
   average_score: number;
   median_score: number;
+  p25_score?: number;
+  p75_score?: number;
+  p90_score?: number;
+  score_distribution?: ScoreBucket[];
   knowledge_breakdown: KnowledgePointBreakdown[];
 }
 
+export interface ScoreBucket {
+  lower: number;
+  upper: number;
+  count: number;
+}
+
 export interface KnowledgePointBreakdown {
   knowledge_tag: string;
   total_attempts: number;